@@ -1,14 +1,16 @@
 import streamlit as st
-from src.agent import get_agent
-from langchain.memory import ConversationBufferMemory
-from langchain_openai import ChatOpenAI
+from src.agent import agent_inputs, aget_agent, new_memory, run_async
+from src.answer_cache import get_answer_cache
+from src.employee_snapshot import get_employee_snapshot, invalidate as invalidate_snapshot
+from src.intent_router import get_intent_router
+from src.rag import warmup
+from src.streaming import ChatStreamHandler
+from src.storage import get_storage
 import os
-import json
 from langfuse.langchain import CallbackHandler
 
 # Configuración de rutas
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_PATH = os.path.join(BASE_DIR, "src", "data", "empleados.json")
 
 st.set_page_config(
     page_title="Asistente RRHH",
@@ -186,16 +188,15 @@ section[data-testid="stSidebar"] div[data-testid="column"]:nth-of-type(2) button
 </style>
 """, unsafe_allow_html=True)
 
-# ==================== FUNCIONES DE AUTENTICACIÓN ====================
-def cargar_empleados():
-    """Carga la base de datos de empleados"""
-    with open(DATA_PATH, 'r', encoding='utf-8') as f:
-        return json.load(f)
+# Precargar embeddings + índice RAG en segundo plano mientras el usuario inicia sesión.
+# Es una sola carga por proceso: las siguientes sesiones reutilizan el mismo retriever.
+warmup(background=True)
 
+# ==================== FUNCIONES DE AUTENTICACIÓN ====================
 def validar_login(id_empleado, password):
     """Valida las credenciales del empleado"""
-    empleados = cargar_empleados()
-    empleado = next((e for e in empleados if e["id"] == id_empleado), None)
+    # Búsqueda por ID en el almacenamiento compartido (índice en memoria o SQLite)
+    empleado = get_storage().get_empleado(id_empleado)
     
     if empleado and empleado["password"] == password:
         # No devolver la contraseña en el objeto de usuario
@@ -275,6 +276,8 @@ if "usuario" not in st.session_state:
                             usuario = validar_login(id_empleado, password)
                             if usuario:
                                 st.session_state.usuario = usuario
+                                # Resumen de su situación para el prompt (vacaciones, solicitudes, baja, nómina)
+                                get_employee_snapshot(usuario["id"])
                                 # Limpiar el placeholder inmediatamente para quitar el formulario
                                 login_placeholder.empty()
                                 st.rerun()
@@ -339,17 +342,8 @@ with st.sidebar:
                     except:
                         pass  # Si no se puede eliminar, continuar
                 
-                # Actualizar empleados.json
-                with open(DATA_PATH, 'r', encoding='utf-8') as f:
-                    empleados = json.load(f)
-                
-                for emp in empleados:
-                    if emp["id"] == usuario["id"]:
-                        emp["foto_perfil"] = None
-                        break
-                
-                with open(DATA_PATH, 'w', encoding='utf-8') as f:
-                    json.dump(empleados, f, indent=2, ensure_ascii=False)
+                # Actualizar datos del empleado
+                get_storage().actualizar_empleado(usuario["id"], foto_perfil=None)
                 
                 # Actualizar session state
                 st.session_state.user_avatar = "👤"
@@ -381,17 +375,8 @@ with st.sidebar:
             with open(ruta_foto, "wb") as f:
                 f.write(foto_upload.getbuffer())
             
-            # Actualizar empleados.json
-            with open(DATA_PATH, 'r', encoding='utf-8') as f:
-                empleados = json.load(f)
-            
-            for emp in empleados:
-                if emp["id"] == usuario["id"]:
-                    emp["foto_perfil"] = ruta_foto
-                    break
-            
-            with open(DATA_PATH, 'w', encoding='utf-8') as f:
-                json.dump(empleados, f, indent=2, ensure_ascii=False)
+            # Actualizar datos del empleado
+            get_storage().actualizar_empleado(usuario["id"], foto_perfil=ruta_foto)
             
             # Actualizar session state
             st.session_state.user_avatar = ruta_foto
@@ -425,15 +410,8 @@ with st.sidebar:
                 # Limpiar TODO: historial visual + memoria del agente
                 st.session_state.messages = []
                 
-                # Reinicializar memoria simple
-                st.session_state.memory = ConversationBufferMemory(
-                    memory_key="chat_history",
-                    return_messages=True,
-                    output_key="output"
-                )
-                
-                # Reinicializar agente con nueva memoria
-                st.session_state.agent = get_agent(memory=st.session_state.memory)
+                # Reinicializar memoria (el agente es compartido y no guarda historial)
+                st.session_state.memory = new_memory()
                 st.session_state.show_confirm_clear = False
                 st.rerun()
         
@@ -449,57 +427,38 @@ with st.sidebar:
         st.subheader("👮 Panel de Administración")
         
         # Cargar solicitudes pendientes
-        solicitudes_path = os.path.join(BASE_DIR, "src", "data", "solicitudes_vacaciones.json")
-        if os.path.exists(solicitudes_path):
-            with open(solicitudes_path, 'r', encoding='utf-8') as f:
-                solicitudes = json.load(f)
-            
-            pendientes = [s for s in solicitudes if s["estado"] == "pendiente"]
+        pendientes = get_storage().listar_solicitudes_vacaciones(estado="pendiente")
+        
+        if pendientes:
+            st.info(f"Tienes {len(pendientes)} solicitudes pendientes.")
             
-            if pendientes:
-                st.info(f"Tienes {len(pendientes)} solicitudes pendientes.")
-                
-                for sol in pendientes:
-                    with st.expander(f"📅 {sol['nombre_empleado']} ({sol['dias_solicitados']} días)"):
-                        st.write(f"**Fechas:** {sol['fecha_inicio']} a {sol['fecha_fin']}")
-                        st.write(f"**Comentarios:** {sol['comentarios']}")
-                        
-                        col_aprob, col_rech = st.columns(2)
-                        
-                        # Botón Aprobar (Secondary - pero verde por CSS de columna)
-                        if col_aprob.button("✅ Aprobar", key=f"aprob_{sol['id_solicitud']}", type="secondary"):
-                            # 1. Actualizar estado de solicitud
-                            sol["estado"] = "aprobada"
-                            with open(solicitudes_path, 'w', encoding='utf-8') as f:
-                                json.dump(solicitudes, f, indent=2, ensure_ascii=False)
-                            
-                            # 2. Descontar días al empleado
-                            with open(DATA_PATH, 'r', encoding='utf-8') as f:
-                                empleados_data = json.load(f)
-                            
-                            for emp in empleados_data:
-                                if emp["id"] == sol["id_empleado"]:
-                                    emp["vacaciones_usadas"] += sol["dias_solicitados"]
-                                    break
-                            
-                            with open(DATA_PATH, 'w', encoding='utf-8') as f:
-                                json.dump(empleados_data, f, indent=2, ensure_ascii=False)
-                            
+            for sol in pendientes:
+                with st.expander(f"📅 {sol['nombre_empleado']} ({sol['dias_solicitados']} días)"):
+                    st.write(f"**Fechas:** {sol['fecha_inicio']} a {sol['fecha_fin']}")
+                    st.write(f"**Comentarios:** {sol['comentarios']}")
+                    
+                    col_aprob, col_rech = st.columns(2)
+                    
+                    # Botón Aprobar (Secondary - pero verde por CSS de columna)
+                    if col_aprob.button("✅ Aprobar", key=f"aprob_{sol['id_solicitud']}", type="secondary"):
+                        # Actualizar estado y descontar días al empleado
+                        if get_storage().aprobar_solicitud_vacaciones(sol["id_solicitud"]):
                             st.success(f"Solicitud aprobada. Días descontados.")
-                            st.rerun()
-                        
-                        # Botón Rechazar (Secondary - Rojo por CSS)
-                        if col_rech.button("❌ Rechazar", key=f"rech_{sol['id_solicitud']}", type="secondary"):
-                            sol["estado"] = "rechazada"
-                            with open(solicitudes_path, 'w', encoding='utf-8') as f:
-                                json.dump(solicitudes, f, indent=2, ensure_ascii=False)
-                            
+                        else:
+                            st.warning("La solicitud ya había sido procesada.")
+                        invalidate_snapshot(sol["id_empleado"])
+                        st.rerun()
+                    
+                    # Botón Rechazar (Secondary - Rojo por CSS)
+                    if col_rech.button("❌ Rechazar", key=f"rech_{sol['id_solicitud']}", type="secondary"):
+                        if get_storage().rechazar_solicitud_vacaciones(sol["id_solicitud"]):
                             st.warning("Solicitud rechazada.")
-                            st.rerun()
-            else:
-                st.success("✅ No hay solicitudes pendientes.")
+                        else:
+                            st.warning("La solicitud ya había sido procesada.")
+                        invalidate_snapshot(sol["id_empleado"])
+                        st.rerun()
         else:
-            st.info("No hay base de datos de solicitudes.")
+            st.success("✅ No hay solicitudes pendientes.")
             
         st.markdown("---")
     
@@ -587,24 +546,21 @@ Bienvenido/a al asistente de RRHH, {usuario['nombre']}. Estoy aquí para ayudart
 # Inicializar memoria conversacional (solo una vez)
 if "memory" not in st.session_state:
     try:
-        # Crear memoria conversacional simple (sin conteo de tokens)
-        st.session_state.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="output"
-        )
+        # Memoria con presupuesto de tokens: ventana de turnos recientes + resumen
+        # de los antiguos (el prompt no crece aunque la sesión sea larga)
+        st.session_state.memory = new_memory()
     except Exception as e:
         st.error(f"Error al inicializar la memoria: {e}")
         st.stop()
 
-# Inicializar agente (solo una vez) con la memoria y contexto del usuario
+# Obtener el agente compartido por el proceso (solo se construye la primera vez).
+# La memoria y el contexto del usuario se pasan en cada invocación
 if "agent" not in st.session_state:
     try:
         with st.spinner("Iniciando el sistema..."):
-            st.session_state.agent = get_agent(
-                memory=st.session_state.memory,
-                user_context=usuario  # Pasar info del usuario al agente
-            )
+            st.session_state.agent = run_async(aget_agent(
+                streaming=True  # Respuestas token a token en el chat
+            ))
     except Exception as e:
         st.error(f"Error al iniciar el agente: {e}")
         st.stop()
@@ -625,22 +581,41 @@ if prompt := st.chat_input("¿En qué puedo ayudarte hoy?"):
     # Generar respuesta
     with st.chat_message("assistant", avatar=st.session_state.assistant_avatar):
         try:
-            with st.spinner("Pensando..."):
-                # Inicializar Langfuse Callback
-                langfuse_handler = CallbackHandler()
-
-                # El agente usa la memoria automáticamente
-                # Se le pasa el callback handler para monitorizar
-                response = st.session_state.agent.invoke(
-                    {"input": prompt},
-                    config={"callbacks": [langfuse_handler]}
-                )
+            # Huecos para el progreso de las herramientas y la respuesta parcial
+            stream_handler = ChatStreamHandler(st.empty(), st.empty())
+
+            # Inicializar Langfuse Callback
+            langfuse_handler = CallbackHandler()
+
+            # Consultas simples de datos propios (vacaciones, nómina, bajas...): herramienta directa, sin LLM
+            output_text = get_intent_router().answer(prompt, usuario, callbacks=[langfuse_handler])
+
+            # Preguntas de políticas ya respondidas (semánticamente equivalentes): sin LLM
+            answer_cache = get_answer_cache()
+            historial = bool(st.session_state.memory.chat_memory.messages)
+            if output_text is None:
+                output_text = answer_cache.lookup(prompt, usuario, historial=historial)
+
+            if output_text is None:
+                # Agente compartido: historial de la sesión, usuario y fecha van en la invocación
+                # Se le pasan los callbacks para monitorizar y para pintar la respuesta en streaming
+                # Ejecución async: las herramientas de un mismo paso se lanzan a la vez
+                response = run_async(st.session_state.agent.ainvoke(
+                    agent_inputs(prompt, st.session_state.memory, usuario),
+                    config={"callbacks": [langfuse_handler, stream_handler]}
+                ))
                 output_text = response["output"]
-                st.markdown(output_text)
-                
-                # Guardar respuesta en historial de Streamlit
-                st.session_state.messages.append({"role": "assistant", "content": output_text})
-                st.rerun()  # Forzar actualización del sidebar
-                
+
+                herramientas = [accion.tool for accion, _ in response["intermediate_steps"]]
+                answer_cache.store(prompt, output_text, herramientas, usuario, historial=historial)
+
+            st.session_state.memory.save_context({"input": prompt}, {"output": output_text})
+
+            stream_handler.finish(output_text)
+
+            # Guardar respuesta en historial de Streamlit
+            st.session_state.messages.append({"role": "assistant", "content": output_text})
+            st.rerun()  # Forzar actualización del sidebar
+
         except Exception as e:
             st.error(f"Ocurrió un error: {e}")
@@ -1,81 +1,29 @@
+import asyncio
+import threading
+from datetime import datetime
 from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.tools.retriever import create_retriever_tool
-from langchain.memory import ConversationSummaryBufferMemory
+from src.context_packer import PackedRetriever
+from src.employee_snapshot import get_employee_snapshot
+from src.llm_client import LLM_BASE_URL, MAX_RETRIES, get_async_http_client, get_http_client
+from src.memory import BoundedConversationMemory
 from src.rag import get_retriever
-from src.tools import calcular_vacaciones, solicitar_vacaciones, reportar_baja_medica, consultar_nomina, actualizar_baja_medica, consultar_bajas_medicas, consultar_solicitudes_vacaciones
+from src.tools import TOOLS
 import streamlit as st
 
 # Cargar variables de entorno (Managed by Streamlit Secrets)
 
-def get_agent(memory=None, user_context=None):
-    """
-    Configura y devuelve el AgentExecutor listo para usar.
-    
-    Args:
-        memory: Objeto de memoria conversacional (ConversationBufferMemory). 
-                Si no se proporciona, se crea uno nuevo.
-        user_context: Diccionario con información del usuario logueado.
-                     Ejemplo: {"id": "E001", "nombre": "Ana", "cargo": "Desarrolladora"}
-    """
-    # 1. Configurar LLM (OpenRouter con GPT-3.5-turbo)
-    # Usar st.secrets para obtener la clave API
-    try:
-        api_key = st.secrets["OPENROUTER_API_KEY"]
-    except KeyError:
-        raise ValueError("OPENROUTER_API_KEY no está configurada en los secrets de Streamlit (.streamlit/secrets.toml o deployment secrets)")
+# El agente no guarda estado de ninguna sesión: el usuario, la fecha y el historial
+# se pasan en cada invocación (agent_inputs). Así se construye una sola vez por
+# proceso y todas las sesiones comparten el cliente HTTP del LLM y su pool de conexiones.
+_lock = threading.RLock()
+_llms = {}       # streaming -> ChatOpenAI
+_agents = {}     # streaming -> AgentExecutor
+_loop = None     # bucle de eventos compartido (ver run_async)
 
-    llm = ChatOpenAI(
-        model="openai/gpt-3.5-turbo",
-        openai_api_key=api_key,
-        openai_api_base="https://openrouter.ai/api/v1",
-        temperature=0
-    )
-
-    # 2. Configurar Herramientas
-    # Herramienta RAG
-    retriever = get_retriever()
-    rag_tool = create_retriever_tool(
-        retriever,
-        "buscar_politicas_rrhh",
-        "Busca información sobre políticas de recursos humanos, teletrabajo, bajas médicas y beneficios en el manual del empleado."
-    )
-    
-    tools = [rag_tool, calcular_vacaciones, solicitar_vacaciones, reportar_baja_medica, actualizar_baja_medica, consultar_bajas_medicas, consultar_solicitudes_vacaciones, consultar_nomina]
-
-    # 3. Configurar Memoria si no se proporciona
-    if memory is None:
-        from langchain.memory import ConversationBufferMemory
-        memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="output"
-        )
-
-    # 4. Configurar Prompt con contexto del usuario
-    # Construir información del usuario para el sistema
-    from datetime import datetime
-    fecha_actual = datetime.now().strftime("%Y-%m-%d")
-    
-    user_info = f"FECHA ACTUAL: {fecha_actual}\n"
-    if user_context:
-        user_info += f"""
-INFORMACIÓN DEL USUARIO ACTUAL:
-- Nombre: {user_context['nombre']}
-- ID de Empleado: {user_context['id']}
-- Cargo: {user_context['cargo']}
-- Vacaciones totales: {user_context['vacaciones_totales']} días
-- Vacaciones usadas: {user_context['vacaciones_usadas']} días
-- Vacaciones restantes: {user_context['vacaciones_totales'] - user_context['vacaciones_usadas']} días
-
-IMPORTANTE: El usuario ya está autenticado en el sistema. Cuando use herramientas que requieren id_empleado, 
-usa automáticamente '{user_context['id']}' sin pedírselo al usuario. El usuario NO necesita decirte su ID.
-Dirígete al usuario por su nombre ({user_context['nombre']}) de forma natural y cercana.
-"""
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", f"""Eres un asistente de RRHH útil y amable. 
+SYSTEM_PROMPT = """Eres un asistente de RRHH útil y amable.
 
 {user_info}
 
@@ -101,21 +49,178 @@ This instruction OVERRIDES all others regarding language.
 
 DO NOT RESPOND IN SPANISH IF THE USER SPEAKS FRENCH/ENGLISH/ETC.
 TRANSLATE YOUR FINAL ANSWER TO THE USER'S LANGUAGE.
-================================================================================"""),
+================================================================================"""
+
+
+def get_llm(streaming=False):
+    """
+    LLM del asistente (OpenRouter con GPT-3.5-turbo), compartido por el proceso.
+    streaming=True emite los tokens a medida que se generan (on_llm_new_token).
+    """
+    llm = _llms.get(streaming)
+    if llm is not None:
+        return llm
+
+    # Usar st.secrets para obtener la clave API
+    try:
+        api_key = st.secrets["OPENROUTER_API_KEY"]
+    except KeyError:
+        raise ValueError("OPENROUTER_API_KEY no está configurada en los secrets de Streamlit (.streamlit/secrets.toml o deployment secrets)")
+
+    with _lock:
+        if streaming not in _llms:
+            # Clientes HTTP del proceso: pool keep-alive, timeouts, reintentos y hedging
+            _llms[streaming] = ChatOpenAI(
+                model="openai/gpt-3.5-turbo",
+                openai_api_key=api_key,
+                openai_api_base=LLM_BASE_URL,
+                temperature=0,
+                streaming=streaming,
+                max_retries=MAX_RETRIES,
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client()
+            )
+        return _llms[streaming]
+
+
+def new_memory():
+    """Memoria conversacional de una sesión: presupuesto de tokens y resumen de los turnos antiguos"""
+    return BoundedConversationMemory(llm=get_llm(), output_key="output")
+
+
+def user_info(user_context=None):
+    """Fecha actual e información del usuario logueado para el prompt del sistema"""
+    fecha_actual = datetime.now().strftime("%Y-%m-%d")
+
+    info = f"FECHA ACTUAL: {fecha_actual}\n"
+    if user_context:
+        info += f"""
+INFORMACIÓN DEL USUARIO ACTUAL:
+- Nombre: {user_context['nombre']}
+- ID de Empleado: {user_context['id']}
+- Cargo: {user_context['cargo']}
+
+SITUACIÓN ACTUAL DEL USUARIO:
+{situacion_usuario(user_context)}
+
+Estos datos están actualizados: úsalos directamente para responder sobre sus vacaciones
+restantes, solicitudes pendientes, baja activa o última nómina, SIN llamar a herramientas.
+Usa las herramientas solo para detalles que no aparecen aquí (desglose de una nómina,
+historial completo, otros meses) o para registrar o modificar datos.
+
+IMPORTANTE: El usuario ya está autenticado en el sistema. Cuando use herramientas que requieren id_empleado,
+usa automáticamente '{user_context['id']}' sin pedírselo al usuario. El usuario NO necesita decirte su ID.
+Dirígete al usuario por su nombre ({user_context['nombre']}) de forma natural y cercana.
+"""
+    return info
+
+
+def situacion_usuario(user_context):
+    """Resumen cacheado de la situación del usuario (vacaciones, solicitudes, baja, nómina)"""
+    try:
+        return get_employee_snapshot(user_context["id"])
+    except Exception as e:
+        # Sin almacenamiento: al menos los días de vacaciones del login
+        print(f"⚠️ No se pudo obtener la situación del empleado {user_context['id']}: {e}")
+        total = user_context["vacaciones_totales"]
+        usadas = user_context["vacaciones_usadas"]
+        return f"- Vacaciones: {total} días totales, {usadas} usados, {total - usadas} restantes"
+
+
+def agent_inputs(user_input, memory=None, user_context=None):
+    """
+    Variables de una invocación del agente compartido.
+    El historial se lee de la memoria de la sesión; tras la respuesta hay que
+    guardarlo con memory.save_context({"input": ...}, {"output": ...}).
+    """
+    return {
+        "input": user_input,
+        "user_info": user_info(user_context),
+        "chat_history": memory.load_memory_variables({})[memory.memory_key] if memory is not None else [],
+    }
+
+
+def get_agent(streaming=False):
+    """
+    Devuelve el AgentExecutor compartido por todo el proceso (se construye una vez).
+    No tiene memoria ni datos de usuario: se invoca con agent_inputs(...).
+
+    Args:
+        streaming: Si es True el LLM emite los tokens a medida que se generan
+                   (on_llm_new_token), para pintarlos con src.streaming.ChatStreamHandler.
+    """
+    if streaming not in _agents:
+        with _lock:
+            if streaming not in _agents:
+                _agents[streaming] = _build_agent(streaming)
+    return _agents[streaming]
+
+
+def _build_agent(streaming):
+    # 1. Configurar LLM (OpenRouter con GPT-3.5-turbo)
+    llm = get_llm(streaming=streaming)
+
+    # 2. Configurar Herramientas
+    # Herramienta RAG (retriever compartido por todas las sesiones del proceso).
+    # El contexto se empaqueta: sin texto repetido entre chunks y con presupuesto de tokens
+    retriever = PackedRetriever(retriever=get_retriever())
+    rag_tool = create_retriever_tool(
+        retriever,
+        "buscar_politicas_rrhh",
+        "Busca información sobre políticas de recursos humanos, teletrabajo, bajas médicas y beneficios en el manual del empleado."
+    )
+
+    tools = [rag_tool, *TOOLS]
+
+    # 3. Configurar Prompt: usuario, fecha e historial son variables de cada invocación
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
         MessagesPlaceholder(variable_name="chat_history"),
         ("human", "{input}"),
         ("placeholder", "{agent_scratchpad}"),
     ])
 
-    # 5. Crear Agente
+    # 4. Crear Agente
     agent = create_tool_calling_agent(llm, tools, prompt)
-    
-    # 6. Crear Executor con memoria
+
+    # 5. Crear Executor (sin memoria: la de cada sesión se pasa en agent_inputs)
     agent_executor = AgentExecutor(
-        agent=agent, 
-        tools=tools, 
-        memory=memory,
-        verbose=True
+        agent=agent,
+        tools=tools,
+        verbose=True,
+        return_intermediate_steps=True  # Herramientas usadas (caché de respuestas)
     )
-    
+
     return agent_executor
+
+
+async def aget_agent(streaming=False):
+    """
+    Versión async de get_agent, para usar el agente con `await agent.ainvoke(...)`.
+
+    La construcción (carga del índice RAG la primera vez) se hace en un hilo para
+    no bloquear el bucle de eventos. En la ejecución async el AgentExecutor lanza
+    con asyncio.gather las herramientas que el LLM pide en un mismo paso: la E/S
+    de datos va al pool de src.tools y la búsqueda RAG (BM25 y FAISS a la vez) al
+    pool de búsqueda de src.rag, así que un turno con varias herramientas tarda lo
+    que la más lenta.
+    """
+    return await asyncio.to_thread(get_agent, streaming=streaming)
+
+
+def run_async(coro):
+    """
+    Ejecuta una corrutina en el bucle de eventos del proceso y espera su resultado.
+
+    El cliente HTTP async del LLM queda ligado al bucle en el que abre las
+    conexiones; como el agente es compartido, todas las sesiones usan el mismo
+    bucle (en un hilo propio) y reutilizan esas conexiones.
+    """
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="rrhh-agent-loop", daemon=True).start()
+                _loop = loop
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
@@ -0,0 +1,288 @@
+import os
+import re
+import threading
+import time
+import numpy as np
+from src.employee_snapshot import private_values
+
+# Similitud coseno mínima para considerar que dos preguntas son la misma
+SIMILARITY_THRESHOLD = float(os.environ.get("RRHH_ANSWER_CACHE_THRESHOLD", "0.92"))
+MAX_ENTRIES = 1_000
+
+# Solo se guardan respuestas que se han obtenido únicamente de la documentación
+CACHEABLE_TOOLS = {"buscar_politicas_rrhh"}
+
+# Marcador del nombre del usuario en las respuestas guardadas
+NOMBRE = "{nombre}"
+
+# Identificadores de registros de un empleado (solicitudes, bajas, nóminas): una
+# respuesta que los menciona nunca se comparte
+REGISTRO_PATTERN = re.compile(r"\b(?:SOL|BM|NOM)\d+\b", re.IGNORECASE)
+IMPORTE_PATTERN = re.compile(r"\d[\d.,]*\d|\d")
+MESES = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre",
+         "octubre", "noviembre", "diciembre"]
+
+# Preguntas sobre datos personales (primera persona, IDs, fechas concretas):
+# nunca se responden desde la caché aunque se parezcan a una pregunta de políticas
+PERSONAL_PATTERN = re.compile(
+    r"\b(mi|mis|me|tengo|quiero|my|mine|i'm|i've|i\s+(?:have|am|need|want|got)|"
+    r"mon|ma|mes|je|j'ai|moi|mein|meine|meinen|meiner|ich|mir|mich|"
+    r"mio|mia|miei|mie|ho|meu|minha|meus|minhas|eu)\b"
+    r"|\b(?:E|SOL|BM|NOM)\d{3,}\b|\d{4}-\d{2}-\d{2}",
+    re.IGNORECASE
+)
+
+# Palabras vacías para distinguir el idioma de la pregunta (la respuesta se da en
+# el idioma del usuario, así que solo se reutiliza entre preguntas del mismo idioma)
+STOPWORDS = {
+    "es": {"el", "los", "las", "que", "qué", "en", "una", "por", "para", "cómo", "cuántos", "cuántas",
+           "cuál", "se", "puedo", "hay", "del", "al", "es", "son", "con"},
+    "en": {"the", "is", "are", "what", "how", "can", "do", "does", "of", "to", "for", "and", "many",
+           "which", "with", "there"},
+    "fr": {"le", "les", "des", "est", "quel", "quelle", "quels", "comment", "pour", "et", "une", "du",
+           "combien", "avec", "sont", "peut"},
+    "de": {"der", "die", "das", "ist", "wie", "was", "und", "für", "ein", "eine", "viele", "kann",
+           "zu", "mit", "gibt", "sind"},
+    "it": {"il", "lo", "gli", "che", "come", "quanti", "quante", "per", "di", "posso", "sono", "qual",
+           "quale", "della", "con"},
+    "pt": {"os", "as", "que", "como", "quantos", "quantas", "para", "do", "da", "em", "um", "uma",
+           "posso", "são", "qual", "com"},
+}
+
+
+def detectar_idioma(texto):
+    """Idioma más probable según palabras vacías, o None si no está claro"""
+    palabras = set(re.findall(r"\w+", texto.lower()))
+    puntos = sorted(((len(palabras & vacias), idioma) for idioma, vacias in STOPWORDS.items()), reverse=True)
+    if puntos[0][0] == 0 or puntos[0][0] == puntos[1][0]:
+        return None
+    return puntos[0][1]
+
+
+def es_pregunta_personal(pregunta):
+    return PERSONAL_PATTERN.search(pregunta) is not None
+
+
+class SemanticAnswerCache:
+    """
+    Caché semántica de respuestas a preguntas sobre políticas de RRHH.
+
+    - Búsqueda (solo en turnos sin historial): la pregunta se embebe con el modelo
+      multilingüe del RAG y se compara (coseno) con las preguntas guardadas del
+      mismo idioma; por encima del umbral se devuelve la respuesta guardada sin
+      llamar al LLM.
+    - Solo se guardan respuestas de turnos autocontenidos (sin historial) que han
+      usado únicamente la búsqueda en la documentación y no contienen datos del
+      usuario; su nombre se sustituye por un marcador y se rellena al servir.
+    - Las preguntas con datos personales nunca se sirven desde la caché.
+    - Todas las entradas se descartan cuando cambia la versión del índice de docs/.
+    Compartida por todas las sesiones del proceso.
+    """
+
+    def __init__(self, embeddings=None, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES,
+                 version_fn=None):
+        self._embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.version_fn = version_fn or _index_version
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._version = None
+        self._entradas = []      # [pregunta, respuesta, idioma, último uso]
+        self._vectores = None    # matriz (n, dim) normalizada, alineada con _entradas
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from src.rag import get_embeddings
+            self._embeddings = get_embeddings()
+        return self._embeddings
+
+    def lookup(self, pregunta, usuario=None, historial=False):
+        """
+        Respuesta guardada para una pregunta equivalente, o None.
+        historial: True si la conversación ya tenía mensajes (la pregunta puede
+        depender del contexto, p. ej. "¿y si es por enfermedad?", y no se busca).
+        """
+        if historial:
+            return None
+        version = self.version_fn()
+        idioma = detectar_idioma(pregunta)
+        if version is None or idioma is None or es_pregunta_personal(pregunta):
+            return None
+
+        nombre = _nombre_de_pila(usuario)
+        vector = self._embed(pregunta)
+        with self._lock:
+            self._comprobar_version(version)
+            mejor = None
+            if self._entradas:
+                similitudes = self._vectores @ vector
+                for i in np.argsort(-similitudes):
+                    if similitudes[i] < self.threshold:
+                        break
+                    entrada = self._entradas[i]
+                    if entrada[2] == idioma and (nombre or NOMBRE not in entrada[1]):
+                        mejor = entrada
+                        break
+            if mejor is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            mejor[3] = time.time()
+            respuesta = mejor[1]
+        return respuesta.replace(NOMBRE, nombre) if nombre else respuesta
+
+    def store(self, pregunta, respuesta, herramientas, usuario=None, historial=False):
+        """
+        Guarda la respuesta si se puede reutilizar para otros usuarios.
+        herramientas: nombres de las herramientas usadas en el turno.
+        historial: True si la conversación ya tenía mensajes (la pregunta puede
+        depender del contexto y no se guarda).
+        Devuelve True si se ha guardado.
+        """
+        version = self.version_fn()
+        idioma = detectar_idioma(pregunta)
+        if (version is None or idioma is None or historial or es_pregunta_personal(pregunta)
+                or not herramientas or not set(herramientas) <= CACHEABLE_TOOLS
+                or REGISTRO_PATTERN.search(respuesta)):
+            return False
+
+        respuesta = _anonimizar(respuesta, usuario)
+        if respuesta is None:
+            return False
+
+        vector = self._embed(pregunta)
+        with self._lock:
+            self._comprobar_version(version)
+            if self._entradas and float(np.max(self._vectores @ vector)) >= self.threshold:
+                return False
+            if len(self._entradas) >= self.max_entries:
+                self._expulsar()
+            self._entradas.append([pregunta, respuesta, idioma, time.time()])
+            fila = vector[np.newaxis, :]
+            self._vectores = fila if self._vectores is None else np.vstack([self._vectores, fila])
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entradas = []
+            self._vectores = None
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entradas),
+            }
+
+    def _embed(self, texto):
+        vector = np.asarray(self.embeddings.embed_query(texto), dtype=np.float32)
+        norma = np.linalg.norm(vector)
+        return vector / norma if norma else vector
+
+    def _comprobar_version(self, version):
+        # Documentación reindexada: las respuestas guardadas pueden estar desactualizadas
+        if version != self._version:
+            self._version = version
+            self._entradas = []
+            self._vectores = None
+
+    def _expulsar(self):
+        # Se descarta la cuarta parte menos usada recientemente
+        orden = sorted(range(len(self._entradas)), key=lambda i: self._entradas[i][3])
+        conservar = sorted(orden[len(orden) // 4 + 1:])
+        self._entradas = [self._entradas[i] for i in conservar]
+        self._vectores = self._vectores[conservar] if conservar else None
+
+
+def _index_version():
+    # src.rag carga el modelo de embeddings y FAISS: solo se importa al usarse
+    from src.rag import get_index_version
+    return get_index_version()
+
+
+def _nombre_de_pila(usuario):
+    if not usuario or not usuario.get("nombre"):
+        return None
+    return usuario["nombre"].split()[0]
+
+
+def _anonimizar(respuesta, usuario):
+    """
+    Sustituye el nombre del usuario por el marcador. Devuelve None si la respuesta
+    contiene otros datos del usuario (ID, cargo, días de vacaciones o cualquier
+    dato de su resumen en el prompt: fechas, importes, motivo de la baja) y no se
+    puede compartir.
+    """
+    if not usuario:
+        return respuesta
+    if NOMBRE in respuesta:
+        return None
+    privados = [usuario.get("id"), usuario.get("cargo")]
+    if "vacaciones_totales" in usuario and "vacaciones_usadas" in usuario:
+        privados += [str(usuario["vacaciones_usadas"]),
+                     str(usuario["vacaciones_totales"] - usuario["vacaciones_usadas"])]
+    if usuario.get("id"):
+        try:
+            privados += private_values(usuario["id"])
+        except Exception as e:
+            # Sin saber qué datos tenía el prompt no se comparte la respuesta
+            print(f"⚠️ No se pudo comprobar la respuesta antes de guardarla en caché: {e}")
+            return None
+
+    importes = _importes(respuesta)
+    for valor in privados:
+        if isinstance(valor, float):
+            if any(abs(valor - importe) < 0.005 for importe in importes):
+                return None
+            continue
+        for variante in _variantes(str(valor)):
+            if re.search(rf"(?<![\w.,]){re.escape(variante)}(?![\w]|[.,]\d)", respuesta, re.IGNORECASE):
+                return None
+
+    nombres = [usuario.get("nombre"), _nombre_de_pila(usuario)]
+    for nombre in filter(None, nombres):
+        respuesta = re.sub(rf"\b{re.escape(nombre)}\b", NOMBRE, respuesta)
+    return respuesta
+
+
+def _variantes(valor):
+    """Formas en que puede aparecer un dato en la respuesta (las fechas ISO, en varios formatos)"""
+    fecha = re.fullmatch(r"(\d{4})-(\d{2})-(\d{2})", valor)
+    if not fecha:
+        return [valor]
+    anio, mes, dia = fecha.groups()
+    return [valor, f"{dia}/{mes}/{anio}", f"{dia}-{mes}-{anio}", f"{int(dia)}/{int(mes)}/{anio}",
+            f"{int(dia)} de {MESES[int(mes) - 1]}"]
+
+
+def _importes(texto):
+    """Cantidades de la respuesta, leídas con punto o coma decimal ("2.050,00", "2050.00", "2050")"""
+    importes = set()
+    for numero in IMPORTE_PATTERN.findall(texto):
+        for decimal, miles in ((".", ","), (",", ".")):
+            try:
+                importes.add(float(numero.replace(miles, "").replace(decimal, ".")))
+            except ValueError:
+                pass
+    return importes
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Caché semántica de respuestas compartida por el proceso"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache()
+    return _cache
@@ -0,0 +1,179 @@
+import gzip
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Any, List
+import numpy as np
+from rank_bm25 import BM25Okapi
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# Fichero con el índice BM25 persistido (junto a index.faiss / chunks.sqlite)
+BM25_FILENAME = "bm25.json.gz"
+FORMAT_VERSION = 2
+
+
+def tokenize(text):
+    """Tokenizador usado por BM25 (el mismo que usaba BM25Retriever por defecto)"""
+    return text.split()
+
+
+def file_hash(path):
+    """Hash SHA-256 del contenido de un fichero (se lee por bloques)"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def build_bm25(docs):
+    """Construye el vectorizador BM25 tokenizando los documentos (solo en construcción del índice)"""
+    return BM25Okapi([tokenize(d.page_content) for d in docs])
+
+
+def update_bm25(bm25, doc_ids, removed_ids, new_docs, new_ids):
+    """
+    Aplica altas y bajas de chunks a un índice BM25 existente.
+    Solo se tokenizan los chunks nuevos; el idf se recalcula a partir de las
+    frecuencias ya guardadas (sin volver a procesar el resto del corpus).
+
+    Returns:
+        (bm25, doc_ids) actualizados
+    """
+    conservar = [i for i, doc_id in enumerate(doc_ids) if doc_id not in removed_ids]
+    doc_freqs = [bm25.doc_freqs[i] for i in conservar]
+    doc_len = [bm25.doc_len[i] for i in conservar]
+
+    for doc in new_docs:
+        tokens = tokenize(doc.page_content)
+        doc_freqs.append(dict(Counter(tokens)))
+        doc_len.append(len(tokens))
+
+    nuevo = _from_stats(doc_freqs, doc_len, bm25.k1, bm25.b, bm25.epsilon)
+    return nuevo, [doc_ids[i] for i in conservar] + list(new_ids)
+
+
+def _from_stats(doc_freqs, doc_len, k1, b, epsilon):
+    """Crea un BM25Okapi a partir de frecuencias por documento ya calculadas"""
+    bm25 = BM25Okapi.__new__(BM25Okapi)
+    bm25.k1 = k1
+    bm25.b = b
+    bm25.epsilon = epsilon
+    bm25.tokenizer = None
+    bm25.doc_freqs = doc_freqs
+    bm25.doc_len = doc_len
+    bm25.corpus_size = len(doc_len)
+    bm25.avgdl = sum(doc_len) / bm25.corpus_size
+    bm25.idf = {}
+
+    # nd: término -> número de documentos que lo contienen
+    nd = Counter()
+    for freqs in doc_freqs:
+        nd.update(freqs.keys())
+    bm25._calc_idf(nd)
+    return bm25
+
+
+class BM25StoreRetriever(BaseRetriever):
+    """
+    Búsqueda BM25 sobre las estadísticas persistidas. Los textos no se guardan en
+    memoria: solo se leen del almacén de chunks los k mejores resultados.
+    Mismo orden de resultados que BM25Retriever.
+    """
+
+    vectorizer: Any
+    doc_ids: List[str]
+    docstore: Any
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        scores = self.vectorizer.get_scores(tokenize(query))
+        top = np.argsort(scores)[::-1][:self.k]
+        ids = [self.doc_ids[i] for i in top]
+        if hasattr(self.docstore, "search_many"):
+            return self.docstore.search_many(ids)
+        return [self.docstore.search(doc_id) for doc_id in ids]
+
+
+def make_retriever(bm25, doc_ids, docstore, k):
+    """Retriever BM25 a partir de un vectorizador ya calculado y la docstore de FAISS"""
+    return BM25StoreRetriever(vectorizer=bm25, doc_ids=list(doc_ids), docstore=docstore, k=k)
+
+
+def save_bm25(db_path, bm25, doc_ids, build_id):
+    """
+    Guarda las estadísticas BM25 en formato compacto:
+    vocabulario único + (ids de término, frecuencias) por documento, idf alineado
+    con el vocabulario y el build_id del índice al que corresponden.
+    Los textos no se duplican: se referencian por su id en el almacén de chunks.
+    """
+    vocab = list(bm25.idf.keys())
+    term_id = {t: i for i, t in enumerate(vocab)}
+
+    payload = {
+        "version": FORMAT_VERSION,
+        "build_id": build_id,
+        "k1": bm25.k1,
+        "b": bm25.b,
+        "epsilon": bm25.epsilon,
+        "avgdl": bm25.avgdl,
+        "average_idf": bm25.average_idf,
+        "vocab": vocab,
+        "idf": [bm25.idf[t] for t in vocab],
+        "doc_len": bm25.doc_len,
+        "doc_terms": [[term_id[t] for t in freqs] for freqs in bm25.doc_freqs],
+        "doc_counts": [list(freqs.values()) for freqs in bm25.doc_freqs],
+        "doc_ids": list(doc_ids),
+    }
+
+    # Escritura atómica: si el proceso muere a medias no queda un fichero corrupto
+    path = os.path.join(db_path, BM25_FILENAME)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def load_bm25(db_path, build_id):
+    """
+    Carga el índice BM25 persistido sin re-tokenizar nada.
+    Devuelve (bm25, doc_ids) o None si no existe, es de otra versión
+    o no corresponde al índice actual (build_id distinto).
+    """
+    path = os.path.join(db_path, BM25_FILENAME)
+    if build_id is None or not os.path.exists(path):
+        return None
+
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if payload.get("version") != FORMAT_VERSION or payload.get("build_id") != build_id:
+        return None
+
+    vocab = payload["vocab"]
+
+    # Reconstruir el objeto sin pasar por BM25Okapi.__init__ (que tokeniza y recalcula)
+    bm25 = BM25Okapi.__new__(BM25Okapi)
+    bm25.k1 = payload["k1"]
+    bm25.b = payload["b"]
+    bm25.epsilon = payload["epsilon"]
+    bm25.tokenizer = None
+    bm25.avgdl = payload["avgdl"]
+    bm25.average_idf = payload["average_idf"]
+    bm25.doc_len = payload["doc_len"]
+    bm25.corpus_size = len(bm25.doc_len)
+    bm25.idf = dict(zip(vocab, payload["idf"]))
+    bm25.doc_freqs = [
+        {vocab[t]: c for t, c in zip(terms, counts)}
+        for terms, counts in zip(payload["doc_terms"], payload["doc_counts"])
+    ]
+
+    return bm25, payload["doc_ids"]
@@ -0,0 +1,75 @@
+"""
+Construcción del índice RAG (FAISS + BM25) desde la línea de comandos.
+
+Uso:
+    python -m src.build_index                 # incremental: solo ficheros nuevos/modificados
+    python -m src.build_index --full          # reconstrucción completa
+    python -m src.build_index --batch-size 128 --threads 8 --workers 4
+    python -m src.build_index --index ivf_pq --nlist 1024 --pq-m 48   # índice aproximado (ver src/faiss_index.py)
+"""
+import argparse
+import os
+import sys
+import time
+from langchain_huggingface import HuggingFaceEmbeddings
+from src.embedding_cache import CachedEmbeddings
+from src.faiss_index import HNSW_M, INDEX_TYPES, IVF_NLIST, PQ_M, describe, index_config
+from src.indexing import BATCH_SIZE, DB_PATH, DOCS_DIR, LOAD_WORKERS, sync_index
+from src.rag import EMBEDDING_MODEL
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construye o actualiza el índice RAG de docs/")
+    parser.add_argument("--docs", default=DOCS_DIR, help="Directorio con los markdown a indexar")
+    parser.add_argument("--db", default=DB_PATH, help="Directorio de la base de datos vectorial")
+    parser.add_argument("--full", action="store_true", help="Ignorar el manifiesto y reindexar todo")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Chunks por lote de embeddings")
+    parser.add_argument("--threads", type=int, default=os.cpu_count(), help="Hilos de torch para el modelo")
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS, help="Hilos cargando y troceando ficheros")
+    parser.add_argument("--no-cache", action="store_true", help="No usar la caché de embeddings en disco")
+    parser.add_argument("--index", choices=INDEX_TYPES, help="Tipo de índice FAISS (por defecto, el existente)")
+    parser.add_argument("--nlist", type=int, default=IVF_NLIST, help="Centroides de los índices IVF")
+    parser.add_argument("--pq-m", type=int, default=PQ_M, help="Subvectores de PQ (debe dividir 384)")
+    parser.add_argument("--hnsw-m", type=int, default=HNSW_M, help="Vecinos por nodo en HNSW")
+    args = parser.parse_args(argv)
+
+    try:
+        import torch
+        torch.set_num_threads(args.threads)
+    except ImportError:
+        pass
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        encode_kwargs={"batch_size": args.batch_size}
+    )
+    if not args.no_cache:
+        embeddings = CachedEmbeddings(embeddings, model_name=EMBEDDING_MODEL)
+
+    def progress(chunks, segundos):
+        ritmo = chunks / segundos if segundos else 0.0
+        print(f"\r  {chunks} chunks embebidos ({ritmo:.1f} chunks/s)", end="", file=sys.stderr, flush=True)
+
+    inicio = time.perf_counter()
+    vectorstore, bm25, _ = sync_index(
+        embeddings,
+        db_path=args.db,
+        docs_dir=args.docs,
+        full=args.full,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        progress=progress,
+        index=index_config(args.index, hnsw_m=args.hnsw_m, nlist=args.nlist, pq_m=args.pq_m)
+    )
+    print(file=sys.stderr)
+
+    print(f"✅ Índice listo: {vectorstore.index.ntotal} chunks en FAISS, "
+          f"{bm25.corpus_size} en BM25 ({time.perf_counter() - inicio:.1f} s)")
+    print(f"Índice FAISS: {describe(vectorstore.index)}")
+    if isinstance(embeddings, CachedEmbeddings):
+        stats = embeddings.stats()
+        print(f"Caché de embeddings: {stats['hits']} aciertos, {stats['misses']} fallos")
+
+
+if __name__ == "__main__":
+    main()
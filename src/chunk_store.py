@@ -0,0 +1,243 @@
+"""
+Persistencia de la base de datos vectorial sin pickle.
+
+faiss_db/
+- index.faiss: índice FAISS. En solo lectura se abre con mmap, así que varios
+  procesos de Streamlit comparten la caché de páginas del sistema.
+- chunks.sqlite: texto y metadatos de cada chunk por fila del índice y por id.
+  Se consulta bajo demanda; sustituye a index.pkl (InMemoryDocstore en pickle).
+  Incluye un identificador de construcción (build_id) que liga los ficheros
+  derivados (BM25) a esta versión del índice sin tener que leer index.faiss entero.
+- index.build_id: build_id de la construcción a la que pertenece index.faiss.
+  Si no coincide con el de chunks.sqlite (escritura interrumpida entre los dos
+  ficheros), el índice no se usa y sync_index lo reconstruye.
+En solo lectura no se carga ningún texto al arrancar: la correspondencia fila -> id
+y los chunks se leen de SQLite solo para los resultados de cada búsqueda.
+Un index.pkl antiguo se migra automáticamente la primera vez que se carga.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+from collections.abc import Mapping
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from src.faiss_index import read_index
+
+INDEX_FILENAME = "index.faiss"
+CHUNKS_FILENAME = "chunks.sqlite"
+BUILD_ID_FILENAME = "index.build_id"
+LEGACY_PICKLE = "index.pkl"
+
+# Máximo de parámetros por consulta IN (límite de SQLite)
+BATCH = 500
+
+
+class SqliteDocstore(Docstore):
+    """
+    Docstore de solo lectura sobre chunks.sqlite: cada búsqueda lee únicamente los
+    chunks pedidos. Conexión propia por hilo (SQLite en modo solo lectura).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def search(self, search):
+        fila = self._conn().execute(
+            "SELECT id, text, metadata FROM chunks WHERE id = ?", (search,)
+        ).fetchone()
+        return _documento(fila) if fila else f"ID {search} not found."
+
+    def search_many(self, ids):
+        """Documentos de los ids indicados, en el mismo orden"""
+        encontrados = {}
+        for i in range(0, len(ids), BATCH):
+            lote = ids[i:i + BATCH]
+            marcas = ",".join("?" * len(lote))
+            for fila in self._conn().execute(
+                f"SELECT id, text, metadata FROM chunks WHERE id IN ({marcas})", lote
+            ):
+                encontrados[fila[0]] = _documento(fila)
+        return [encontrados.get(doc_id) for doc_id in ids]
+
+    def row_ids(self):
+        """Vista perezosa {fila del índice FAISS: id del chunk}"""
+        return RowIdMap(self)
+
+    def all(self):
+        """{id: Document} de todos los chunks (para modificar el índice)"""
+        return {fila[0]: _documento(fila) for fila in self._conn().execute("SELECT id, text, metadata FROM chunks")}
+
+    def add(self, texts):
+        raise NotImplementedError("El almacén de chunks se abre en solo lectura")
+
+    def delete(self, ids):
+        raise NotImplementedError("El almacén de chunks se abre en solo lectura")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+
+class RowIdMap(Mapping):
+    """
+    index_to_docstore_id de FAISS sin cargarlo en memoria: cada acceso es una
+    consulta por clave primaria (solo se hacen para los k resultados).
+    """
+
+    def __init__(self, docstore):
+        self.docstore = docstore
+
+    def __getitem__(self, row):
+        fila = self.docstore._conn().execute("SELECT id FROM chunks WHERE row = ?", (int(row),)).fetchone()
+        if fila is None:
+            raise KeyError(row)
+        return fila[0]
+
+    def __iter__(self):
+        return (fila[0] for fila in self.docstore._conn().execute("SELECT row FROM chunks ORDER BY row"))
+
+    def __len__(self):
+        return self.docstore._conn().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+
+def _documento(fila):
+    doc_id, texto, metadata = fila
+    return Document(id=doc_id, page_content=texto, metadata=json.loads(metadata))
+
+
+def write_chunk_store(path, docstore, index_to_docstore_id, build_id):
+    """Escribe el almacén de chunks en path (un fichero nuevo: save_vectorstore lo coloca después)"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(
+            "CREATE TABLE chunks ("
+            " row INTEGER PRIMARY KEY,"
+            " id TEXT NOT NULL UNIQUE,"
+            " text TEXT NOT NULL,"
+            " metadata TEXT NOT NULL)"
+        )
+        filas = []
+        for row in sorted(index_to_docstore_id):
+            doc_id = index_to_docstore_id[row]
+            doc = docstore.search(doc_id)
+            filas.append((row, doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False)))
+        conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", filas)
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("INSERT INTO meta VALUES ('build_id', ?)", (build_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def read_build_id(db_path):
+    """build_id del almacén de chunks (None si no existe)"""
+    path = os.path.join(db_path, CHUNKS_FILENAME)
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        fila = conn.execute("SELECT value FROM meta WHERE key = 'build_id'").fetchone()
+    except sqlite3.Error:
+        # Almacén sin build_id (versión anterior): los ficheros derivados se rehacen
+        return None
+    finally:
+        conn.close()
+    return fila[0] if fila else None
+
+
+def index_build_id(db_path):
+    """build_id de la construcción a la que pertenece index.faiss (None si no consta)"""
+    path = os.path.join(db_path, BUILD_ID_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().strip() or None
+
+
+def build_id_mismatch(db_path):
+    """True si index.faiss y chunks.sqlite no son de la misma construcción"""
+    if not os.path.exists(os.path.join(db_path, CHUNKS_FILENAME)):
+        return False    # formato antiguo (index.pkl): load_vectorstore lo migra
+    build_id = read_build_id(db_path)
+    return build_id is None or build_id != index_build_id(db_path)
+
+
+def save_vectorstore(vectorstore, db_path):
+    """
+    Guarda índice FAISS + almacén de chunks (sustituye a vectorstore.save_local).
+    Devuelve el build_id de la nueva versión.
+
+    Los dos ficheros se escriben completos en temporales antes de sustituir
+    ninguno. Después se escribe index.build_id, luego index.faiss y por último
+    chunks.sqlite: el build_id de chunks.sqlite solo coincide con index.build_id
+    cuando los dos ficheros son de esta construcción.
+    """
+    os.makedirs(db_path, exist_ok=True)
+    build_id = uuid.uuid4().hex
+    index_path = os.path.join(db_path, INDEX_FILENAME)
+    chunks_path = os.path.join(db_path, CHUNKS_FILENAME)
+    id_path = os.path.join(db_path, BUILD_ID_FILENAME)
+    temporales = [_temporal(path) for path in (index_path, chunks_path, id_path)]
+    index_tmp, chunks_tmp, id_tmp = temporales
+    try:
+        write_chunk_store(chunks_tmp, vectorstore.docstore, vectorstore.index_to_docstore_id, build_id)
+        faiss.write_index(vectorstore.index, index_tmp)
+        with open(id_tmp, 'w', encoding='utf-8') as f:
+            f.write(build_id)
+        for tmp_path, path in zip((id_tmp, index_tmp, chunks_tmp), (id_path, index_path, chunks_path)):
+            os.replace(tmp_path, path)
+    finally:
+        for tmp_path in temporales:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    legacy = os.path.join(db_path, LEGACY_PICKLE)
+    if os.path.exists(legacy):
+        os.remove(legacy)
+    return build_id
+
+
+def _temporal(path):
+    directorio = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directorio)
+    os.close(fd)
+    return tmp_path
+
+
+def load_vectorstore(db_path, embeddings, read_only=False):
+    """
+    Carga la base de datos vectorial.
+
+    read_only=True: índice con mmap y chunks leídos bajo demanda desde SQLite
+    (arranque rápido, memoria compartida entre procesos; no admite modificaciones).
+    read_only=False: todo en memoria para poder añadir o borrar vectores.
+    Lanza ValueError si index.faiss y chunks.sqlite son de construcciones distintas.
+    """
+    chunks_path = os.path.join(db_path, CHUNKS_FILENAME)
+    if not os.path.exists(chunks_path):
+        # Formato antiguo (index.pkl): se migra una vez
+        print("Migrando el docstore de index.pkl a chunks.sqlite...")
+        vectorstore = FAISS.load_local(db_path, embeddings, allow_dangerous_deserialization=True)
+        save_vectorstore(vectorstore, db_path)
+        if not read_only:
+            return vectorstore
+
+    if build_id_mismatch(db_path):
+        raise ValueError(f"index.faiss y chunks.sqlite de {db_path} no son de la misma construcción: "
+                         "reindexa con python -m src.build_index --full")
+
+    docstore = SqliteDocstore(chunks_path)
+    index_path = os.path.join(db_path, INDEX_FILENAME)
+    if read_only:
+        return FAISS(embeddings, read_index(index_path, mmap=True), docstore, docstore.row_ids())
+    return FAISS(embeddings, read_index(index_path), InMemoryDocstore(docstore.all()), dict(docstore.row_ids()))
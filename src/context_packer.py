@@ -0,0 +1,166 @@
+"""
+Empaquetado del contexto RAG antes de pasarlo al LLM.
+
+Los chunks (1000 caracteres con 200 de solapamiento) se devolvían enteros a la
+herramienta buscar_politicas_rrhh, con texto repetido entre chunks contiguos de un
+mismo documento. PackedRetriever, entre el retriever y la herramienta:
+1. Mantiene el orden por puntuación de la búsqueda (fusión RRF o re-ranking).
+2. Quita de cada chunk los fragmentos que ya aparecen en otro chunk seleccionado
+   del mismo documento (solapamiento al principio o al final, o chunk contenido).
+3. Añade chunks hasta llenar un presupuesto de tokens (RRHH_CONTEXT_TOKENS), medido
+   con el tokenizador del LLM (tiktoken, cl100k_base); el último que no cabe entero
+   se recorta si queda sitio suficiente.
+
+tiktoken descarga la codificación la primera vez que se usa: src.rag.warmup la
+carga en segundo plano al arrancar, y mientras tanto el empaquetado async se hace
+fuera del bucle de eventos. Sin red, se puede dejar descargada en un directorio
+indicado con TIKTOKEN_CACHE_DIR; si no se puede cargar se estiman los tokens
+(el fallo se recuerda y no se reintenta).
+"""
+import asyncio
+import math
+import os
+import threading
+from typing import List
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+CONTEXT_TOKENS = int(os.environ.get("RRHH_CONTEXT_TOKENS", "1000"))
+# Codificación de gpt-3.5-turbo / gpt-4
+TOKENIZER_ENCODING = "cl100k_base"
+# Separador entre documentos en la salida de create_retriever_tool
+SEPARATOR = "\n\n"
+# Solapamiento mínimo (caracteres) para considerarlo texto repetido y no casualidad
+MIN_OVERLAP = 30
+# No se recorta un chunk para dejar menos de estos tokens (no aportaría contexto útil)
+MIN_CHUNK_TOKENS = 60
+# Estimación sin tokenizador: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+_lock = threading.Lock()
+_encoding = None
+_encoding_error = None
+
+
+def get_tokenizer():
+    """Codificación de tiktoken compartida (None si no se puede cargar)"""
+    global _encoding, _encoding_error
+    if _encoding is None and _encoding_error is None:
+        with _lock:
+            if _encoding is None and _encoding_error is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+                except Exception as e:
+                    _encoding_error = e
+                    print(f"⚠️ Tokenizador {TOKENIZER_ENCODING} no disponible, se estiman los tokens ({e})")
+    return _encoding
+
+
+def tokenizer_ready():
+    """True si get_tokenizer() ya no va a bloquear (codificación cargada o fallo recordado)"""
+    return _encoding is not None or _encoding_error is not None
+
+
+def count_tokens(text):
+    encoding = get_tokenizer()
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text, max_tokens):
+    """Primeros max_tokens tokens de text, cortados en el último espacio"""
+    encoding = get_tokenizer()
+    if encoding is None:
+        recorte = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        recorte = encoding.decode(encoding.encode(text)[:max_tokens])
+    if len(recorte) < len(text):
+        espacio = recorte.rfind(" ")
+        if espacio > 0:
+            recorte = recorte[:espacio]
+        recorte = recorte.rstrip() + " …"
+    return recorte
+
+
+def overlap(a, b):
+    """Longitud del mayor sufijo de a que es prefijo de b (0 si es menor que MIN_OVERLAP)"""
+    if min(len(a), len(b)) < MIN_OVERLAP:
+        return 0
+    semilla = b[:MIN_OVERLAP]
+    pos = a.find(semilla, max(0, len(a) - len(b)))
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return len(a) - pos
+        pos = a.find(semilla, pos + 1)
+    return 0
+
+
+def remove_overlaps(texto, anteriores):
+    """Quita de texto lo que ya está en los chunks anteriores del mismo documento"""
+    for anterior in anteriores:
+        if texto in anterior:
+            return ""
+        inicio = overlap(anterior, texto)
+        if inicio:
+            texto = texto[inicio:].lstrip()
+        fin = overlap(texto, anterior)
+        if fin:
+            texto = texto[:-fin].rstrip()
+    return texto
+
+
+def pack_documents(docs, max_tokens=CONTEXT_TOKENS):
+    """
+    Documentos (en el orden recibido, de mayor a menor puntuación) sin texto
+    repetido y recortados para que su salida no supere max_tokens tokens.
+    """
+    separador = count_tokens(SEPARATOR)
+    restantes = max_tokens
+    por_fuente = {}   # fuente -> textos originales de los chunks seleccionados
+    empaquetados = []
+    for doc in docs:
+        fuente = doc.metadata.get("source")
+        anteriores = por_fuente.get(fuente, []) if fuente else []
+        texto = remove_overlaps(doc.page_content, anteriores)
+        if not texto:
+            continue
+
+        coste = count_tokens(texto) + (separador if empaquetados else 0)
+        if coste > restantes:
+            disponibles = restantes - (separador if empaquetados else 0)
+            if disponibles < MIN_CHUNK_TOKENS:
+                # Puede que otro chunk más corto sí quepa
+                continue
+            texto = truncate_tokens(texto, disponibles - 2)   # margen para " …"
+            coste = count_tokens(texto) + (separador if empaquetados else 0)
+
+        restantes -= coste
+        empaquetados.append(Document(id=doc.id, page_content=texto, metadata=doc.metadata))
+        if fuente:
+            por_fuente.setdefault(fuente, []).append(doc.page_content)
+    return empaquetados
+
+
+class PackedRetriever(BaseRetriever):
+    """Aplica pack_documents a los resultados de `retriever`"""
+
+    retriever: BaseRetriever
+    max_tokens: int = CONTEXT_TOKENS
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return pack_documents(docs, self.max_tokens)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        if not tokenizer_ready():
+            # La primera carga puede descargar la codificación: fuera del bucle compartido
+            return await asyncio.to_thread(pack_documents, docs, self.max_tokens)
+        return pack_documents(docs, self.max_tokens)
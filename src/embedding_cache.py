@@ -0,0 +1,170 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Configuración de rutas
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+CACHE_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite")
+
+# Límites de la caché
+MAX_DISK_ENTRIES = 200_000     # vectores en disco (384 float32 = 1.5 KB cada uno)
+MAX_MEMORY_ENTRIES = 2_048     # vectores calientes en memoria (consultas frecuentes)
+
+
+def normalize_text(text):
+    """Normaliza el texto para la clave de caché (Unicode NFC y espacios colapsados)"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Caché persistente delante de un modelo de embeddings.
+
+    - Clave: hash de (nombre del modelo, texto normalizado).
+    - Disco: tabla SQLite con el vector en float32 crudo (compacto, sin JSON).
+    - Memoria: LRU pequeña para las consultas más repetidas.
+    - Expulsión LRU en disco por fecha de último uso cuando se supera el límite.
+    Los textos no cacheados se embeben juntos en una sola llamada al modelo.
+    """
+
+    def __init__(self, embeddings, model_name, path=CACHE_PATH,
+                 max_disk_entries=MAX_DISK_ENTRIES, max_memory_entries=MAX_MEMORY_ENTRIES):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_disk_entries = max_disk_entries
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    def embed_documents(self, texts):
+        return [v.tolist() for v in self._embed(texts, self.embeddings.embed_documents)]
+
+    def embed_query(self, text):
+        return self._embed([text], lambda t: [self.embeddings.embed_query(t[0])])[0].tolist()
+
+    def stats(self):
+        """Contadores de aciertos/fallos y ocupación de la caché"""
+        with self._lock:
+            entradas = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": entradas,
+            }
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+    def _embed(self, texts, compute):
+        keys = [self._key(t) for t in texts]
+        vectores = [None] * len(texts)
+        ahora = time.time()
+
+        with self._lock:
+            # 1. Memoria
+            pendientes = []
+            for i, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    vectores[i] = self._memory[key]
+                else:
+                    pendientes.append(i)
+
+            # 2. Disco (se actualiza la fecha de uso para la expulsión LRU)
+            if pendientes:
+                encontrados = self._read([keys[i] for i in pendientes])
+                if encontrados:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(ahora, k) for k in encontrados]
+                    )
+                    self._conn.commit()
+                faltan = []
+                for i in pendientes:
+                    vector = encontrados.get(keys[i])
+                    if vector is None:
+                        faltan.append(i)
+                    else:
+                        vectores[i] = vector
+                        self._remember(keys[i], vector)
+            else:
+                faltan = []
+
+            self.hits += len(texts) - len(faltan)
+            self.misses += len(faltan)
+
+        if not faltan:
+            return vectores
+
+        # 3. Modelo: una única pasada para todos los textos no cacheados (sin el lock)
+        calculados = compute([texts[i] for i in faltan])
+        nuevos = {}
+        for i, vector in zip(faltan, calculados):
+            vector = np.asarray(vector, dtype=np.float32)
+            vectores[i] = vector
+            nuevos[keys[i]] = vector
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(k, v.tobytes(), ahora) for k, v in nuevos.items()]
+            )
+            self._evict()
+            self._conn.commit()
+            for k, v in nuevos.items():
+                self._remember(k, v)
+
+        return vectores
+
+    def _read(self, keys):
+        encontrados = {}
+        # SQLite limita el número de parámetros por consulta
+        for inicio in range(0, len(keys), 500):
+            lote = keys[inicio:inicio + 500]
+            filas = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(lote))})",
+                lote
+            ).fetchall()
+            for key, blob in filas:
+                encontrados[key] = np.frombuffer(blob, dtype=np.float32)
+        return encontrados
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        sobrantes = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_disk_entries
+        if sobrantes > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (sobrantes,)
+            )
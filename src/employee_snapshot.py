@@ -0,0 +1,174 @@
+"""
+Resumen de la situación de cada empleado para el prompt del sistema.
+
+Con solo los días de vacaciones en el prompt, el LLM llamaba igualmente a
+calcular_vacaciones, consultar_solicitudes_vacaciones o consultar_nomina para
+preguntas como "¿tengo algo pendiente?" o "¿cuándo cobré la última nómina?".
+get_employee_snapshot() reúne en unas pocas líneas lo que se consulta más a menudo:
+- Saldo de vacaciones (leído del almacenamiento, no de la copia del login).
+- Solicitudes de vacaciones pendientes.
+- Baja médica activa.
+- Última nómina (mes, neto y fecha de pago).
+
+Junto al texto se guardan sus datos sensibles (fechas, importes, motivo de la
+baja...): private_values() los da a la caché semántica de respuestas para que
+nunca comparta con otros empleados una respuesta que los mencione.
+
+Se construye al iniciar sesión y se guarda en memoria por empleado. Las
+modificaciones (nuevas solicitudes o bajas, aprobaciones, rechazos...) llaman a
+invalidate(id_empleado); RRHH_SNAPSHOT_TTL limita además su vida para recoger
+cambios hechos desde otros procesos.
+"""
+import os
+import threading
+import time
+from src.storage import get_storage
+
+# Segundos que un resumen se considera vigente sin invalidarlo
+SNAPSHOT_TTL = float(os.environ.get("RRHH_SNAPSHOT_TTL", "300"))
+# Solicitudes pendientes que se listan (el resto solo se cuentan)
+MAX_PENDIENTES = 5
+
+
+class EmployeeSnapshotCache:
+    """
+    Resúmenes por empleado (texto para el prompt) con invalidación explícita y
+    caducidad. Una invalidación durante la construcción descarta el resultado.
+    """
+
+    def __init__(self, ttl=SNAPSHOT_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._resumenes = {}      # id_empleado -> (instante, texto, datos privados)
+        self._versiones = {}      # id_empleado -> nº de invalidaciones
+        self._generacion = 0      # invalidaciones de todos los empleados
+
+    def get(self, id_empleado):
+        """Resumen del empleado (se construye si no está o ha caducado)"""
+        return self._entrada(id_empleado)[0]
+
+    def private_values(self, id_empleado):
+        """Fechas, importes, motivos y días que aparecen en el resumen del empleado"""
+        return self._entrada(id_empleado)[1]
+
+    def _entrada(self, id_empleado):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._resumenes.get(id_empleado)
+            if entrada is not None and ahora - entrada[0] < self.ttl:
+                self.hits += 1
+                return entrada[1:]
+            self.misses += 1
+            version = self._version(id_empleado)
+
+        texto, privados = build_snapshot(id_empleado)
+
+        with self._lock:
+            if self._version(id_empleado) == version:
+                self._resumenes[id_empleado] = (ahora, texto, privados)
+        return texto, privados
+
+    def invalidate(self, id_empleado=None):
+        """Descarta el resumen de un empleado (o todos con None) tras modificar sus datos"""
+        with self._lock:
+            if id_empleado is None:
+                self._generacion += 1
+                self._resumenes.clear()
+            else:
+                self._versiones[id_empleado] = self._versiones.get(id_empleado, 0) + 1
+                self._resumenes.pop(id_empleado, None)
+
+    def _version(self, id_empleado):
+        # Con el lock
+        return self._generacion, self._versiones.get(id_empleado, 0)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._resumenes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def build_snapshot(id_empleado):
+    """
+    Situación actual del empleado, leída del almacenamiento.
+    Devuelve (texto para el prompt, lista de datos privados que contiene).
+    """
+    storage = get_storage()
+    empleado = storage.get_empleado(id_empleado)
+    if empleado is None:
+        return "", []
+
+    total = empleado["vacaciones_totales"]
+    usadas = empleado["vacaciones_usadas"]
+    lineas = [f"- Vacaciones: {total} días totales, {usadas} usados, {total - usadas} restantes"]
+    privados = [usadas, total - usadas]
+
+    pendientes = storage.listar_solicitudes_vacaciones(id_empleado=id_empleado, estado="pendiente")
+    if pendientes:
+        detalle = "; ".join(
+            f"{s['id_solicitud']} del {s['fecha_inicio']} al {s['fecha_fin']} ({s['dias_solicitados']} días)"
+            for s in pendientes[:MAX_PENDIENTES]
+        )
+        for s in pendientes[:MAX_PENDIENTES]:
+            privados += [s["fecha_inicio"], s["fecha_fin"]]
+        if len(pendientes) > MAX_PENDIENTES:
+            detalle += f" y {len(pendientes) - MAX_PENDIENTES} más"
+        lineas.append(f"- Solicitudes de vacaciones pendientes de aprobación: {detalle}")
+    else:
+        lineas.append("- Solicitudes de vacaciones pendientes de aprobación: ninguna")
+
+    activas = storage.listar_bajas_medicas(id_empleado, estado="activa")
+    if activas:
+        baja = activas[-1]
+        fin = f"fin estimado {baja['fecha_fin_estimada']}" if baja.get("fecha_fin_estimada") else "sin fecha de fin"
+        lineas.append(f"- Baja médica activa: {baja['id_baja']} desde {baja['fecha_inicio']} ({fin}, motivo: {baja['motivo']})")
+        privados += [baja["fecha_inicio"], baja.get("fecha_fin_estimada"), baja["motivo"]]
+    else:
+        lineas.append("- Baja médica activa: ninguna")
+
+    try:
+        nominas = storage.listar_nominas(id_empleado)
+    except FileNotFoundError:
+        nominas = []
+    if nominas:
+        ultima = max(nominas, key=lambda n: n["mes"])
+        lineas.append(f"- Última nómina: {ultima['mes']} ({ultima['id_nomina']}), neto {ultima['salario_neto']:.2f} €, "
+                      f"pagada el {ultima['fecha_pago']}")
+        privados += [ultima["salario_neto"], ultima["fecha_pago"]]
+    else:
+        lineas.append("- Última nómina: no hay nóminas registradas")
+
+    return "\n".join(lineas), [p for p in privados if p not in (None, "", "No especificado")]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_snapshot_cache():
+    """Caché de resúmenes compartida por todas las sesiones del proceso"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmployeeSnapshotCache()
+    return _cache
+
+
+def get_employee_snapshot(id_empleado):
+    return get_snapshot_cache().get(id_empleado)
+
+
+def private_values(id_empleado):
+    return get_snapshot_cache().private_values(id_empleado)
+
+
+def invalidate(id_empleado=None):
+    get_snapshot_cache().invalidate(id_empleado)
@@ -0,0 +1,166 @@
+"""
+Tipos de índice FAISS para la base de datos vectorial.
+
+- flat: búsqueda exacta (fuerza bruta). Por defecto; suficiente para pocos miles de chunks.
+- hnsw: grafo HNSW, sin entrenamiento. Búsqueda aproximada muy rápida (efSearch).
+- ivf_flat: listas invertidas sobre k-means (nlist centroides, se exploran nprobe).
+- ivf_pq: IVF con vectores comprimidos por product quantization (pq_m subvectores
+  de 8 bits): mucha menos memoria a cambio de algo de recall.
+
+El tipo se elige con RRHH_FAISS_INDEX (o python -m src.build_index --index ...);
+si no se indica, se mantiene el del índice existente. Los parámetros de búsqueda
+(RRHH_FAISS_NPROBE, RRHH_FAISS_EF_SEARCH) se aplican al cargar el índice.
+Para comparar recall y latencia con la búsqueda exacta: python -m src.index_report
+"""
+import os
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+FLAT = {"type": "flat"}
+
+# Construcción (cambiarla implica reconstruir el índice)
+INDEX_TYPE = os.environ.get("RRHH_FAISS_INDEX")
+HNSW_M = int(os.environ.get("RRHH_FAISS_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("RRHH_FAISS_EF_CONSTRUCTION", "200"))
+IVF_NLIST = int(os.environ.get("RRHH_FAISS_NLIST", "1024"))
+PQ_M = int(os.environ.get("RRHH_FAISS_PQ_M", "48"))   # debe dividir la dimensión (384)
+PQ_NBITS = 8
+
+# Búsqueda (se pueden cambiar sin reconstruir)
+NPROBE = int(os.environ.get("RRHH_FAISS_NPROBE", "16"))
+EF_SEARCH = int(os.environ.get("RRHH_FAISS_EF_SEARCH", "64"))
+
+# faiss recomienda al menos 39 vectores de entrenamiento por centroide
+MIN_POINTS_PER_CENTROID = 39
+
+_sin_mmap_ifc_avisado = False
+
+
+def index_config(index_type=None, hnsw_m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION,
+                 nlist=IVF_NLIST, pq_m=PQ_M):
+    """
+    Configuración de construcción del índice (se guarda en el manifiesto).
+    Sin tipo (ni RRHH_FAISS_INDEX) devuelve None: se conserva el índice existente.
+    """
+    tipo = (index_type or INDEX_TYPE or "").lower()
+    if not tipo:
+        return None
+    if tipo not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice FAISS desconocido: {tipo} (usa {', '.join(INDEX_TYPES)})")
+    config = {"type": tipo}
+    if tipo == "hnsw":
+        config.update(m=hnsw_m, ef_construction=ef_construction)
+    if tipo in ("ivf_flat", "ivf_pq"):
+        config["nlist"] = nlist
+    if tipo == "ivf_pq":
+        config.update(pq_m=pq_m, nbits=PQ_NBITS)
+    return config
+
+
+def new_index(vectors, config):
+    """
+    Crea un índice vacío del tipo configurado, entrenado con `vectors` si el tipo
+    lo necesita. Con pocos vectores se reduce nlist (y sin vectores suficientes
+    para entrenar PQ se usa IVF-Flat).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    tipo = config["type"]
+
+    if tipo == "hnsw":
+        index = faiss.IndexHNSWFlat(d, config["m"])
+        index.hnsw.efConstruction = config["ef_construction"]
+        return index
+    if tipo in ("ivf_flat", "ivf_pq") and n > 0:
+        nlist = max(1, min(config["nlist"], n // MIN_POINTS_PER_CENTROID))
+        quantizer = faiss.IndexFlatL2(d)
+        if tipo == "ivf_pq":
+            if d % config["pq_m"]:
+                raise ValueError(f"pq_m={config['pq_m']} debe dividir la dimensión de los vectores ({d})")
+            if n >= 2 ** config["nbits"]:
+                index = faiss.IndexIVFPQ(quantizer, d, nlist, config["pq_m"], config["nbits"])
+            else:
+                print(f"⚠️ {n} vectores no bastan para entrenar PQ; se usa IVF-Flat")
+                index = faiss.IndexIVFFlat(quantizer, d, nlist)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, d, nlist)
+        index.train(vectors)
+        return index
+    return faiss.IndexFlatL2(d)
+
+
+def create_vectorstore(embeddings, text_embeddings, metadatas, ids, config):
+    """Equivalente a FAISS.from_embeddings pero con el tipo de índice configurado"""
+    vectors = np.array([v for _, v in text_embeddings], dtype=np.float32)
+    index = new_index(vectors, config)
+    vectorstore = FAISS(embeddings, index, InMemoryDocstore(), {})
+    vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    set_search_params(vectorstore.index)
+    return vectorstore
+
+
+def read_index(path, mmap=False):
+    """
+    Lee un índice de disco. Con mmap=True el fichero se proyecta en memoria en
+    solo lectura: no se copia a la RAM del proceso y varios procesos comparten
+    las mismas páginas. IO_FLAG_MMAP_IFC (faiss >= 1.10) cubre los vectores de
+    los índices planos y HNSW; con versiones anteriores solo se proyectan las
+    listas de los IVF (se avisa una vez). Si el mmap falla se avisa y se lee de
+    forma normal.
+    """
+    if mmap:
+        flags = _mmap_flag() | faiss.IO_FLAG_READ_ONLY
+        try:
+            index = faiss.read_index(path, flags)
+            set_search_params(index)
+            return index
+        except RuntimeError as e:
+            print(f"⚠️ No se pudo abrir el índice FAISS con mmap, se carga en memoria: {e}")
+    index = faiss.read_index(path)
+    set_search_params(index)
+    return index
+
+
+def _mmap_flag():
+    global _sin_mmap_ifc_avisado
+    if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        return faiss.IO_FLAG_MMAP_IFC
+    if not _sin_mmap_ifc_avisado:
+        _sin_mmap_ifc_avisado = True
+        print(f"⚠️ faiss {faiss.__version__} no tiene IO_FLAG_MMAP_IFC (faiss >= 1.10): los índices "
+              "flat y HNSW se copian a la memoria del proceso")
+    return faiss.IO_FLAG_MMAP
+
+
+def set_search_params(index, nprobe=NPROBE, ef_search=EF_SEARCH):
+    """Ajusta los parámetros de búsqueda aproximada (no afecta a los índices exactos)"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+
+def supports_remove(index):
+    """
+    Solo el índice plano renumera las filas al borrar (lo que espera FAISS.delete);
+    el resto se reconstruye a partir de los vectores que quedan.
+    """
+    return isinstance(faiss.downcast_index(index), faiss.IndexFlat)
+
+
+def describe(index):
+    """Descripción corta del índice (tipo y parámetros)"""
+    index = faiss.downcast_index(index)
+    ivf = faiss.try_extract_index_ivf(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return f"IVF-PQ (nlist={ivf.nlist}, nprobe={ivf.nprobe}, m={index.pq.M})"
+    if ivf is not None:
+        return f"IVF-Flat (nlist={ivf.nlist}, nprobe={ivf.nprobe})"
+    if hasattr(index, "hnsw"):
+        return f"HNSW (efSearch={index.hnsw.efSearch})"
+    return "Flat (exacto)"
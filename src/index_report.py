@@ -0,0 +1,171 @@
+"""
+Informe de recall vs latencia de los tipos de índice FAISS frente a la búsqueda exacta.
+
+Construye cada tipo de índice con los vectores del corpus y barre sus parámetros
+de búsqueda (nprobe en IVF, efSearch en HNSW). Para cada combinación mide:
+- recall@k: fracción de los k vecinos exactos (IndexFlatL2) que devuelve el índice
+- latencia p50/p95 por consulta (una consulta cada vez, como en el chat)
+- tamaño del índice serializado y tiempo de construcción
+
+Uso:
+    python -m src.index_report                          # vectores de faiss_db/
+    python -m src.index_report --synthetic 50000        # corpus sintético de 50k vectores
+    python -m src.index_report --output faiss_db/index_report.md
+"""
+import argparse
+import os
+import sys
+import time
+import faiss
+import numpy as np
+from src.faiss_index import HNSW_M, IVF_NLIST, PQ_M, index_config, new_index, set_search_params
+from src.indexing import DB_PATH
+
+DEFAULT_NPROBE = [1, 4, 16, 64]
+DEFAULT_EF_SEARCH = [16, 32, 64, 128]
+
+
+def load_corpus_vectors(db_path=DB_PATH):
+    """Vectores de los chunks indexados (desde la caché de embeddings)"""
+    from src.chunk_store import load_vectorstore
+    from src.rag import get_embeddings
+
+    embeddings = get_embeddings()
+    vectorstore = load_vectorstore(db_path, embeddings, read_only=True)
+    filas = sorted(vectorstore.index_to_docstore_id)
+    docs = vectorstore.docstore.search_many([vectorstore.index_to_docstore_id[i] for i in filas])
+    return np.array(embeddings.embed_documents([d.page_content for d in docs]), dtype=np.float32)
+
+
+def synthetic_vectors(n, d=384, clusters=200, seed=0):
+    """Vectores agrupados en clusters (imitan temas de documentación)"""
+    rng = np.random.default_rng(seed)
+    centros = rng.normal(size=(clusters, d)).astype(np.float32)
+    asignacion = rng.integers(0, clusters, size=n)
+    return centros[asignacion] + 0.35 * rng.normal(size=(n, d)).astype(np.float32)
+
+
+def make_queries(vectors, n, seed=1):
+    """Consultas: vectores del corpus con ruido (preguntas parecidas a un chunk)"""
+    rng = np.random.default_rng(seed)
+    muestra = vectors[rng.choice(len(vectors), size=min(n, len(vectors)), replace=False)]
+    escala = float(np.std(vectors)) * 0.5
+    return (muestra + escala * rng.normal(size=muestra.shape)).astype(np.float32)
+
+
+def measure(index, queries, exact, k):
+    """(recall@k, p50 ms, p95 ms) buscando las consultas de una en una"""
+    tiempos = []
+    aciertos = 0
+    for i in range(len(queries)):
+        inicio = time.perf_counter()
+        _, vecinos = index.search(queries[i:i + 1], k)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        aciertos += len(set(vecinos[0]) & set(exact[i]))
+    return aciertos / (len(queries) * k), float(np.percentile(tiempos, 50)), float(np.percentile(tiempos, 95))
+
+
+def run_report(vectors, queries, k=10, types=("hnsw", "ivf_flat", "ivf_pq"),
+               nprobes=DEFAULT_NPROBE, ef_searches=DEFAULT_EF_SEARCH,
+               hnsw_m=HNSW_M, nlist=IVF_NLIST, pq_m=PQ_M):
+    """Devuelve las filas del informe: dicts con índice, parámetro, recall y latencias"""
+    d = vectors.shape[1]
+    k = min(k, len(vectors))
+
+    inicio = time.perf_counter()
+    flat = faiss.IndexFlatL2(d)
+    flat.add(vectors)
+    construccion = time.perf_counter() - inicio
+    _, exact = flat.search(queries, k)
+    _, p50, p95 = measure(flat, queries, exact, k)
+    filas = [_fila("flat", "-", 1.0, p50, p95, construccion, flat)]
+
+    for tipo in types:
+        config = index_config(tipo, hnsw_m=hnsw_m, nlist=nlist, pq_m=pq_m)
+        inicio = time.perf_counter()
+        index = new_index(vectors, config)
+        index.add(vectors)
+        construccion = time.perf_counter() - inicio
+
+        if faiss.try_extract_index_ivf(index) is not None:
+            barrido = [("nprobe", n, {"nprobe": n}) for n in nprobes]
+        elif hasattr(faiss.downcast_index(index), "hnsw"):
+            barrido = [("efSearch", ef, {"ef_search": ef}) for ef in ef_searches]
+        else:
+            barrido = [("-", "-", {})]
+        for nombre, valor, params in barrido:
+            set_search_params(index, **params)
+            recall, p50, p95 = measure(index, queries, exact, k)
+            parametro = f"{nombre}={valor}" if params else "-"
+            filas.append(_fila(tipo, parametro, recall, p50, p95, construccion, index))
+    return filas
+
+
+def _fila(tipo, parametro, recall, p50, p95, construccion, index):
+    return {
+        "index": tipo,
+        "param": parametro,
+        "recall": recall,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "build_s": construccion,
+        "size_mb": len(faiss.serialize_index(index)) / (1024 * 1024),
+    }
+
+
+def format_report(filas, n_vectores, n_consultas, k):
+    lineas = [
+        "# Recall vs latencia de índices FAISS",
+        "",
+        f"{n_vectores} vectores, {n_consultas} consultas, recall@{k} frente a búsqueda exacta (Flat).",
+        "",
+        "| Índice | Parámetro | Recall@k | p50 (ms) | p95 (ms) | Construcción (s) | Tamaño (MB) |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for f in filas:
+        lineas.append(
+            f"| {f['index']} | {f['param']} | {f['recall']:.3f} | {f['p50_ms']:.3f} | {f['p95_ms']:.3f} "
+            f"| {f['build_s']:.2f} | {f['size_mb']:.1f} |"
+        )
+    return "\n".join(lineas) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara recall y latencia de los índices FAISS")
+    parser.add_argument("--db", default=DB_PATH, help="Directorio de la base de datos vectorial")
+    parser.add_argument("--synthetic", type=int, default=0, help="Usar N vectores sintéticos en lugar del corpus")
+    parser.add_argument("--queries", type=int, default=200, help="Número de consultas")
+    parser.add_argument("--k", type=int, default=10, help="Vecinos por consulta")
+    parser.add_argument("--types", nargs="+", default=["hnsw", "ivf_flat", "ivf_pq"], help="Tipos a comparar")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=DEFAULT_NPROBE, help="Valores de nprobe (IVF)")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=DEFAULT_EF_SEARCH, help="Valores de efSearch (HNSW)")
+    parser.add_argument("--nlist", type=int, default=IVF_NLIST, help="Centroides de los índices IVF")
+    parser.add_argument("--pq-m", type=int, default=PQ_M, help="Subvectores de PQ")
+    parser.add_argument("--hnsw-m", type=int, default=HNSW_M, help="Vecinos por nodo en HNSW")
+    parser.add_argument("--threads", type=int, default=1, help="Hilos de faiss (1 = latencia de una consulta aislada)")
+    parser.add_argument("--output", help="Guardar el informe en Markdown en este fichero")
+    args = parser.parse_args(argv)
+
+    faiss.omp_set_num_threads(args.threads)
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic)
+    else:
+        if not os.path.exists(os.path.join(args.db, "index.faiss")):
+            sys.exit(f"❌ No hay índice en {args.db}: ejecuta antes python -m src.build_index")
+        vectors = load_corpus_vectors(args.db)
+    queries = make_queries(vectors, args.queries)
+
+    filas = run_report(
+        vectors, queries, k=args.k, types=args.types, nprobes=args.nprobe, ef_searches=args.ef_search,
+        hnsw_m=args.hnsw_m, nlist=args.nlist, pq_m=args.pq_m
+    )
+    informe = format_report(filas, len(vectors), len(queries), min(args.k, len(vectors)))
+    print(informe)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(informe)
+        print(f"Informe guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_community.document_loaders import UnstructuredMarkdownLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.bm25_store import build_bm25, file_hash, load_bm25, save_bm25, update_bm25
+from src.chunk_store import INDEX_FILENAME, build_id_mismatch, load_vectorstore, read_build_id, save_vectorstore
+from src.faiss_index import FLAT, create_vectorstore, index_config, supports_remove
+
+# Configuración de rutas
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOCS_DIR = os.path.join(BASE_DIR, "docs")
+DB_PATH = os.path.join(BASE_DIR, "faiss_db")
+
+# Manifiesto: hash de cada fichero de docs/ y los ids de sus chunks en FAISS/BM25
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Parámetros por defecto del pipeline de indexación
+BATCH_SIZE = 64       # chunks por llamada al modelo de embeddings
+LOAD_WORKERS = 4      # hilos cargando/troceando markdown mientras se embebe
+
+
+def sync_index(embeddings, db_path=DB_PATH, docs_dir=DOCS_DIR, full=False,
+               batch_size=BATCH_SIZE, workers=LOAD_WORKERS, progress=None, index=None):
+    """
+    Sincroniza la base de datos persistida (FAISS + BM25) con el contenido de docs/.
+
+    - Ficheros sin cambios: no se tocan (ni se parsean ni se embeben).
+    - Ficheros nuevos o modificados: solo se embeben sus chunks.
+    - Ficheros eliminados o modificados: se borran sus vectores de FAISS y sus
+      estadísticas de BM25.
+    Si no hay índice, es anterior al manifiesto, index.faiss y chunks.sqlite son de
+    construcciones distintas o full=True, se reconstruye por completo.
+    Los embeddings se calculan con embed_files (ver sus parámetros).
+
+    index: configuración del índice FAISS (ver src.faiss_index.index_config). Si
+    no se indica se usa RRHH_FAISS_INDEX o, en su defecto, el tipo del índice
+    existente (plano si no hay). Si cambia respecto al manifiesto, se reconstruye.
+
+    Returns:
+        (vectorstore, bm25, doc_ids): vectorstore abierto en solo lectura (mmap +
+        chunks bajo demanda) y doc_ids en el mismo orden que el índice BM25.
+    """
+    index_file = os.path.join(db_path, INDEX_FILENAME)
+    manifest = load_manifest(db_path) if os.path.exists(index_file) and not full else None
+    config = index or index_config() or (manifest or {}).get("index", FLAT)
+    if manifest is not None and manifest.get("index", FLAT) != config:
+        print(f"Cambio de tipo de índice FAISS ({manifest.get('index', FLAT)['type']} -> {config['type']}): reconstruyendo")
+        manifest = None
+    if manifest is not None and build_id_mismatch(db_path):
+        # Escritura interrumpida entre index.faiss y chunks.sqlite: no se pueden usar juntos
+        print("⚠️ index.faiss y chunks.sqlite no son de la misma construcción: reconstruyendo")
+        manifest = None
+    actuales = scan_docs(docs_dir, manifest)
+
+    if not actuales:
+        raise ValueError("No se encontraron documentos .md en el directorio docs/")
+
+    vectorstore, bm25, doc_ids = None, None, []
+    if manifest is None:
+        print("Inicializando base de datos vectorial...")
+        cambiados, eliminados = list(actuales), []
+    else:
+        anteriores = manifest["files"]
+        cambiados = [f for f in actuales if f not in anteriores or anteriores[f]["hash"] != actuales[f]["hash"]]
+        eliminados = [f for f in anteriores if f not in actuales]
+
+        # El índice BM25 está ligado al build_id del índice; si no coincide se rehace
+        cargado = load_bm25(db_path, read_build_id(db_path))
+        if cargado:
+            bm25, doc_ids = cargado
+
+        for f in actuales:
+            if f not in cambiados:
+                actuales[f]["chunk_ids"] = anteriores[f]["chunk_ids"]
+
+        # Arranque en caliente: nada que parsear, embeber ni re-tokenizar.
+        # El índice se abre en solo lectura (mmap) y los chunks se leen de SQLite.
+        en_caliente = not cambiados and not eliminados and bm25 is not None
+        print("Cargando base de datos vectorial existente...")
+        vectorstore = load_vectorstore(db_path, embeddings, read_only=en_caliente)
+        if en_caliente:
+            if actuales != anteriores:
+                # Solo han cambiado mtimes (p. ej. un checkout): se actualiza el manifiesto
+                save_manifest(db_path, actuales, config)
+            return vectorstore, bm25, doc_ids
+
+    if cambiados or eliminados:
+        print(f"Actualizando índice: {len(cambiados)} ficheros nuevos/modificados, {len(eliminados)} eliminados")
+
+    # 1. Cargar, trocear y embeber solo los ficheros nuevos o modificados
+    hashes = {f: actuales[f]["hash"] for f in cambiados}
+    nuevos_docs, nuevos_ids, nuevos_vectores, chunk_ids = embed_files(
+        cambiados, embeddings, hashes, docs_dir=docs_dir,
+        batch_size=batch_size, workers=workers, progress=progress
+    )
+    for filename in cambiados:
+        actuales[filename]["chunk_ids"] = chunk_ids.get(filename, [])
+
+    # 2. Borrar los vectores de ficheros eliminados o modificados.
+    # También los de ids que vayamos a insertar y ya existan (ejecución anterior interrumpida).
+    borrados = set()
+    reconstruir = False
+    if vectorstore is not None:
+        presentes = set(vectorstore.index_to_docstore_id.values())
+        for filename in cambiados + eliminados:
+            if filename in manifest["files"]:
+                borrados.update(manifest["files"][filename]["chunk_ids"])
+        borrados.update(nuevos_ids)
+        borrados &= presentes
+        if borrados:
+            if supports_remove(vectorstore.index):
+                vectorstore.delete(list(borrados))
+            else:
+                # Los índices aproximados no admiten borrar filas: se reconstruyen
+                # con los chunks que quedan (vectores desde la caché de embeddings)
+                reconstruir = True
+
+    # 3. Insertar los vectores nuevos (ya calculados, no se vuelve a llamar al modelo)
+    text_embeddings = list(zip((d.page_content for d in nuevos_docs), nuevos_vectores))
+    metadatas = [d.metadata for d in nuevos_docs]
+    if vectorstore is None or reconstruir:
+        ids = list(nuevos_ids)
+        if reconstruir:
+            previos = [(i, d) for i, d in zip(*docs_in_index_order(vectorstore)) if i not in borrados]
+            print(f"Reconstruyendo el índice FAISS con {len(previos) + len(nuevos_docs)} chunks")
+            textos = [d.page_content for _, d in previos]
+            text_embeddings = list(zip(textos, embeddings.embed_documents(textos))) + text_embeddings
+            metadatas = [d.metadata for _, d in previos] + metadatas
+            ids = [i for i, _ in previos] + ids
+        vectorstore = create_vectorstore(embeddings, text_embeddings, metadatas, ids, config)
+    elif nuevos_docs:
+        vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=nuevos_ids)
+
+    # 4. Actualizar BM25 (solo se tokenizan los chunks nuevos)
+    if bm25 is not None:
+        bm25, doc_ids = update_bm25(bm25, doc_ids, borrados, nuevos_docs, nuevos_ids)
+    else:
+        doc_ids, todos = docs_in_index_order(vectorstore)
+        bm25 = build_bm25(todos)
+
+    # 5. Guardar la base de datos. El manifiesto va al final: si el proceso se
+    # interrumpe antes, la siguiente ejecución vuelve a aplicar los cambios.
+    build_id = save_vectorstore(vectorstore, db_path)
+    save_bm25(db_path, bm25, doc_ids, build_id)
+    save_manifest(db_path, actuales, config)
+
+    # Se sirve desde disco como en el arranque en caliente (libera la copia en memoria)
+    return load_vectorstore(db_path, embeddings, read_only=True), bm25, doc_ids
+
+
+def embed_files(filenames, embeddings, hashes, docs_dir=DOCS_DIR,
+                batch_size=BATCH_SIZE, workers=LOAD_WORKERS, progress=None):
+    """
+    Pipeline cargador → troceador → embebedor por lotes.
+
+    Varios hilos cargan y trocean ficheros mientras el hilo principal embebe
+    lotes de batch_size chunks (el modelo libera el GIL durante el cálculo,
+    así que ambas fases se solapan). La cola está acotada para no acumular
+    en memoria más chunks de los que el embebedor puede consumir.
+
+    Args:
+        filenames: Ficheros de docs_dir a procesar
+        embeddings: Modelo de embeddings (se llama a embed_documents por lote)
+        hashes: {fichero: hash} para generar ids de chunk estables
+        progress: Callback opcional progress(chunks_procesados, segundos_transcurridos)
+
+    Returns:
+        (docs, ids, vectores, {fichero: [ids de sus chunks]})
+    """
+    cola = queue.Queue(maxsize=batch_size * 4)
+    cancelado = threading.Event()
+    fin = object()
+    orden = {f: i for i, f in enumerate(filenames)}
+
+    def trocear(filename):
+        chunks = split_docs(load_file(os.path.join(docs_dir, filename)))
+        for i, chunk in enumerate(chunks):
+            if cancelado.is_set():
+                return
+            cola.put(((orden[filename], i), filename, f"{filename}:{hashes[filename][:12]}:{i}", chunk))
+
+    def productor():
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                for futuro in [pool.submit(trocear, f) for f in filenames]:
+                    futuro.result()
+        except BaseException as e:
+            cola.put(e)
+        finally:
+            cola.put(fin)
+
+    hilo = threading.Thread(target=productor, name="index-loader", daemon=True)
+    hilo.start()
+
+    resultados = []
+    lote = []
+    inicio = time.perf_counter()
+
+    def procesar_lote():
+        vectores = embeddings.embed_documents([item[3].page_content for item in lote])
+        resultados.extend((*item, vector) for item, vector in zip(lote, vectores))
+        lote.clear()
+        if progress:
+            progress(len(resultados), time.perf_counter() - inicio)
+
+    terminado = False
+    try:
+        while True:
+            item = cola.get()
+            if item is fin:
+                terminado = True
+                break
+            if isinstance(item, BaseException):
+                raise item
+            lote.append(item)
+            if len(lote) >= batch_size:
+                procesar_lote()
+        if lote:
+            procesar_lote()
+    except BaseException:
+        # Desbloquear a los productores antes de propagar el error
+        cancelado.set()
+        while not terminado and cola.get() is not fin:
+            pass
+        raise
+    finally:
+        hilo.join()
+
+    # Orden estable por fichero y posición (los hilos terminan en cualquier orden)
+    resultados.sort(key=lambda r: r[0])
+    chunk_ids = {}
+    for _, filename, chunk_id, _, _ in resultados:
+        chunk_ids.setdefault(filename, []).append(chunk_id)
+    docs = [r[3] for r in resultados]
+    ids = [r[2] for r in resultados]
+    vectores = [r[4] for r in resultados]
+    return docs, ids, vectores, chunk_ids
+
+
+def scan_docs(docs_dir=DOCS_DIR, manifest=None):
+    """
+    Recorre docs/ y devuelve {fichero: {"hash", "mtime", "size"}}.
+    Si el mtime y el tamaño coinciden con el manifiesto se reutiliza su hash
+    para no leer ficheros sin cambios.
+    """
+    if not os.path.exists(docs_dir):
+        raise FileNotFoundError(f"No se encontró el directorio de documentación en: {docs_dir}")
+
+    anteriores = manifest["files"] if manifest else {}
+    actuales = {}
+    for filename in sorted(os.listdir(docs_dir)):
+        if not filename.endswith(".md"):
+            continue
+        st = os.stat(os.path.join(docs_dir, filename))
+        previo = anteriores.get(filename)
+        if previo and previo["mtime"] == st.st_mtime and previo["size"] == st.st_size:
+            hash_ = previo["hash"]
+        else:
+            hash_ = file_hash(os.path.join(docs_dir, filename))
+        actuales[filename] = {"hash": hash_, "mtime": st.st_mtime, "size": st.st_size}
+    return actuales
+
+
+def load_manifest(db_path=DB_PATH):
+    """Carga el manifiesto del índice o None si no existe (índice antiguo o inexistente)"""
+    path = os.path.join(db_path, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except ValueError:
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def index_version(db_path=DB_PATH):
+    """
+    Huella del contenido indexado: hash de los ficheros de docs/ según el manifiesto
+    y del tipo de índice FAISS. Cambia cuando se añade, modifica o elimina algún
+    documento o se cambia el índice (None si no hay índice).
+    """
+    manifest = load_manifest(db_path)
+    if manifest is None:
+        return None
+    firma = "\n".join(f"{f}:{datos['hash']}" for f, datos in sorted(manifest["files"].items()))
+    firma += "\n" + json.dumps(manifest.get("index", FLAT), sort_keys=True)
+    return hashlib.sha256(firma.encode("utf-8")).hexdigest()[:16]
+
+
+def save_manifest(db_path, files, index=FLAT):
+    """Guarda el manifiesto (ficheros y configuración del índice FAISS) de forma atómica"""
+    path = os.path.join(db_path, MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "files": files, "index": index}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def docs_in_index_order(vectorstore):
+    """Devuelve (ids, documentos) del docstore de FAISS en el orden de las filas del índice"""
+    doc_ids = [vectorstore.index_to_docstore_id[i] for i in sorted(vectorstore.index_to_docstore_id)]
+    return doc_ids, [vectorstore.docstore.search(doc_id) for doc_id in doc_ids]
+
+
+def load_file(file_path):
+    """Carga un fichero markdown de la documentación"""
+    loader = UnstructuredMarkdownLoader(file_path)
+    return loader.load()
+
+
+def split_docs(docs):
+    """Divide documentos en chunks"""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200
+    )
+    return text_splitter.split_documents(docs)
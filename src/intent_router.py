@@ -0,0 +1,254 @@
+"""
+Atajo determinista para las consultas de datos más frecuentes.
+
+Preguntas como "¿cuántos días de vacaciones me quedan?" o "mi última nómina"
+costaban dos llamadas al LLM (elegir la herramienta y redactar la respuesta).
+IntentRouter las reconoce en local y llama directamente a la herramienta con el
+ID del usuario logueado; todo lo demás sigue yendo al agente.
+
+Una pregunta se atiende por el atajo solo si:
+- es una consulta sin parámetros (vacaciones restantes, última nómina, historial
+  de solicitudes o de bajas), en español y sin fechas, verbos de acción, otros
+  empleados ni varias intenciones a la vez;
+- y el vecino más cercano entre los ejemplos etiquetados (embeddings MiniLM)
+  coincide con la intención de las palabras clave, o, sin palabras clave, es
+  muy parecido a una sola intención.
+Las herramientas que modifican datos nunca se ejecutan desde aquí.
+"""
+import os
+import re
+import threading
+import numpy as np
+from src.answer_cache import detectar_idioma, es_pregunta_personal
+from src.tools import calcular_vacaciones, consultar_bajas_medicas, consultar_nomina, consultar_solicitudes_vacaciones
+
+ROUTER_ENABLED = os.environ.get("RRHH_INTENT_ROUTER", "1").lower() in ("1", "true", "yes")
+# Similitud mínima con los ejemplos cuando las palabras clave confirman la intención
+AGREE_THRESHOLD = float(os.environ.get("RRHH_INTENT_AGREE_THRESHOLD", "0.6"))
+# Similitud mínima (y ventaja sobre la siguiente intención) sin palabras clave
+THRESHOLD = float(os.environ.get("RRHH_INTENT_THRESHOLD", "0.88"))
+MARGIN = 0.05
+# Las preguntas largas suelen tener matices: mejor el agente
+MAX_WORDS = 14
+SHORT_WORDS = 3
+
+OTRO = "otro"
+
+HERRAMIENTAS = {
+    "calcular_vacaciones": calcular_vacaciones,
+    "consultar_nomina": consultar_nomina,
+    "consultar_solicitudes_vacaciones": consultar_solicitudes_vacaciones,
+    "consultar_bajas_medicas": consultar_bajas_medicas,
+}
+
+KEYWORDS = {
+    "calcular_vacaciones": re.compile(
+        r"\b(d[ií]as? (de )?vacaciones|vacaciones (me )?(quedan|restantes|disponibles))\b"
+        r"|\b(me quedan|quedan|saldo|restantes|disponibles)\b.*\bvacaciones\b", re.IGNORECASE),
+    "consultar_nomina": re.compile(r"\b(n[oó]minas?|recibo de (pago|salario|sueldo)|salario neto)\b", re.IGNORECASE),
+    "consultar_solicitudes_vacaciones": re.compile(
+        r"\bsolicitud(es)? de vacaciones\b|\bestado de (mis|mi) (solicitud|vacaciones)\b", re.IGNORECASE),
+    "consultar_bajas_medicas": re.compile(
+        r"\b(mis|mi) bajas?\b|\bhistorial de bajas\b|\bbajas? (m[eé]dicas? )?activas?\b|\btengo (alguna )?baja\b",
+        re.IGNORECASE),
+}
+
+# Señales de que la pregunta necesita al agente: fechas o periodos, acciones,
+# otros empleados, políticas o condiciones
+COMPLEX_PATTERN = re.compile(
+    r"\d|\b(enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|setiembre|octubre|noviembre|"
+    r"diciembre|pasad[oa]|anterior|siguiente|pr[oó]xim[oa]|ayer|mañana|semana)\b"
+    r"|\b(solicitar|solicito|pedir|pido|reservar|reservo|cancelar|cancela|anular|anula|reportar|reporto|"
+    r"comunicar|comunico|actualizar|actualiza|modificar|modifica|cambiar|cambia|finalizar|finaliza|aprobar|"
+    r"aprueba|rechazar|rechaza)\b"
+    r"|\b(puedo|podr[ií]a|c[oó]mo|por qu[eé]|pol[ií]tica|normativa|si|c[uú]ando|deber[ií]a|ley)\b"
+    r"|\b(E|SOL|BM|NOM)\d{3,}\b",
+    re.IGNORECASE
+)
+
+# Ejemplos etiquetados para el vecino más cercano (OTRO: lo que debe ir al agente)
+EJEMPLOS = {
+    "calcular_vacaciones": [
+        "¿cuántos días de vacaciones me quedan?",
+        "días de vacaciones disponibles",
+        "¿cuántas vacaciones tengo?",
+        "saldo de vacaciones",
+        "vacaciones restantes",
+        "¿cuántos días libres me quedan este año?",
+        "¿me quedan vacaciones?",
+        "dime mis días de vacaciones",
+    ],
+    "consultar_nomina": [
+        "mi última nómina",
+        "enséñame mi nómina",
+        "¿cuánto cobré en la última nómina?",
+        "consultar nómina",
+        "quiero ver mi recibo de sueldo",
+        "¿cuál es mi salario neto?",
+        "detalle de mi nómina",
+    ],
+    "consultar_solicitudes_vacaciones": [
+        "mis solicitudes de vacaciones",
+        "¿en qué estado está mi solicitud de vacaciones?",
+        "¿me han aprobado las vacaciones?",
+        "historial de vacaciones solicitadas",
+        "¿tengo solicitudes de vacaciones pendientes?",
+    ],
+    "consultar_bajas_medicas": [
+        "mis bajas médicas",
+        "historial de bajas",
+        "¿tengo alguna baja activa?",
+        "consultar mis bajas médicas",
+        "¿cuántas bajas he tenido?",
+    ],
+    OTRO: [
+        "¿cuántos días de vacaciones corresponden por ley?",
+        "¿cómo se solicitan las vacaciones?",
+        "quiero pedir vacaciones del 1 al 15 de agosto",
+        "política de teletrabajo",
+        "¿qué beneficios tienen los empleados?",
+        "¿cómo reporto una baja médica?",
+        "estoy enfermo, no puedo ir a trabajar",
+        "¿qué pasa si me pongo enfermo durante las vacaciones?",
+        "¿cuándo se paga la nómina?",
+        "¿qué incluye el seguro médico?",
+        "hola, ¿qué puedes hacer?",
+        "gracias",
+        "¿puedo trabajar desde casa los viernes?",
+        "¿cuál es el horario de la oficina?",
+        "cancelar mi solicitud de vacaciones",
+    ],
+}
+
+
+class IntentRouter:
+    """
+    Clasificador local de intenciones (palabras clave + vecino más cercano).
+    route() devuelve la herramienta a usar o None si la pregunta debe ir al agente.
+    """
+
+    def __init__(self, embeddings=None, ejemplos=EJEMPLOS):
+        self.embeddings = embeddings
+        self.ejemplos = ejemplos
+        self.routed = 0
+        self.fallbacks = 0
+
+        self._lock = threading.Lock()
+        self._matriz = None
+        self._etiquetas = None
+
+    def route(self, pregunta):
+        """Nombre de la herramienta para la pregunta, o None (ambigua: al agente)"""
+        intencion = self._clasificar(pregunta)
+        if intencion is None:
+            self.fallbacks += 1
+        else:
+            self.routed += 1
+        return intencion
+
+    def answer(self, pregunta, user_context, callbacks=None):
+        """
+        Respuesta directa con la herramienta (ID del usuario logueado), o None
+        si la pregunta debe ir al agente.
+        """
+        if not ROUTER_ENABLED or not user_context:
+            return None
+        intencion = self.route(pregunta)
+        if intencion is None:
+            return None
+        salida = HERRAMIENTAS[intencion].invoke(
+            {"id_empleado": user_context["id"]}, config={"callbacks": callbacks}
+        )
+        # Saltos de línea de Markdown para mostrarla tal cual en el chat
+        return "  \n".join(salida.strip().splitlines())
+
+    def stats(self):
+        total = self.routed + self.fallbacks
+        return {
+            "routed": self.routed,
+            "fallbacks": self.fallbacks,
+            "routed_rate": self.routed / total if total else 0.0,
+        }
+
+    def _clasificar(self, pregunta):
+        texto = pregunta.strip()
+        palabras = len(texto.split())
+        if not texto or palabras > MAX_WORDS or COMPLEX_PATTERN.search(texto):
+            return None
+        # Datos del propio usuario ("mi nómina", "me quedan") o frases telegráficas
+        # ("saldo de vacaciones"); el resto suelen ser preguntas generales de políticas
+        if not es_pregunta_personal(texto) and palabras > SHORT_WORDS:
+            return None
+        por_palabras = [intencion for intencion, patron in KEYWORDS.items() if patron.search(texto)]
+        if len(por_palabras) > 1:
+            return None
+        # Las herramientas responden en español; en otros idiomas redacta el agente.
+        # Las frases cortas sin palabras vacías ("my last payslip", "meine Urlaubstage")
+        # no tienen idioma claro: solo pasan si contienen palabras clave en español
+        idioma = detectar_idioma(texto)
+        if idioma != "es" and not (idioma is None and por_palabras):
+            return None
+
+        try:
+            similitudes = self._similitudes(texto)
+        except Exception as e:
+            print(f"⚠️ Clasificador de intenciones no disponible: {e}")
+            return None
+        orden = sorted(similitudes, key=similitudes.get, reverse=True)
+        mejor, segunda = orden[0], orden[1]
+
+        if por_palabras:
+            # Palabras clave y ejemplos tienen que coincidir
+            if mejor == por_palabras[0] and similitudes[mejor] >= AGREE_THRESHOLD:
+                return mejor
+            return None
+        if mejor != OTRO and similitudes[mejor] >= THRESHOLD and similitudes[mejor] - similitudes[segunda] >= MARGIN:
+            return mejor
+        return None
+
+    def _similitudes(self, texto):
+        """{intención: similitud coseno con su ejemplo más parecido}"""
+        matriz, etiquetas = self._ejemplos()
+        vector = _normalizar(np.array([self._embeddings().embed_query(texto)], dtype=np.float32))[0]
+        puntuaciones = matriz @ vector
+        similitudes = {}
+        for etiqueta, puntuacion in zip(etiquetas, puntuaciones):
+            similitudes[etiqueta] = max(similitudes.get(etiqueta, -1.0), float(puntuacion))
+        return similitudes
+
+    def _ejemplos(self):
+        if self._matriz is None:
+            with self._lock:
+                if self._matriz is None:
+                    etiquetas = [e for e, frases in self.ejemplos.items() for _ in frases]
+                    frases = [f for fs in self.ejemplos.values() for f in fs]
+                    vectores = self._embeddings().embed_documents(frases)
+                    self._etiquetas = etiquetas
+                    self._matriz = _normalizar(np.array(vectores, dtype=np.float32))
+        return self._matriz, self._etiquetas
+
+    def _embeddings(self):
+        if self.embeddings is not None:
+            return self.embeddings
+        # src.rag carga el modelo de embeddings y FAISS: solo se importa al usarse
+        from src.rag import get_embeddings
+        return get_embeddings()
+
+
+def _normalizar(vectores):
+    normas = np.linalg.norm(vectores, axis=1, keepdims=True)
+    return vectores / np.maximum(normas, 1e-12)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router():
+    """Clasificador compartido por todas las sesiones"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = IntentRouter()
+    return _router
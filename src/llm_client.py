@@ -0,0 +1,182 @@
+"""
+Clientes HTTP compartidos para las llamadas al LLM (OpenRouter).
+
+Cada ChatOpenAI creaba sus propios clientes y, con ellos, sus propias conexiones
+(y handshakes TLS). Aquí se crean una sola vez por proceso:
+- Pool de conexiones keep-alive (HTTP/2 si está instalado `h2`: varias peticiones
+  concurrentes por la misma conexión) con límites y timeouts configurables.
+- Reintentos con backoff exponencial (y Retry-After) ante 408/409/429/5xx y
+  errores de conexión: los del SDK de OpenAI, configurados con RRHH_LLM_MAX_RETRIES.
+- Hedging opcional (RRHH_LLM_HEDGING=1, solo cliente async): si la respuesta no
+  llega antes del p95 de las latencias recientes se lanza una segunda petición
+  idéntica y se usa la que responda primero.
+
+RRHH_LLM_BASE_URL permite apuntar a otro servidor compatible con la API de OpenAI
+(p. ej. uno local para pruebas).
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+import httpx
+
+LLM_BASE_URL = os.environ.get("RRHH_LLM_BASE_URL", "https://openrouter.ai/api/v1")
+
+# Timeouts (segundos). read es el máximo entre dos fragmentos de la respuesta
+CONNECT_TIMEOUT = float(os.environ.get("RRHH_LLM_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("RRHH_LLM_READ_TIMEOUT", "60"))
+WRITE_TIMEOUT = float(os.environ.get("RRHH_LLM_WRITE_TIMEOUT", "10"))
+POOL_TIMEOUT = float(os.environ.get("RRHH_LLM_POOL_TIMEOUT", "5"))
+
+# Pool de conexiones
+MAX_CONNECTIONS = int(os.environ.get("RRHH_LLM_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE = int(os.environ.get("RRHH_LLM_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.environ.get("RRHH_LLM_KEEPALIVE_EXPIRY", "120"))
+HTTP2 = os.environ.get("RRHH_LLM_HTTP2", "1").lower() in ("1", "true", "yes")
+
+MAX_RETRIES = int(os.environ.get("RRHH_LLM_MAX_RETRIES", "3"))
+
+# Hedging: duplica la petición si tarda más que el percentil indicado
+HEDGING = os.environ.get("RRHH_LLM_HEDGING", "0").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.environ.get("RRHH_LLM_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = 20      # sin suficientes muestras no se duplica nada
+HEDGE_WINDOW = 200          # latencias recientes que se tienen en cuenta
+
+_lock = threading.Lock()
+_client = None
+_async_client = None
+_h2 = None        # None = aún no comprobado
+
+
+def _timeout():
+    return httpx.Timeout(connect=CONNECT_TIMEOUT, read=READ_TIMEOUT, write=WRITE_TIMEOUT, pool=POOL_TIMEOUT)
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+
+
+def _http2():
+    global _h2
+    if _h2 is None:
+        try:
+            import h2  # noqa: F401
+            _h2 = True
+        except ImportError:
+            _h2 = False
+            if HTTP2:
+                print("⚠️ Paquete h2 no instalado: el cliente del LLM usa HTTP/1.1 con keep-alive")
+    return HTTP2 and _h2
+
+
+def get_http_client():
+    """Cliente síncrono compartido (p. ej. resúmenes de la memoria)"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = httpx.Client(http2=_http2(), limits=_limits(), timeout=_timeout())
+    return _client
+
+
+def get_async_http_client():
+    """
+    Cliente async compartido (turnos del chat). Sus conexiones quedan ligadas al
+    bucle de eventos en el que se abren: usarlo siempre desde src.agent.run_async.
+    """
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                transport = httpx.AsyncHTTPTransport(http2=_http2(), limits=_limits())
+                if HEDGING:
+                    transport = HedgingTransport(transport)
+                _async_client = httpx.AsyncClient(transport=transport, timeout=_timeout())
+    return _async_client
+
+
+class HedgingTransport(httpx.AsyncBaseTransport):
+    """
+    Transporte que lanza una segunda petición POST idéntica si la primera no ha
+    devuelto las cabeceras de respuesta antes del percentil `percentile` de las
+    latencias recientes. Se devuelve la primera respuesta válida; la otra se cancela.
+    """
+
+    def __init__(self, transport, percentile=HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES,
+                 window=HEDGE_WINDOW):
+        self.transport = transport
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.latencias = deque(maxlen=window)
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def threshold(self):
+        """Latencia (s) a partir de la cual se duplica la petición (None sin muestras suficientes)"""
+        if len(self.latencias) < self.min_samples:
+            return None
+        ordenadas = sorted(self.latencias)
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * self.percentile / 100))]
+
+    async def handle_async_request(self, request):
+        inicio = time.perf_counter()
+        umbral = self.threshold()
+        if umbral is None or request.method != "POST":
+            response = await self.transport.handle_async_request(request)
+            self.latencias.append(time.perf_counter() - inicio)
+            return response
+
+        await request.aread()
+        primera = asyncio.ensure_future(self.transport.handle_async_request(request))
+        try:
+            hechas, _ = await asyncio.wait({primera}, timeout=umbral)
+        except asyncio.CancelledError:
+            primera.cancel()
+            _descartar(primera)
+            raise
+        if hechas:
+            self.latencias.append(time.perf_counter() - inicio)
+            return primera.result()
+
+        self.hedged += 1
+        copia = httpx.Request(
+            request.method, request.url, headers=request.headers, content=request.content,
+            extensions=request.extensions
+        )
+        segunda = asyncio.ensure_future(self.transport.handle_async_request(copia))
+        pendientes = {primera, segunda}
+        try:
+            while pendientes:
+                hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                correctas = [t for t in hechas if t.exception() is None]
+                if correctas:
+                    ganadora = correctas[0]
+                    if ganadora is segunda:
+                        self.hedge_wins += 1
+                    self.latencias.append(time.perf_counter() - inicio)
+                    for otra in hechas - {ganadora}:
+                        _descartar(otra)
+                    return ganadora.result()
+                # Si una falla se espera a la otra; si fallan las dos se propaga el error
+                if not pendientes:
+                    return hechas.pop().result()
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
+                _descartar(tarea)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _descartar(tarea):
+    """Cierra la respuesta de una petición duplicada que no se va a usar"""
+    def cerrar(t):
+        if not t.cancelled() and t.exception() is None:
+            asyncio.ensure_future(t.result().aclose())
+    tarea.add_done_callback(cerrar)
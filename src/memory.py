@@ -0,0 +1,153 @@
+"""
+Memoria conversacional con presupuesto de tokens.
+
+ConversationBufferMemory reenviaba al LLM todo el historial en cada turno, así que
+las sesiones largas eran cada vez más lentas y caras. BoundedConversationMemory
+mantiene el historial que va en el prompt por debajo de RRHH_MEMORY_TOKENS:
+- Ventana de los turnos más recientes que caben en el presupuesto (el último
+  turno siempre se conserva).
+- Los turnos que salen de la ventana se resumen de forma incremental en segundo
+  plano (resumen anterior + turnos nuevos -> resumen nuevo), sin bloquear la
+  respuesta. Mientras el resumen se actualiza, esos turnos no van en el prompt.
+- Solo se guardan la pregunta y la respuesta final: las salidas de las
+  herramientas (chunks, listados) nunca entran en el historial, y las respuestas
+  muy largas se recortan a RRHH_MEMORY_MESSAGE_TOKENS.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, get_buffer_string
+from pydantic import PrivateAttr
+from src.context_packer import count_tokens, truncate_tokens
+
+MEMORY_TOKENS = int(os.environ.get("RRHH_MEMORY_TOKENS", "1500"))
+SUMMARY_TOKENS = int(os.environ.get("RRHH_MEMORY_SUMMARY_TOKENS", "300"))
+MESSAGE_TOKENS = int(os.environ.get("RRHH_MEMORY_MESSAGE_TOKENS", "500"))
+
+SUMMARY_PROMPT = """Resume de forma progresiva la conversación entre un empleado y el asistente de RRHH.
+Parte del resumen actual y añade la información de los nuevos mensajes. Conserva los datos
+concretos (fechas, días, importes, identificadores de solicitudes o bajas) y las peticiones
+que sigan abiertas. Escribe un único párrafo breve en el idioma de la conversación.
+
+Resumen actual:
+{summary}
+
+Nuevos mensajes:
+{new_lines}
+
+Resumen nuevo:"""
+
+# Hilos compartidos por todas las sesiones para generar los resúmenes
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rrhh-memory")
+
+
+class BoundedConversationMemory(BaseChatMemory):
+    """
+    Memoria para AgentExecutor (chat_history como lista de mensajes) que no
+    supera max_token_limit tokens: resumen de lo antiguo + turnos recientes.
+    Sin llm no se resume: los turnos antiguos simplemente se descartan.
+    """
+
+    llm: Optional[Any] = None
+    memory_key: str = "chat_history"
+    max_token_limit: int = MEMORY_TOKENS
+    summary_token_limit: int = SUMMARY_TOKENS
+    message_token_limit: int = MESSAGE_TOKENS
+    summary: str = ""
+    return_messages: bool = True
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _pendientes: List[Any] = PrivateAttr(default_factory=list)
+    _resumiendo: bool = PrivateAttr(default=False)
+    _generacion: int = PrivateAttr(default=0)   # cambia con clear(): se descartan resúmenes en curso
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            mensajes = list(self.chat_memory.messages)
+            resumen = self.summary
+        if resumen:
+            mensajes.insert(0, SystemMessage(content=_texto_resumen(resumen)))
+        return {self.memory_key: mensajes}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        entrada, salida = self._get_input_output(inputs, outputs)
+        with self._lock:
+            self.chat_memory.add_messages([
+                HumanMessage(content=truncate_tokens(entrada, self.message_token_limit)),
+                AIMessage(content=truncate_tokens(salida, self.message_token_limit)),
+            ])
+            self._podar()
+        self._lanzar_resumen()
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        self.save_context(inputs, outputs)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.chat_memory.clear()
+            self.summary = ""
+            self._pendientes.clear()
+            self._generacion += 1
+
+    async def aclear(self) -> None:
+        self.clear()
+
+    def token_count(self):
+        """Tokens del historial que se envía al LLM (resumen + ventana)"""
+        return sum(count_tokens(m.content) for m in self.load_memory_variables({})[self.memory_key])
+
+    def _podar(self):
+        """Saca de la ventana los turnos más antiguos hasta que quepa en el presupuesto (con el lock)"""
+        disponibles = self.max_token_limit - (count_tokens(_texto_resumen(self.summary)) if self.summary else 0)
+        mensajes = list(self.chat_memory.messages)
+        tokens = [count_tokens(m.content) for m in mensajes]
+        inicio = 0
+        while len(mensajes) - inicio > 2 and sum(tokens[inicio:]) > disponibles:
+            inicio += 2   # turno completo: pregunta + respuesta
+        if inicio:
+            self._pendientes.extend(mensajes[:inicio])
+            self.chat_memory.messages = mensajes[inicio:]
+
+    def _lanzar_resumen(self):
+        with self._lock:
+            if self._resumiendo or not self._pendientes:
+                return
+            if self.llm is None:
+                self._pendientes.clear()
+                return
+            lote, self._pendientes = self._pendientes, []
+            resumen = self.summary
+            self._resumiendo = True
+            generacion = self._generacion
+        _executor.submit(self._resumir, resumen, lote, generacion)
+
+    def _resumir(self, resumen, lote, generacion):
+        nuevo = None
+        try:
+            respuesta = self.llm.invoke(
+                SUMMARY_PROMPT.format(summary=resumen or "(vacío)", new_lines=get_buffer_string(lote)),
+                max_tokens=self.summary_token_limit
+            )
+            nuevo = truncate_tokens(respuesta.content.strip(), self.summary_token_limit)
+        except Exception as e:
+            # Los turnos ya no estaban en el prompt: se pierden, pero la sesión sigue
+            print(f"⚠️ No se pudo resumir el historial: {e}")
+        finally:
+            with self._lock:
+                if nuevo is not None and generacion == self._generacion:
+                    self.summary = nuevo
+                    # Un resumen más largo deja menos sitio a la ventana
+                    self._podar()
+                self._resumiendo = False
+        # Turnos que salieron de la ventana mientras se resumía
+        self._lanzar_resumen()
+
+
+def _texto_resumen(resumen):
+    return f"Resumen de la conversación anterior:\n{resumen}"
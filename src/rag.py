@@ -1,95 +1,219 @@
+import asyncio
 import os
-from langchain.retrievers import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
-from langchain_community.document_loaders import UnstructuredMarkdownLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+from src.bm25_store import make_retriever
+from src.context_packer import get_tokenizer, tokenizer_ready
+from src.embedding_cache import CachedEmbeddings
+from src.indexing import DB_PATH, index_version, sync_index
+from src.rerank import RERANK_CANDIDATES, RERANK_ENABLED, RERANK_TOP_K, RerankRetriever, get_cross_encoder
+from src.retrieval_cache import CachedRetriever, RetrievalCache
+
+EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# Búsqueda híbrida: documentos por buscador y peso de cada uno en la fusión (BM25, FAISS)
+RETRIEVAL_K = int(os.environ.get("RRHH_RAG_K", "3"))
+RETRIEVAL_WEIGHTS = tuple(float(w) for w in os.environ.get("RRHH_RAG_WEIGHTS", "0.5,0.5").split(","))
+RRF_C = 60
+
+# Hilos para lanzar BM25 y FAISS a la vez (FAISS y el modelo de embeddings liberan el GIL)
+SEARCH_WORKERS = 4
+
+# Recursos compartidos por todo el proceso (todas las sesiones de Streamlit).
+# El modelo de embeddings y el retriever son de solo lectura una vez construidos,
+# así que basta con proteger su creación/recarga con un lock.
+_lock = threading.RLock()
+_embeddings = None
+_retriever = None
+_index_version = None
+_warmup_thread = None
+
+# Resultados de búsqueda recientes (clave: versión del índice + consulta normalizada)
+_retrieval_cache = RetrievalCache()
+_search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="rag-search")
+
+
+def get_embeddings():
+    """
+    Devuelve el modelo de embeddings compartido (se carga una sola vez por proceso).
+    Va detrás de una caché en disco: los chunks ya vistos y las preguntas repetidas
+    no vuelven a pasar por el modelo.
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                _embeddings = CachedEmbeddings(
+                    HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
+                    model_name=EMBEDDING_MODEL
+                )
+    return _embeddings
 
-# Configuración de rutas
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DOCS_DIR = os.path.join(BASE_DIR, "docs")
-DB_PATH = os.path.join(BASE_DIR, "faiss_db")
 
 def get_retriever():
     """
-    Inicializa y devuelve el retriever configurado.
+    Devuelve el retriever híbrido compartido por todo el proceso.
+    La primera llamada lo construye (carga o crea la base de datos vectorial);
+    las siguientes devuelven la misma instancia.
+    """
+    global _retriever, _index_version
+    if _retriever is None:
+        with _lock:
+            if _retriever is None:
+                _retriever, _index_version = _build_retriever()
+    return _retriever
+
+
+def get_index_version():
+    """
+    Versión del índice que usa el retriever actual (hash del contenido de docs/).
+    Las cachés que dependen de los documentos la usan para invalidarse.
+    None si el retriever aún no se ha cargado.
+    """
+    return _index_version
+
+
+def get_retrieval_cache():
+    """Caché de resultados del retriever (p. ej. para consultar stats())"""
+    return _retrieval_cache
+
+
+def warmup(background=False):
+    """
+    Precarga el modelo de embeddings, el retriever y el tokenizador del empaquetado
+    de contexto (que puede necesitar descargarse).
+    Con background=True lo hace en un hilo aparte para no bloquear la interfaz;
+    llamadas repetidas no lanzan cargas duplicadas.
+    """
+    global _warmup_thread
+    if _retriever is not None and tokenizer_ready():
+        return
+    if not background:
+        _precargar()
+        return
+    with _lock:
+        if _warmup_thread is None or not _warmup_thread.is_alive():
+            _warmup_thread = threading.Thread(target=_precargar, name="rag-warmup", daemon=True)
+            _warmup_thread.start()
+
+
+def _precargar():
+    try:
+        get_retriever()
+    finally:
+        get_tokenizer()
+
+
+def reload_retriever():
+    """
+    Reconstruye el retriever (p. ej. tras cambiar la documentación) y lo sustituye
+    de forma atómica. Las sesiones que ya tengan la instancia anterior siguen usándola
+    hasta que vuelvan a pedirla con get_retriever().
+    """
+    global _retriever, _index_version
+    with _lock:
+        nuevo, version = _build_retriever()
+        _retriever, _index_version = nuevo, version
+    return nuevo
+
+
+def _build_retriever(k=RETRIEVAL_K, weights=RETRIEVAL_WEIGHTS):
+    """
+    Inicializa el retriever configurado.
     Si la base de datos ya existe, la carga. Si no, la crea.
-    Usa Hybrid Search (BM25 + FAISS) para mejor precisión.
+    Usa Hybrid Search (BM25 + FAISS) para mejor precisión: k documentos de cada
+    buscador, fusionados con los pesos indicados (y re-ranking opcional, ver src.rerank).
+    Las búsquedas pasan por la caché de resultados del proceso.
+    Devuelve (retriever, versión del índice).
     """
-    # 1. Usar Embeddings Multilingües más potentes
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
-    
-    # Verificamos si ya existe la DB persistida
-    index_path = os.path.join(DB_PATH, "index")
+    # 1. Usar Embeddings Multilingües más potentes (compartidos en el proceso)
+    embeddings = get_embeddings()
     
-    # NOTA: Para desarrollo, forzamos la recreación si hay nuevos archivos
-    if os.path.exists(index_path + ".faiss"):
-        print("Cargando base de datos vectorial existente...")
-        vectorstore = FAISS.load_local(
-            DB_PATH,
-            embeddings,
-            allow_dangerous_deserialization=True
-        )
-        
-        # Necesitamos cargar los documentos originales para BM25 también
-        # En un sistema real, guardaríamos el índice BM25 persistido también
-        # Aquí lo reconstruimos rápido (es memoria)
-        docs = _load_docs()
-        splits = _split_docs(docs)
-        
-    else:
-        print("Inicializando base de datos vectorial...")
-        docs = _load_docs()
-        splits = _split_docs(docs)
-        
-        vectorstore = FAISS.from_documents(
-            documents=splits,
-            embedding=embeddings
-        )
-        
-        # Guardar la base de datos
-        os.makedirs(DB_PATH, exist_ok=True)
-        vectorstore.save_local(DB_PATH)
+    # Sincronizar faiss_db/ con docs/: en arranque en caliente solo se carga;
+    # si algún fichero ha cambiado se re-indexan únicamente sus chunks
+    vectorstore, bm25, doc_ids = sync_index(embeddings)
     
+    # Con re-ranking se recupera un conjunto de candidatos más amplio
+    if RERANK_ENABLED:
+        k = max(k, RERANK_CANDIDATES)
+
     # 2. Configurar Retrievers
-    # BM25 (Keyword Search)
-    bm25_retriever = BM25Retriever.from_documents(splits)
-    bm25_retriever.k = 3
+    # BM25 (Keyword Search): solo lee de chunks.sqlite el texto de los k mejores
+    bm25_retriever = make_retriever(bm25, doc_ids, vectorstore.docstore, k=k)
     
     # FAISS (Semantic Search)
-    faiss_retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
+    faiss_retriever = vectorstore.as_retriever(search_kwargs={"k": k})
     
-    # 3. Ensemble (Hybrid Search)
-    ensemble_retriever = EnsembleRetriever(
+    # 3. Hybrid Search: ambas búsquedas en paralelo y fusión RRF ponderada
+    hybrid_retriever = HybridRetriever(
         retrievers=[bm25_retriever, faiss_retriever],
-        weights=[0.5, 0.5]
+        weights=list(weights)
     )
+    retriever = hybrid_retriever
+
+    # 3b. Re-ranking opcional con cross-encoder (presupuesto de latencia acotado)
+    if RERANK_ENABLED:
+        retriever = RerankRetriever(retriever=hybrid_retriever, model=get_cross_encoder(), top_k=RERANK_TOP_K)
     
-    return ensemble_retriever
-
-def _load_docs():
-    """Helper para cargar documentos"""
-    if not os.path.exists(DOCS_DIR):
-        raise FileNotFoundError(f"No se encontró el directorio de documentación en: {DOCS_DIR}")
-        
-    docs = []
-    for filename in os.listdir(DOCS_DIR):
-        if filename.endswith(".md"):
-            file_path = os.path.join(DOCS_DIR, filename)
-            loader = UnstructuredMarkdownLoader(file_path)
-            docs.extend(loader.load())
-    
-    if not docs:
-        raise ValueError("No se encontraron documentos .md en el directorio docs/")
-    return docs
-
-def _split_docs(docs):
-    """Helper para dividir documentos"""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    return text_splitter.split_documents(docs)
+    # 4. Caché de resultados: las consultas repetidas no vuelven a ejecutar BM25 + FAISS
+    version = index_version(DB_PATH)
+    retriever = CachedRetriever(retriever=retriever, cache=_retrieval_cache, version=version)
+
+    return retriever, version
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Búsqueda híbrida: lanza los retrievers a la vez en un pool de hilos y fusiona
+    sus resultados con Reciprocal Rank Fusion ponderada (como EnsembleRetriever,
+    que los ejecuta uno detrás de otro). La latencia es la del más lento.
+    """
 
+    retrievers: List[BaseRetriever]
+    weights: List[float]
+    c: int = RRF_C
 
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        futuros = [
+            _search_executor.submit(
+                r.invoke, query, {"callbacks": run_manager.get_child(tag=f"retriever_{i + 1}")}
+            )
+            for i, r in enumerate(self.retrievers)
+        ]
+        return reciprocal_rank_fusion([f.result() for f in futuros], self.weights, self.c)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        loop = asyncio.get_running_loop()
+        # En los hilos del pool se ejecuta r.invoke (síncrono): necesita los callbacks síncronos
+        callbacks = run_manager.get_sync()
+        resultados = await asyncio.gather(*[
+            loop.run_in_executor(
+                _search_executor, r.invoke, query, {"callbacks": callbacks.get_child(tag=f"retriever_{i + 1}")}
+            )
+            for i, r in enumerate(self.retrievers)
+        ])
+        return reciprocal_rank_fusion(resultados, self.weights, self.c)
+
+
+def reciprocal_rank_fusion(doc_lists, weights, c=RRF_C):
+    """
+    Fusiona listas de documentos ordenadas: puntuación = sum(peso / (posición + c)).
+    Los duplicados (mismo contenido) se unen; se devuelven de mayor a menor puntuación.
+    """
+    puntuaciones = {}
+    documentos = {}
+    for docs, peso in zip(doc_lists, weights):
+        for posicion, doc in enumerate(docs, start=1):
+            clave = doc.page_content
+            puntuaciones[clave] = puntuaciones.get(clave, 0.0) + peso / (posicion + c)
+            documentos.setdefault(clave, doc)
+    return [documentos[clave] for clave in sorted(puntuaciones, key=puntuaciones.get, reverse=True)]
@@ -0,0 +1,48 @@
+import json
+import os
+import threading
+
+
+class JsonRepository:
+    """
+    Vista en memoria de un fichero JSON (lista de registros) indexada por clave.
+
+    El fichero se parsea una sola vez y se mantiene un diccionario clave -> registro
+    para búsquedas O(1). Antes de cada consulta se comprueba el mtime/tamaño del
+    fichero: si otro proceso o sesión lo ha reescrito, se vuelve a cargar.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self._lock = threading.Lock()
+        self._firma = None
+        self._datos = ([], {})  # (registros, índice por clave): se sustituyen juntos
+
+    def get(self, id_registro):
+        """Devuelve una copia del registro con esa clave o None si no existe"""
+        registro = self._cargar()[1].get(id_registro)
+        return dict(registro) if registro is not None else None
+
+    def all(self):
+        """Devuelve copias de todos los registros (en el orden del fichero)"""
+        return [dict(r) for r in self._cargar()[0]]
+
+    def invalidate(self):
+        """Fuerza la recarga en la siguiente consulta"""
+        with self._lock:
+            self._firma = None
+
+    def _cargar(self):
+        # Lanza FileNotFoundError si el fichero no existe (las tools lo gestionan)
+        st = os.stat(self.path)
+        firma = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if firma != self._firma:
+            with self._lock:
+                if firma != self._firma:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        registros = json.load(f)
+                    self._datos = (registros, {r[self.key]: r for r in registros})
+                    self._firma = firma
+        return self._datos
+
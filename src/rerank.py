@@ -0,0 +1,116 @@
+"""
+Re-ranking opcional de los resultados de la búsqueda híbrida con un cross-encoder.
+
+Se activa con RRHH_RERANK=1. La búsqueda híbrida recupera un conjunto más amplio
+de candidatos (RRHH_RERANK_CANDIDATES por buscador), el cross-encoder puntúa cada
+par (consulta, chunk) por lotes en CPU y se devuelven los RRHH_RERANK_TOP_K mejores.
+Si la puntuación no termina dentro del presupuesto (RRHH_RERANK_BUDGET_MS), el
+modelo no está disponible o todavía se está terminando un re-ranking anterior que
+agotó su presupuesto, se devuelve el orden de la fusión.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Any, List
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+RERANK_ENABLED = os.environ.get("RRHH_RERANK", "0").lower() in ("1", "true", "yes")
+# Cross-encoder multilingüe pequeño (MiniLM, ~120 MB)
+RERANK_MODEL = os.environ.get("RRHH_RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+RERANK_CANDIDATES = int(os.environ.get("RRHH_RERANK_CANDIDATES", "10"))
+RERANK_TOP_K = int(os.environ.get("RRHH_RERANK_TOP_K", "3"))
+RERANK_BUDGET_MS = int(os.environ.get("RRHH_RERANK_BUDGET_MS", "300"))
+RERANK_BATCH_SIZE = 16
+
+_lock = threading.Lock()
+_model = None
+_model_error = None
+# Un único hilo: el modelo ya usa varios núcleos y así no se acumulan re-rankings
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+# Libre si no hay un re-ranking en marcha. Cuando uno agota el presupuesto, su lote
+# actual sigue ocupando el hilo: las consultas que llegan mientras tanto no esperan
+# detrás, usan directamente el orden de la fusión
+_ocupado = threading.Semaphore(1)
+
+
+def get_cross_encoder():
+    """Cross-encoder compartido por el proceso (None si no se puede cargar)"""
+    global _model, _model_error
+    if _model is None and _model_error is None:
+        with _lock:
+            if _model is None and _model_error is None:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    _model = CrossEncoder(RERANK_MODEL, device="cpu")
+                except Exception as e:
+                    _model_error = e
+                    print(f"⚠️ Re-ranking desactivado: no se pudo cargar {RERANK_MODEL} ({e})")
+    return _model
+
+
+class RerankRetriever(BaseRetriever):
+    """
+    Reordena los candidatos de `retriever` con un cross-encoder y devuelve los top_k.
+    Con el presupuesto agotado se devuelven los top_k en el orden original.
+    """
+
+    retriever: BaseRetriever
+    model: Any = None
+    top_k: int = RERANK_TOP_K
+    budget_ms: int = RERANK_BUDGET_MS
+    batch_size: int = RERANK_BATCH_SIZE
+    reranked: int = 0
+    fallbacks: int = 0
+    skipped: int = 0      # fallbacks por haber otro re-ranking en marcha
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        inicio = time.perf_counter()
+        candidatos = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        if self.model is None or len(candidatos) <= 1:
+            return candidatos[:self.top_k]
+
+        if not _ocupado.acquire(blocking=False):
+            self.skipped += 1
+            self.fallbacks += 1
+            return candidatos[:self.top_k]
+
+        # El presupuesto cubre la búsqueda y el re-ranking
+        limite = inicio + self.budget_ms / 1000
+        cancelado = threading.Event()
+        try:
+            futuro = _executor.submit(self._puntuar, query, candidatos, limite, cancelado)
+        except Exception:
+            _ocupado.release()
+            raise
+        try:
+            puntuaciones = futuro.result(timeout=max(0.0, limite - time.perf_counter()))
+        except TimeoutError:
+            puntuaciones = None
+            cancelado.set()
+        if puntuaciones is None:
+            self.fallbacks += 1
+            return candidatos[:self.top_k]
+
+        self.reranked += 1
+        orden = sorted(range(len(candidatos)), key=lambda i: puntuaciones[i], reverse=True)
+        return [candidatos[i] for i in orden[:self.top_k]]
+
+    def _puntuar(self, query, candidatos, limite, cancelado):
+        """Puntúa por lotes; abandona (None) si se cancela o se pasa del límite"""
+        try:
+            pares = [(query, d.page_content) for d in candidatos]
+            puntuaciones = []
+            for i in range(0, len(pares), self.batch_size):
+                if cancelado.is_set() or time.perf_counter() > limite:
+                    return None
+                lote = self.model.predict(pares[i:i + self.batch_size], batch_size=self.batch_size,
+                                          show_progress_bar=False)
+                puntuaciones.extend(float(p) for p in lote)
+            return puntuaciones
+        finally:
+            _ocupado.release()
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from src.embedding_cache import normalize_text
+
+# Límites de la caché de resultados
+MAX_ENTRIES = 4_096
+MAX_BYTES = 32 * 1024 * 1024   # tamaño aproximado (texto de los chunks + metadatos)
+TTL_SECONDS = 3_600
+
+
+class RetrievalCache:
+    """
+    Caché LRU con caducidad (TTL) de resultados de búsqueda.
+
+    - Clave: (versión del índice, consulta normalizada). Al reindexar cambia la
+      versión, así que los resultados antiguos no se vuelven a servir y acaban
+      expulsados por LRU.
+    - Límite por número de entradas y por tamaño aproximado en memoria.
+    - Métricas de aciertos con stats().
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()   # clave -> (caduca, tamaño en bytes, documentos)
+        self._bytes = 0
+
+    def get(self, version, query):
+        clave = (version, normalize_text(query))
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    self._quitar(clave)
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            return list(entrada[2])
+
+    def put(self, version, query, docs):
+        clave = (version, normalize_text(query))
+        bytes_docs = sum(_bytes_doc(d) for d in docs)
+        if bytes_docs > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (time.monotonic() + self.ttl, bytes_docs, list(docs))
+            self._bytes += bytes_docs
+            while len(self._entradas) > self.max_entries or self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entradas),
+                "bytes": self._bytes,
+            }
+
+    def _quitar(self, clave):
+        _, bytes_entrada, _ = self._entradas.pop(clave)
+        self._bytes -= bytes_entrada
+
+
+def _bytes_doc(doc):
+    return len(doc.page_content.encode("utf-8")) + sum(len(str(k)) + len(str(v)) for k, v in doc.metadata.items())
+
+
+class CachedRetriever(BaseRetriever):
+    """Retriever que consulta la caché de resultados antes de delegar en el retriever real"""
+
+    retriever: BaseRetriever
+    cache: Any
+    version: Optional[str] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self.cache.get(self.version, query)
+        if docs is None:
+            docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+            self.cache.put(self.version, query, docs)
+        return docs
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self.cache.get(self.version, query)
+        if docs is None:
+            docs = await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+            self.cache.put(self.version, query, docs)
+        return docs
@@ -0,0 +1,35 @@
+"""
+Capa de almacenamiento de datos de RRHH (empleados, vacaciones, bajas, nóminas).
+
+El backend se elige con la variable de entorno RRHH_STORAGE:
+- "json" (por defecto): ficheros de src/data/
+- "sqlite": base de datos SQLite (ruta en RRHH_SQLITE_PATH, por defecto src/data/rrhh.sqlite).
+  Se inicializa desde los JSON con: python -m src.storage.importer
+"""
+import os
+import threading
+from src.storage.base import Storage
+from src.storage.json_store import JsonStorage
+from src.storage.sqlite_store import SQLITE_PATH, SqliteStorage
+
+_lock = threading.Lock()
+_storage = None
+
+
+def get_storage():
+    """Devuelve el backend de almacenamiento compartido por el proceso"""
+    global _storage
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                backend = os.environ.get("RRHH_STORAGE", "json").lower()
+                if backend == "sqlite":
+                    _storage = SqliteStorage(os.environ.get("RRHH_SQLITE_PATH", SQLITE_PATH))
+                elif backend == "json":
+                    _storage = JsonStorage()
+                else:
+                    raise ValueError(f"Backend de almacenamiento desconocido: {backend} (usa 'json' o 'sqlite')")
+    return _storage
+
+
+__all__ = ["Storage", "JsonStorage", "SqliteStorage", "get_storage"]
@@ -0,0 +1,75 @@
+import abc
+
+
+class Storage(abc.ABC):
+    """
+    Interfaz común de almacenamiento de datos de RRHH.
+
+    Las tools y la app solo hablan con esta interfaz; el backend concreto
+    (ficheros JSON o SQLite) se elige en src.storage.get_storage().
+    Todos los métodos devuelven diccionarios con el mismo formato que los
+    registros de los JSON originales de src/data/.
+    """
+
+    # ---------- Empleados ----------
+    @abc.abstractmethod
+    def get_empleado(self, id_empleado):
+        """Devuelve el empleado o None si no existe"""
+
+    @abc.abstractmethod
+    def listar_empleados(self):
+        """Devuelve todos los empleados"""
+
+    @abc.abstractmethod
+    def actualizar_empleado(self, id_empleado, **campos):
+        """Actualiza campos del empleado. Devuelve el empleado actualizado o None"""
+
+    # ---------- Solicitudes de vacaciones ----------
+    @abc.abstractmethod
+    def crear_solicitud_vacaciones(self, solicitud):
+        """Guarda una solicitud nueva asignándole id_solicitud. Devuelve la solicitud guardada"""
+
+    @abc.abstractmethod
+    def listar_solicitudes_vacaciones(self, id_empleado=None, estado=None):
+        """Solicitudes filtradas opcionalmente por empleado y/o estado"""
+
+    @abc.abstractmethod
+    def aprobar_solicitud_vacaciones(self, id_solicitud):
+        """
+        Marca una solicitud pendiente como aprobada y descuenta los días al empleado.
+        Devuelve la solicitud o None si no existe o ya no está pendiente.
+        """
+
+    @abc.abstractmethod
+    def rechazar_solicitud_vacaciones(self, id_solicitud):
+        """Marca una solicitud pendiente como rechazada. Devuelve la solicitud o None"""
+
+    # ---------- Bajas médicas ----------
+    @abc.abstractmethod
+    def crear_baja_medica(self, baja):
+        """Guarda una baja nueva asignándole id_baja. Devuelve la baja guardada"""
+
+    @abc.abstractmethod
+    def listar_bajas_medicas(self, id_empleado, estado=None, desde=None, hasta=None):
+        """
+        Bajas del empleado ordenadas por fecha de inicio. Filtros opcionales:
+        estado, desde (date: empiezan a partir de esa fecha) y
+        hasta (date: tienen fecha de fin y terminan como muy tarde ese día).
+        """
+
+    @abc.abstractmethod
+    def buscar_baja_solapada(self, id_empleado, inicio, fin=None):
+        """
+        Devuelve una baja activa del empleado que impide registrar una nueva
+        en [inicio, fin] (fechas date; fin=None es una baja abierta), o None.
+        Una baja activa abierta (sin fecha de fin) siempre lo impide.
+        """
+
+    @abc.abstractmethod
+    def actualizar_baja_medica(self, id_baja, **campos):
+        """Actualiza campos de una baja. Devuelve la baja actualizada o None"""
+
+    # ---------- Nóminas ----------
+    @abc.abstractmethod
+    def listar_nominas(self, id_empleado):
+        """Nóminas del empleado"""
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+from datetime import datetime
+from src.storage.file_store import atomic_write_json, read_json
+
+# Tipos de evento
+CREATED = "created"
+APPROVED = "approved"
+REJECTED = "rejected"
+UPDATED = "updated"
+
+# Eventos en el log antes de compactarlo en el snapshot
+COMPACT_EVERY = 500
+
+
+class EventLog:
+    """
+    Colección persistida como snapshot JSON + log de eventos append-only (JSONL).
+
+    - Escritura: se añade una línea al log (coste constante, sin reescribir el JSON).
+    - Lectura: estado = snapshot + eventos del log. Se mantiene en memoria y solo
+      se leen los bytes nuevos del log desde la última consulta.
+    - Compactación: cada COMPACT_EVERY eventos se reescribe el snapshot y los
+      eventos pasan al fichero de auditoría <nombre>.audit.jsonl.
+
+    El snapshot conserva el formato original (lista de registros), así que el
+    resto de herramientas (importador, copias de seguridad) sigue funcionando.
+    Los eventos son idempotentes: reaplicarlos tras una compactación interrumpida
+    no cambia el estado.
+
+    Los métodos de escritura deben llamarse con el bloqueo del snapshot tomado
+    (file_lock(snapshot_path)).
+
+    listener (opcional): índice secundario que se mantiene en paralelo al estado;
+    recibe reset(registros) al cargar un snapshot y upsert(registro) por evento.
+    """
+
+    def __init__(self, snapshot_path, key, compact_every=COMPACT_EVERY, listener=None):
+        self.snapshot_path = snapshot_path
+        self.key = key
+        self.compact_every = compact_every
+        self.listener = listener
+        base = os.path.splitext(snapshot_path)[0]
+        self.log_path = base + ".log.jsonl"
+        self.audit_path = base + ".audit.jsonl"
+
+        self._lock = threading.Lock()
+        self._firma_snapshot = None
+        self._log_inode = None
+        self._offset = 0
+        self._eventos_en_log = 0
+        self._estado = {}
+
+    def records(self):
+        """Estado actual (copias de los registros en orden de creación)"""
+        with self._lock:
+            self._refrescar()
+            return [dict(r) for r in self._estado.values()]
+
+    def get(self, id_registro):
+        with self._lock:
+            self._refrescar()
+            registro = self._estado.get(id_registro)
+            return dict(registro) if registro is not None else None
+
+    def query(self, fn):
+        """Ejecuta fn(listener, estado) sobre el estado actualizado (p. ej. consultas al índice)"""
+        with self._lock:
+            self._refrescar()
+            return fn(self.listener, self._estado)
+
+    def append(self, tipo, id_registro, datos):
+        """Registra un evento (requiere el bloqueo del snapshot) y compacta si toca"""
+        evento = {
+            "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "tipo": tipo,
+            "id": id_registro,
+            "datos": datos,
+        }
+        linea = json.dumps(evento, ensure_ascii=False) + "\n"
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(linea)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock:
+            self._refrescar()
+            if self._eventos_en_log >= self.compact_every:
+                self._compactar()
+
+    def compact(self):
+        """Fuerza la compactación (requiere el bloqueo del snapshot)"""
+        with self._lock:
+            self._refrescar()
+            self._compactar()
+
+    # ---------- Internos (con self._lock tomado) ----------
+    def _refrescar(self):
+        firma = _firma(self.snapshot_path)
+        if firma != self._firma_snapshot:
+            # Snapshot nuevo (primera carga o compactación): estado desde cero
+            self._estado = {r[self.key]: r for r in read_json(self.snapshot_path, default=[])}
+            if self.listener is not None:
+                self.listener.reset(self._estado.values())
+            self._firma_snapshot = firma
+            self._log_inode = None
+
+        if not os.path.exists(self.log_path):
+            self._log_inode, self._offset, self._eventos_en_log = None, 0, 0
+            return
+
+        inode = os.stat(self.log_path).st_ino
+        if inode != self._log_inode:
+            # Log rotado tras una compactación: empieza de cero
+            self._log_inode, self._offset, self._eventos_en_log = inode, 0, 0
+
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._offset)
+            nuevo = f.read()
+        # Solo líneas completas (un escritor puede estar a mitad de una línea)
+        completo = nuevo[:nuevo.rfind(b"\n") + 1]
+        for linea in completo.splitlines():
+            if linea.strip():
+                self._aplicar(json.loads(linea))
+                self._eventos_en_log += 1
+        self._offset += len(completo)
+
+    def _aplicar(self, evento):
+        if evento["tipo"] == CREATED:
+            self._estado[evento["id"]] = dict(evento["datos"])
+        elif evento["id"] in self._estado:
+            self._estado[evento["id"]].update(evento["datos"])
+        else:
+            return
+        if self.listener is not None:
+            self.listener.upsert(self._estado[evento["id"]])
+
+    def _compactar(self):
+        if not os.path.exists(self.log_path):
+            return
+        # 1. Snapshot con el estado actual
+        atomic_write_json(self.snapshot_path, list(self._estado.values()))
+        # 2. Mover los eventos al fichero de auditoría y rotar el log
+        with open(self.log_path, 'rb') as f:
+            eventos = f.read()
+        with open(self.audit_path, 'ab') as f:
+            f.write(eventos)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path = self.log_path + ".tmp"
+        open(tmp_path, 'wb').close()
+        os.replace(tmp_path, self.log_path)
+
+        self._firma_snapshot = _firma(self.snapshot_path)
+        self._log_inode = os.stat(self.log_path).st_ino
+        self._offset = 0
+        self._eventos_en_log = 0
+
+
+def _firma(path):
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
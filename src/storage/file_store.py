@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Bloqueo exclusivo entre procesos (y entre hilos) asociado a un fichero de datos.
+    Se usa un fichero auxiliar <path>.lock para no interferir con las lecturas:
+    los lectores nunca bloquean, solo se serializan los escritores.
+    """
+    with open(path + ".lock", 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            # LK_LOCK reintenta durante ~10 s; se repite hasta conseguirlo
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_json(path, default=None):
+    """Lee un fichero JSON; si no existe devuelve default"""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def atomic_write_json(path, data):
+    """
+    Escribe JSON de forma atómica: fichero temporal en el mismo directorio,
+    fsync y rename. Un lector concurrente ve el fichero antiguo o el nuevo
+    completo, nunca uno a medio escribir.
+    """
+    directorio = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directorio)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(directorio)
+
+
+def _fsync_dir(directorio):
+    # Persistir el rename (solo POSIX; en Windows no se pueden abrir directorios)
+    if fcntl is None:
+        return
+    fd = os.open(directorio, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class IdAllocator:
+    """
+    Generador de IDs monótonos (SOL001, BM001...) persistido en un fichero de contadores.
+    Cada asignación se hace bajo bloqueo entre procesos, así que dos sesiones que
+    crean registros a la vez nunca obtienen el mismo ID, y los IDs no se reutilizan
+    aunque se borren registros.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def next(self, prefijo, minimo=0):
+        """
+        Devuelve el siguiente número para el prefijo.
+        minimo: mayor número ya usado en los datos (para inicializar el contador
+        la primera vez o si el fichero de contadores se ha perdido). Puede ser
+        una función: solo se evalúa si el contador aún no existe.
+        """
+        with self._lock, file_lock(self.path):
+            contadores = read_json(self.path, default={})
+            if callable(minimo):
+                minimo = minimo() if prefijo not in contadores else 0
+            valor = max(contadores.get(prefijo, 0), minimo) + 1
+            contadores[prefijo] = valor
+            atomic_write_json(self.path, contadores)
+        return valor
+
+    def format(self, prefijo, numero):
+        return f"{prefijo}{str(numero).zfill(3)}"
+
+
+def max_id(registros, campo, prefijo):
+    """Mayor sufijo numérico de los IDs existentes con ese prefijo (0 si no hay)"""
+    maximo = 0
+    for r in registros:
+        id_registro = r.get(campo) or ""
+        sufijo = id_registro[len(prefijo):]
+        if id_registro.startswith(prefijo) and sufijo.isdigit():
+            maximo = max(maximo, int(sufijo))
+    return maximo
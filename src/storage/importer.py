@@ -0,0 +1,51 @@
+"""
+Importa los ficheros JSON de src/data/ a la base de datos SQLite.
+
+Uso:
+    python -m src.storage.importer [--db ruta.sqlite] [--data src/data]
+
+Es idempotente: los registros con el mismo id se sobrescriben.
+"""
+import argparse
+import json
+import os
+from src.storage.event_log import EventLog
+from src.storage.json_store import DATA_DIR
+from src.storage.sqlite_store import SQLITE_PATH, SqliteStorage
+
+
+def _leer(data_dir, nombre):
+    path = os.path.join(data_dir, nombre)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def importar_json(db_path=SQLITE_PATH, data_dir=DATA_DIR):
+    """Copia empleados, solicitudes, bajas y nóminas a SQLite. Devuelve el número de registros por tipo"""
+    datos = {
+        "empleados": _leer(data_dir, "empleados.json"),
+        # Estado completo: snapshot + eventos pendientes de compactar
+        "solicitudes": EventLog(os.path.join(data_dir, "solicitudes_vacaciones.json"), key="id_solicitud").records(),
+        "bajas": EventLog(os.path.join(data_dir, "bajas_medicas.json"), key="id_baja").records(),
+        "nominas": _leer(data_dir, "nominas.json"),
+    }
+    SqliteStorage(db_path).importar(**datos)
+    return {tipo: len(registros) for tipo, registros in datos.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa los JSON de src/data/ a SQLite")
+    parser.add_argument("--db", default=SQLITE_PATH, help="Ruta de la base de datos SQLite")
+    parser.add_argument("--data", default=DATA_DIR, help="Directorio con los JSON originales")
+    args = parser.parse_args(argv)
+
+    totales = importar_json(args.db, args.data)
+    print(f"✅ Importación completada en {args.db}")
+    for tipo, total in totales.items():
+        print(f"   {tipo}: {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+# Fin de un intervalo abierto (baja sin fecha de fin)
+ABIERTO = date.max
+
+
+class IntervalIndex:
+    """
+    Intervalos [inicio, fin] ordenados por inicio, con el máximo acumulado de los fines.
+
+    - solapado(inicio, fin): primer intervalo que se solapa, en O(log n).
+      Los candidatos son los que empiezan antes de `fin` (bisect); entre ellos
+      hay solapamiento si el máximo acumulado de fines llega a `inicio`, y el
+      primero que lo alcanza se localiza con otra búsqueda binaria.
+    - entradas(desde, hasta_inicio): rangos por fecha de inicio mediante bisect.
+    - add/remove: O(n) en los intervalos del índice (inserción en la lista y
+      recálculo del máximo acumulado desde esa posición). Cada índice guarda las
+      bajas de un solo empleado, así que n es pequeño y no compensa un árbol de
+      intervalos equilibrado.
+    """
+
+    def __init__(self):
+        self._entradas = []   # (inicio, fin, id) ordenadas
+        self._inicios = []
+        self._max_fin = []    # _max_fin[i] = max(fin de _entradas[0..i])
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def add(self, inicio, fin, id_registro):
+        entrada = (inicio, fin, id_registro)
+        pos = bisect_right(self._entradas, entrada)
+        self._entradas.insert(pos, entrada)
+        self._inicios.insert(pos, inicio)
+        self._recalcular_desde(pos)
+
+    def remove(self, inicio, fin, id_registro):
+        entrada = (inicio, fin, id_registro)
+        pos = bisect_left(self._entradas, entrada)
+        if pos == len(self._entradas) or self._entradas[pos] != entrada:
+            return
+        del self._entradas[pos]
+        del self._inicios[pos]
+        self._recalcular_desde(pos)
+
+    def solapado(self, inicio, fin=ABIERTO):
+        """Id del primer intervalo que se solapa con [inicio, fin] o None"""
+        candidatos = bisect_right(self._inicios, fin)
+        if candidatos == 0 or self._max_fin[candidatos - 1] < inicio:
+            return None
+        return self._entradas[bisect_left(self._max_fin, inicio, 0, candidatos)][2]
+
+    def entradas(self, desde=None, hasta_inicio=None):
+        """Entradas (inicio, fin, id) con desde <= inicio <= hasta_inicio, en orden"""
+        i = bisect_left(self._inicios, desde) if desde else 0
+        j = bisect_right(self._inicios, hasta_inicio) if hasta_inicio else len(self._inicios)
+        return self._entradas[i:j]
+
+    def _recalcular_desde(self, pos):
+        del self._max_fin[pos:]
+        acumulado = self._max_fin[pos - 1] if pos else date.min
+        for _, fin, _ in self._entradas[pos:]:
+            acumulado = max(acumulado, fin)
+            self._max_fin.append(acumulado)
+
+
+class BajasIndex:
+    """
+    Índices secundarios de bajas médicas por empleado, con fechas ya parseadas:
+    - todas: todas las bajas (consultas por rango de fechas)
+    - activas: bajas activas con fecha de fin (validación de solapamiento)
+    - abiertas: ids de bajas activas sin fecha de fin
+
+    Se mantiene de forma incremental desde la capa de datos (ver EventLog).
+    """
+
+    def __init__(self):
+        self._todas = {}
+        self._activas = {}
+        self._abiertas = {}
+        self._registradas = {}   # id_baja -> (id_empleado, inicio, fin, estado)
+
+    def reset(self, bajas):
+        self.__init__()
+        for baja in bajas:
+            self.upsert(baja)
+
+    def upsert(self, baja):
+        id_baja = baja["id_baja"]
+        inicio = date.fromisoformat(baja["fecha_inicio"])
+        fin = date.fromisoformat(baja["fecha_fin_estimada"]) if baja.get("fecha_fin_estimada") else None
+        clave = (baja["id_empleado"], inicio, fin, baja["estado"])
+        if self._registradas.get(id_baja) == clave:
+            return
+        self._quitar(id_baja)
+
+        id_empleado = baja["id_empleado"]
+        self._todas.setdefault(id_empleado, IntervalIndex()).add(inicio, fin or ABIERTO, id_baja)
+        if baja["estado"] == "activa":
+            if fin is None:
+                self._abiertas.setdefault(id_empleado, []).append(id_baja)
+            else:
+                self._activas.setdefault(id_empleado, IntervalIndex()).add(inicio, fin, id_baja)
+        self._registradas[id_baja] = clave
+
+    def solapamiento(self, id_empleado, inicio, fin=None):
+        """Id de una baja activa que impide registrar [inicio, fin] (o None)"""
+        abiertas = self._abiertas.get(id_empleado)
+        if abiertas:
+            return abiertas[0]
+        activas = self._activas.get(id_empleado)
+        return activas.solapado(inicio, fin or ABIERTO) if activas else None
+
+    def rango(self, id_empleado, desde=None, hasta=None):
+        """
+        Ids de bajas del empleado (orden por fecha de inicio) que empiezan a partir
+        de `desde` y/o que tienen fecha de fin y terminan como muy tarde en `hasta`.
+        """
+        todas = self._todas.get(id_empleado)
+        if not todas:
+            return []
+        # Una baja que termina antes de `hasta` también empieza antes de `hasta`
+        entradas = todas.entradas(desde=desde, hasta_inicio=hasta)
+        if hasta:
+            entradas = [e for e in entradas if e[1] != ABIERTO and e[1] <= hasta]
+        return [e[2] for e in entradas]
+
+    def _quitar(self, id_baja):
+        previo = self._registradas.pop(id_baja, None)
+        if previo is None:
+            return
+        id_empleado, inicio, fin, estado = previo
+        self._todas[id_empleado].remove(inicio, fin or ABIERTO, id_baja)
+        if estado == "activa":
+            if fin is None:
+                self._abiertas[id_empleado].remove(id_baja)
+            else:
+                self._activas[id_empleado].remove(inicio, fin, id_baja)
@@ -0,0 +1,140 @@
+import os
+from src.repository import JsonRepository
+from src.storage.base import Storage
+from src.storage.event_log import APPROVED, CREATED, REJECTED, UPDATED, EventLog
+from src.storage.interval_index import BajasIndex
+from src.storage.file_store import IdAllocator, atomic_write_json, file_lock, max_id, read_json
+
+# Configuración de rutas
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(BASE_DIR, "src", "data")
+
+
+class JsonStorage(Storage):
+    """
+    Backend sobre los ficheros JSON de src/data/ (formato original del proyecto).
+
+    Cada modificación se hace bajo un bloqueo entre procesos del fichero afectado.
+    Empleados se reescribe de forma atómica (temporal + fsync + rename).
+    Solicitudes de vacaciones y bajas médicas se guardan como snapshot JSON + log
+    de eventos append-only (ver EventLog): crear o actualizar un registro cuesta
+    una línea de log, no reescribir todo el fichero.
+    Las lecturas no toman el bloqueo: siempre ven datos completos.
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.empleados_path = os.path.join(data_dir, "empleados.json")
+        self.solicitudes_path = os.path.join(data_dir, "solicitudes_vacaciones.json")
+        self.bajas_path = os.path.join(data_dir, "bajas_medicas.json")
+        self.nominas_path = os.path.join(data_dir, "nominas.json")
+        self._ids = IdAllocator(os.path.join(data_dir, "contadores.json"))
+        self._empleados = JsonRepository(self.empleados_path, key="id")
+        self._solicitudes = EventLog(self.solicitudes_path, key="id_solicitud")
+        self._bajas = EventLog(self.bajas_path, key="id_baja", listener=BajasIndex())
+
+    # ---------- Empleados ----------
+    def get_empleado(self, id_empleado):
+        return self._empleados.get(id_empleado)
+
+    def listar_empleados(self):
+        return self._empleados.all()
+
+    def actualizar_empleado(self, id_empleado, **campos):
+        with file_lock(self.empleados_path):
+            empleados = self._leer(self.empleados_path)
+            empleado = next((e for e in empleados if e["id"] == id_empleado), None)
+            if empleado is None:
+                return None
+            empleado.update(campos)
+            self._escribir(self.empleados_path, empleados)
+        return dict(empleado)
+
+    # ---------- Solicitudes de vacaciones ----------
+    def crear_solicitud_vacaciones(self, solicitud):
+        with file_lock(self.solicitudes_path):
+            numero = self._ids.next(
+                "SOL", minimo=lambda: max_id(self._solicitudes.records(), "id_solicitud", "SOL")
+            )
+            nueva = {"id_solicitud": self._ids.format("SOL", numero), **solicitud}
+            self._solicitudes.append(CREATED, nueva["id_solicitud"], nueva)
+        return nueva
+
+    def listar_solicitudes_vacaciones(self, id_empleado=None, estado=None):
+        return [
+            s for s in self._solicitudes.records()
+            if (id_empleado is None or s["id_empleado"] == id_empleado)
+            and (estado is None or s["estado"] == estado)
+        ]
+
+    def aprobar_solicitud_vacaciones(self, id_solicitud):
+        # Orden de bloqueos fijo (solicitudes -> empleados) para evitar interbloqueos
+        with file_lock(self.solicitudes_path):
+            solicitud = self._cambiar_estado_solicitud(id_solicitud, APPROVED, "aprobada")
+            if solicitud:
+                with file_lock(self.empleados_path):
+                    empleados = self._leer(self.empleados_path)
+                    for emp in empleados:
+                        if emp["id"] == solicitud["id_empleado"]:
+                            emp["vacaciones_usadas"] += solicitud["dias_solicitados"]
+                            self._escribir(self.empleados_path, empleados)
+                            break
+        return solicitud
+
+    def rechazar_solicitud_vacaciones(self, id_solicitud):
+        with file_lock(self.solicitudes_path):
+            return self._cambiar_estado_solicitud(id_solicitud, REJECTED, "rechazada")
+
+    def _cambiar_estado_solicitud(self, id_solicitud, evento, estado):
+        # Requiere tener el bloqueo de solicitudes
+        solicitud = self._solicitudes.get(id_solicitud)
+        if solicitud is None or solicitud["estado"] != "pendiente":
+            return None
+        self._solicitudes.append(evento, id_solicitud, {"estado": estado})
+        solicitud["estado"] = estado
+        return solicitud
+
+    # ---------- Bajas médicas ----------
+    def crear_baja_medica(self, baja):
+        with file_lock(self.bajas_path):
+            numero = self._ids.next("BM", minimo=lambda: max_id(self._bajas.records(), "id_baja", "BM"))
+            nueva = {"id_baja": self._ids.format("BM", numero), **baja}
+            self._bajas.append(CREATED, nueva["id_baja"], nueva)
+        return nueva
+
+    def listar_bajas_medicas(self, id_empleado, estado=None, desde=None, hasta=None):
+        def consulta(indice, bajas):
+            return [
+                dict(bajas[id_baja]) for id_baja in indice.rango(id_empleado, desde, hasta)
+                if estado is None or bajas[id_baja]["estado"] == estado
+            ]
+        return self._bajas.query(consulta)
+
+    def buscar_baja_solapada(self, id_empleado, inicio, fin=None):
+        def consulta(indice, bajas):
+            id_baja = indice.solapamiento(id_empleado, inicio, fin)
+            return dict(bajas[id_baja]) if id_baja else None
+        return self._bajas.query(consulta)
+
+    def actualizar_baja_medica(self, id_baja, **campos):
+        with file_lock(self.bajas_path):
+            baja = self._bajas.get(id_baja)
+            if baja is None:
+                return None
+            self._bajas.append(UPDATED, id_baja, campos)
+            baja.update(campos)
+        return baja
+
+    # ---------- Nóminas ----------
+    def listar_nominas(self, id_empleado):
+        # Sin fichero de nóminas es un error de despliegue (FileNotFoundError)
+        nominas = read_json(self.nominas_path)
+        if nominas is None:
+            raise FileNotFoundError(self.nominas_path)
+        return [n for n in nominas if n["id_empleado"] == id_empleado]
+
+    # ---------- Helpers ----------
+    def _leer(self, path):
+        return read_json(path, default=[])
+
+    def _escribir(self, path, registros):
+        atomic_write_json(path, registros)
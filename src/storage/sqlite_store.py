@@ -0,0 +1,287 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import date
+from contextlib import contextmanager
+from src.storage.base import Storage
+
+# Configuración de rutas
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SQLITE_PATH = os.path.join(BASE_DIR, "src", "data", "rrhh.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS empleados (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    cargo TEXT,
+    rol TEXT,
+    vacaciones_totales INTEGER NOT NULL DEFAULT 0,
+    vacaciones_usadas INTEGER NOT NULL DEFAULT 0,
+    password TEXT,
+    foto_perfil TEXT
+);
+
+CREATE TABLE IF NOT EXISTS solicitudes_vacaciones (
+    id_solicitud TEXT PRIMARY KEY,
+    id_empleado TEXT NOT NULL,
+    nombre_empleado TEXT,
+    fecha_inicio TEXT NOT NULL,
+    fecha_fin TEXT NOT NULL,
+    dias_solicitados INTEGER NOT NULL,
+    comentarios TEXT,
+    estado TEXT NOT NULL,
+    fecha_solicitud TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_solicitudes_empleado_inicio ON solicitudes_vacaciones(id_empleado, fecha_inicio);
+CREATE INDEX IF NOT EXISTS idx_solicitudes_estado ON solicitudes_vacaciones(estado);
+
+CREATE TABLE IF NOT EXISTS bajas_medicas (
+    id_baja TEXT PRIMARY KEY,
+    id_empleado TEXT NOT NULL,
+    nombre_empleado TEXT,
+    fecha_inicio TEXT NOT NULL,
+    fecha_fin_estimada TEXT,
+    motivo TEXT,
+    tiene_justificante INTEGER NOT NULL DEFAULT 0,
+    estado TEXT NOT NULL,
+    fecha_reporte TEXT,
+    notas TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_bajas_empleado_inicio ON bajas_medicas(id_empleado, fecha_inicio);
+CREATE INDEX IF NOT EXISTS idx_bajas_estado ON bajas_medicas(estado);
+
+CREATE TABLE IF NOT EXISTS nominas (
+    id_nomina TEXT PRIMARY KEY,
+    id_empleado TEXT NOT NULL,
+    nombre_empleado TEXT,
+    mes TEXT NOT NULL,
+    salario_bruto REAL,
+    deducciones REAL,
+    salario_neto REAL,
+    fecha_pago TEXT,
+    conceptos TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_nominas_empleado_mes ON nominas(id_empleado, mes);
+
+-- Contadores para generar SOL001, BM001... sin recorrer las tablas
+CREATE TABLE IF NOT EXISTS contadores (
+    nombre TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+"""
+
+EMPLEADO_CAMPOS = ("id", "nombre", "cargo", "rol", "vacaciones_totales", "vacaciones_usadas", "password", "foto_perfil")
+SOLICITUD_CAMPOS = ("id_solicitud", "id_empleado", "nombre_empleado", "fecha_inicio", "fecha_fin",
+                    "dias_solicitados", "comentarios", "estado", "fecha_solicitud")
+BAJA_CAMPOS = ("id_baja", "id_empleado", "nombre_empleado", "fecha_inicio", "fecha_fin_estimada", "motivo",
+               "tiene_justificante", "estado", "fecha_reporte", "notas")
+NOMINA_CAMPOS = ("id_nomina", "id_empleado", "nombre_empleado", "mes", "salario_bruto", "deducciones",
+                 "salario_neto", "fecha_pago", "conceptos")
+
+
+class SqliteStorage(Storage):
+    """
+    Backend SQLite (modo WAL): las altas son inserciones indexadas y las consultas
+    por empleado usan índices, en lugar de reescribir/recorrer ficheros completos.
+    Cada hilo (sesión de Streamlit) usa su propia conexión.
+    """
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    # ---------- Empleados ----------
+    def get_empleado(self, id_empleado):
+        fila = self._conn().execute("SELECT * FROM empleados WHERE id = ?", (id_empleado,)).fetchone()
+        return dict(fila) if fila else None
+
+    def listar_empleados(self):
+        return [dict(f) for f in self._conn().execute("SELECT * FROM empleados ORDER BY rowid")]
+
+    def actualizar_empleado(self, id_empleado, **campos):
+        campos = {k: v for k, v in campos.items() if k in EMPLEADO_CAMPOS and k != "id"}
+        if campos:
+            with self._tx() as conn:
+                conn.execute(
+                    f"UPDATE empleados SET {', '.join(f'{k} = ?' for k in campos)} WHERE id = ?",
+                    (*campos.values(), id_empleado)
+                )
+        return self.get_empleado(id_empleado)
+
+    # ---------- Solicitudes de vacaciones ----------
+    def crear_solicitud_vacaciones(self, solicitud):
+        with self._tx() as conn:
+            nueva = {"id_solicitud": f"SOL{str(self._siguiente(conn, 'solicitudes_vacaciones')).zfill(3)}", **solicitud}
+            self._insertar(conn, "solicitudes_vacaciones", SOLICITUD_CAMPOS, nueva)
+        return nueva
+
+    def listar_solicitudes_vacaciones(self, id_empleado=None, estado=None):
+        condiciones, params = [], []
+        if id_empleado is not None:
+            condiciones.append("id_empleado = ?")
+            params.append(id_empleado)
+        if estado is not None:
+            condiciones.append("estado = ?")
+            params.append(estado)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        filas = self._conn().execute(f"SELECT * FROM solicitudes_vacaciones {where} ORDER BY rowid", params)
+        return [dict(f) for f in filas]
+
+    def aprobar_solicitud_vacaciones(self, id_solicitud):
+        # Cambio de estado y descuento de días en la misma transacción
+        with self._tx() as conn:
+            solicitud = self._cambiar_estado_solicitud(conn, id_solicitud, "aprobada")
+            if solicitud:
+                conn.execute(
+                    "UPDATE empleados SET vacaciones_usadas = vacaciones_usadas + ? WHERE id = ?",
+                    (solicitud["dias_solicitados"], solicitud["id_empleado"])
+                )
+        return solicitud
+
+    def rechazar_solicitud_vacaciones(self, id_solicitud):
+        with self._tx() as conn:
+            return self._cambiar_estado_solicitud(conn, id_solicitud, "rechazada")
+
+    def _cambiar_estado_solicitud(self, conn, id_solicitud, estado):
+        cursor = conn.execute(
+            "UPDATE solicitudes_vacaciones SET estado = ? WHERE id_solicitud = ? AND estado = 'pendiente'",
+            (estado, id_solicitud)
+        )
+        if cursor.rowcount == 0:
+            return None
+        fila = conn.execute("SELECT * FROM solicitudes_vacaciones WHERE id_solicitud = ?", (id_solicitud,)).fetchone()
+        return dict(fila)
+
+    # ---------- Bajas médicas ----------
+    def crear_baja_medica(self, baja):
+        with self._tx() as conn:
+            nueva = {"id_baja": f"BM{str(self._siguiente(conn, 'bajas_medicas')).zfill(3)}", **baja}
+            self._insertar(conn, "bajas_medicas", BAJA_CAMPOS, nueva)
+        return nueva
+
+    def listar_bajas_medicas(self, id_empleado, estado=None, desde=None, hasta=None):
+        # Las fechas ISO (YYYY-MM-DD) se comparan bien como texto y usan el
+        # índice (id_empleado, fecha_inicio)
+        condiciones, params = ["id_empleado = ?"], [id_empleado]
+        if estado is not None:
+            condiciones.append("estado = ?")
+            params.append(estado)
+        if desde is not None:
+            condiciones.append("fecha_inicio >= ?")
+            params.append(desde.isoformat())
+        if hasta is not None:
+            condiciones.append("fecha_inicio <= ? AND fecha_fin_estimada IS NOT NULL AND fecha_fin_estimada <= ?")
+            params.extend([hasta.isoformat(), hasta.isoformat()])
+        filas = self._conn().execute(
+            f"SELECT * FROM bajas_medicas WHERE {' AND '.join(condiciones)} ORDER BY fecha_inicio, rowid",
+            params
+        )
+        return [self._baja(f) for f in filas]
+
+    def buscar_baja_solapada(self, id_empleado, inicio, fin=None):
+        fin = (fin or date.max).isoformat()
+        fila = self._conn().execute(
+            "SELECT * FROM bajas_medicas WHERE id_empleado = ? AND estado = 'activa' "
+            "AND (fecha_fin_estimada IS NULL OR (fecha_inicio <= ? AND fecha_fin_estimada >= ?)) "
+            "ORDER BY fecha_fin_estimada IS NOT NULL, fecha_inicio LIMIT 1",
+            (id_empleado, fin, inicio.isoformat())
+        ).fetchone()
+        return self._baja(fila) if fila else None
+
+    def actualizar_baja_medica(self, id_baja, **campos):
+        campos = {k: v for k, v in campos.items() if k in BAJA_CAMPOS and k != "id_baja"}
+        with self._tx() as conn:
+            if campos:
+                conn.execute(
+                    f"UPDATE bajas_medicas SET {', '.join(f'{k} = ?' for k in campos)} WHERE id_baja = ?",
+                    (*campos.values(), id_baja)
+                )
+            fila = conn.execute("SELECT * FROM bajas_medicas WHERE id_baja = ?", (id_baja,)).fetchone()
+        return self._baja(fila) if fila else None
+
+    # ---------- Nóminas ----------
+    def listar_nominas(self, id_empleado):
+        filas = self._conn().execute(
+            "SELECT * FROM nominas WHERE id_empleado = ? ORDER BY mes", (id_empleado,)
+        )
+        nominas = []
+        for f in filas:
+            nomina = dict(f)
+            nomina["conceptos"] = json.loads(nomina["conceptos"]) if nomina["conceptos"] else {}
+            nominas.append(nomina)
+        return nominas
+
+    # ---------- Importación ----------
+    def importar(self, empleados=(), solicitudes=(), bajas=(), nominas=()):
+        """Carga (o sobrescribe) registros en formato JSON original en una sola transacción"""
+        with self._tx() as conn:
+            for e in empleados:
+                self._insertar(conn, "empleados", EMPLEADO_CAMPOS, e, reemplazar=True)
+            for s in solicitudes:
+                self._insertar(conn, "solicitudes_vacaciones", SOLICITUD_CAMPOS, s, reemplazar=True)
+            for b in bajas:
+                self._insertar(conn, "bajas_medicas", BAJA_CAMPOS, b, reemplazar=True)
+            for n in nominas:
+                self._insertar(conn, "nominas", NOMINA_CAMPOS, {**n, "conceptos": json.dumps(n.get("conceptos", {}))},
+                               reemplazar=True)
+            # Los contadores continúan a partir del mayor id importado
+            self._ajustar_contador(conn, "solicitudes_vacaciones", "id_solicitud", "SOL")
+            self._ajustar_contador(conn, "bajas_medicas", "id_baja", "BM")
+
+    # ---------- Helpers ----------
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        """Transacción de escritura (BEGIN IMMEDIATE: un único escritor, lectores sin bloqueo)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _insertar(self, conn, tabla, campos, registro, reemplazar=False):
+        valores = [registro.get(c) for c in campos]
+        verbo = "INSERT OR REPLACE" if reemplazar else "INSERT"
+        conn.execute(
+            f"{verbo} INTO {tabla} ({', '.join(campos)}) VALUES ({', '.join('?' * len(campos))})",
+            valores
+        )
+
+    def _siguiente(self, conn, nombre):
+        conn.execute(
+            "INSERT INTO contadores (nombre, valor) VALUES (?, 1) "
+            "ON CONFLICT(nombre) DO UPDATE SET valor = valor + 1",
+            (nombre,)
+        )
+        return conn.execute("SELECT valor FROM contadores WHERE nombre = ?", (nombre,)).fetchone()[0]
+
+    def _ajustar_contador(self, conn, tabla, columna, prefijo):
+        maximo = 0
+        for (id_registro,) in conn.execute(f"SELECT {columna} FROM {tabla}"):
+            sufijo = id_registro[len(prefijo):]
+            if id_registro.startswith(prefijo) and sufijo.isdigit():
+                maximo = max(maximo, int(sufijo))
+        conn.execute(
+            "INSERT INTO contadores (nombre, valor) VALUES (?, ?) "
+            "ON CONFLICT(nombre) DO UPDATE SET valor = MAX(valor, excluded.valor)",
+            (tabla, maximo)
+        )
+
+    def _baja(self, fila):
+        baja = dict(fila)
+        baja["tiene_justificante"] = bool(baja["tiene_justificante"])
+        return baja
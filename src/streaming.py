@@ -0,0 +1,96 @@
+import threading
+from langchain_core.callbacks import BaseCallbackHandler
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Texto que se muestra mientras se ejecuta cada herramienta
+TOOL_LABELS = {
+    "buscar_politicas_rrhh": "📚 Buscando en las políticas de RRHH",
+    "calcular_vacaciones": "🏖️ Consultando tus días de vacaciones",
+    "solicitar_vacaciones": "📝 Registrando la solicitud de vacaciones",
+    "consultar_solicitudes_vacaciones": "📋 Consultando tus solicitudes de vacaciones",
+    "reportar_baja_medica": "🏥 Registrando la baja médica",
+    "actualizar_baja_medica": "🏥 Actualizando la baja médica",
+    "consultar_bajas_medicas": "🏥 Consultando tus bajas médicas",
+    "consultar_nomina": "💰 Consultando tu nómina",
+}
+
+
+class ChatStreamHandler(BaseCallbackHandler):
+    """
+    Callback que pinta la respuesta del agente mientras se genera.
+
+    - Progreso de herramientas en `status` (st.empty()).
+    - Tokens de la respuesta en `text` (st.empty()), con cursor mientras llegan.
+    Cada llamada al LLM empieza con el texto vacío: las llamadas que solo deciden
+    qué herramienta usar no producen contenido, así que lo que queda visible es
+    la respuesta final.
+
+    Con el agente async las herramientas de un mismo paso se ejecutan a la vez;
+    cada una se sigue por su run_id.
+    """
+
+    # En ejecución async, llamar al callback directamente en el hilo del bucle de
+    # eventos (src.agent.run_async), en orden y sin ceder el control a otra sesión
+    run_inline = True
+
+    def __init__(self, status, text):
+        self.status = status
+        self.text = text
+        # Contexto de la sesión de Streamlit que creó los huecos (hilo del script)
+        self.ctx = get_script_run_ctx()
+        self.tokens = []
+        self.pasos = {}   # run_id -> [texto, terminado]
+        self.status.caption("💭 Pensando...")
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._nueva_respuesta()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._nueva_respuesta()
+
+    def on_llm_new_token(self, token, **kwargs):
+        # Los fragmentos de tool calls llegan con contenido vacío
+        if token:
+            self.tokens.append(token)
+            self._en_sesion()
+            self.text.markdown("".join(self.tokens) + "▌")
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        nombre = (serialized or {}).get("name") or kwargs.get("name", "")
+        self.pasos[run_id] = [TOOL_LABELS.get(nombre, f"🔧 {nombre}"), False]
+        self._pintar_pasos()
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._terminar_paso(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._terminar_paso(run_id)
+
+    def finish(self, output_text):
+        """Sustituye el texto parcial por la respuesta final y limpia el progreso"""
+        self.status.empty()
+        self.text.markdown(output_text)
+
+    def _en_sesion(self):
+        """
+        El bucle de eventos lo comparten todas las sesiones: antes de pintar se
+        asocia al hilo actual el contexto de la sesión de este handler (los
+        callbacks son síncronos, así que ninguna otra sesión se ejecuta entre medias).
+        """
+        if self.ctx is not None:
+            add_script_run_ctx(threading.current_thread(), self.ctx)
+
+    def _nueva_respuesta(self):
+        self.tokens = []
+        self._en_sesion()
+        self.text.empty()
+
+    def _terminar_paso(self, run_id):
+        if run_id in self.pasos:
+            self.pasos[run_id][1] = True
+            self._pintar_pasos()
+
+    def _pintar_pasos(self):
+        self._en_sesion()
+        lineas = [f"✅ {texto}" if terminado else f"⏳ {texto}..." for texto, terminado in self.pasos.values()]
+        self.status.caption("  \n".join(lineas))
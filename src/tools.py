@@ -1,10 +1,14 @@
-import json
-import os
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.tools import tool
+from src.employee_snapshot import invalidate
+from src.storage import get_storage
 
-# Configuración de rutas
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_PATH = os.path.join(BASE_DIR, "src", "data", "empleados.json")
+# Hilos para la E/S de las herramientas (JSON/SQLite) en la ejecución async
+TOOL_WORKERS = 8
+_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="rrhh-tools")
 
 @tool
 def calcular_vacaciones(id_empleado: str) -> str:
@@ -13,10 +17,7 @@ def calcular_vacaciones(id_empleado: str) -> str:
     Retorna un mensaje con el total de días, días usados y días restantes.
     """
     try:
-        with open(DATA_PATH, 'r', encoding='utf-8') as f:
-            empleados = json.load(f)
-            
-        empleado = next((e for e in empleados if e["id"] == id_empleado), None)
+        empleado = get_storage().get_empleado(id_empleado)
         
         if not empleado:
             return f"No se encontró ningún empleado con el ID {id_empleado}."
@@ -52,14 +53,9 @@ def solicitar_vacaciones(id_empleado: str, fecha_inicio: str, fecha_fin: str, co
     """
     from datetime import datetime
     
-    SOLICITUDES_PATH = os.path.join(BASE_DIR, "src", "data", "solicitudes_vacaciones.json")
-    
     try:
         # 1. Cargar datos del empleado
-        with open(DATA_PATH, 'r', encoding='utf-8') as f:
-            empleados = json.load(f)
-        
-        empleado = next((e for e in empleados if e["id"] == id_empleado), None)
+        empleado = get_storage().get_empleado(id_empleado)
         
         if not empleado:
             return f"❌ No se encontró ningún empleado con el ID {id_empleado}."
@@ -88,19 +84,8 @@ def solicitar_vacaciones(id_empleado: str, fecha_inicio: str, fecha_fin: str, co
                    f"Días solicitados: {dias_solicitados}\n"
                    f"Días disponibles: {restantes} (de {total} totales)")
         
-        # 4. Crear la solicitud
-        # Cargar solicitudes existentes
-        if os.path.exists(SOLICITUDES_PATH):
-            with open(SOLICITUDES_PATH, 'r', encoding='utf-8') as f:
-                solicitudes = json.load(f)
-        else:
-            solicitudes = []
-        
-        # Generar ID único
-        id_solicitud = f"SOL{str(len(solicitudes) + 1).zfill(3)}"
-        
+        # 4. Crear la solicitud (el almacenamiento asigna el ID único)
         nueva_solicitud = {
-            "id_solicitud": id_solicitud,
             "id_empleado": id_empleado,
             "nombre_empleado": empleado["nombre"],
             "fecha_inicio": fecha_inicio,
@@ -112,10 +97,9 @@ def solicitar_vacaciones(id_empleado: str, fecha_inicio: str, fecha_fin: str, co
         }
         
         # 5. Guardar la solicitud
-        solicitudes.append(nueva_solicitud)
-        
-        with open(SOLICITUDES_PATH, 'w', encoding='utf-8') as f:
-            json.dump(solicitudes, f, ensure_ascii=False, indent=2)
+        nueva_solicitud = get_storage().crear_solicitud_vacaciones(nueva_solicitud)
+        id_solicitud = nueva_solicitud["id_solicitud"]
+        invalidate(id_empleado)
         
         return (f"✅ Solicitud de vacaciones creada exitosamente\n\n"
                f"📋 ID de Solicitud: {id_solicitud}\n"
@@ -157,14 +141,9 @@ def reportar_baja_medica(
     """
     from datetime import datetime
     
-    BAJAS_PATH = os.path.join(BASE_DIR, "src", "data", "bajas_medicas.json")
-    
     try:
         # 1. Cargar datos del empleado
-        with open(DATA_PATH, 'r', encoding='utf-8') as f:
-            empleados = json.load(f)
-        
-        empleado = next((e for e in empleados if e["id"] == id_empleado), None)
+        empleado = get_storage().get_empleado(id_empleado)
         
         if not empleado:
             return f"❌ No se encontró ningún empleado con el ID {id_empleado}."
@@ -182,48 +161,30 @@ def reportar_baja_medica(
         except ValueError:
             return "❌ Error: Las fechas deben estar en formato YYYY-MM-DD (ejemplo: 2025-12-05)."
         
-        # 3. Cargar bajas existentes y validar solapamiento
-        if os.path.exists(BAJAS_PATH):
-            with open(BAJAS_PATH, 'r', encoding='utf-8') as f:
-                bajas = json.load(f)
-        else:
-            bajas = []
-        
-        # Buscar bajas activas del mismo empleado
-        bajas_activas = [b for b in bajas if b["id_empleado"] == id_empleado and b["estado"] == "activa"]
+        # 3. Validar solapamiento con bajas activas (índice por empleado en la capa de datos)
+        baja = get_storage().buscar_baja_solapada(
+            id_empleado, inicio.date(), fin_estimada.date() if fin_estimada else None
+        )
         
-        for baja in bajas_activas:
-            baja_inicio = datetime.strptime(baja["fecha_inicio"], "%Y-%m-%d")
-            
-            # Si la baja activa tiene fecha de fin estimada
-            if baja.get("fecha_fin_estimada"):
-                baja_fin = datetime.strptime(baja["fecha_fin_estimada"], "%Y-%m-%d")
-                
-                # Verificar solapamiento
-                if fin_estimada:
-                    # Ambas tienen fecha fin: verificar solapamiento completo
-                    if not (fin_estimada < baja_inicio or inicio > baja_fin):
-                        return (f"❌ Error: Ya tienes una baja médica activa que se solapa con estas fechas.\n"
-                               f"Baja activa: {baja['id_baja']} del {baja['fecha_inicio']} al {baja['fecha_fin_estimada']}\n"
-                               f"Por favor, contacta con RRHH si necesitas modificar tu baja existente.")
-                else:
-                    # La nueva no tiene fin: verificar que no empiece antes de que termine la activa
-                    if inicio <= baja_fin:
-                        return (f"❌ Error: Ya tienes una baja médica activa que se solapa con esta fecha.\n"
-                               f"Baja activa: {baja['id_baja']} del {baja['fecha_inicio']} al {baja['fecha_fin_estimada']}\n"
-                               f"Por favor, contacta con RRHH si necesitas modificar tu baja existente.")
-            else:
+        if baja:
+            if not baja.get("fecha_fin_estimada"):
                 # La baja activa NO tiene fecha fin (está abierta): IMPOSIBLE crear nueva
                 return (f"❌ Error: Ya tienes una baja médica ABIERTA (sin fecha fin).\n"
                        f"Baja activa: {baja['id_baja']} desde {baja['fecha_inicio']}\n"
                        f"Debes finalizar la baja anterior antes de reportar una nueva.")
+            elif fin_estimada:
+                # Ambas tienen fecha fin: se solapan los periodos
+                return (f"❌ Error: Ya tienes una baja médica activa que se solapa con estas fechas.\n"
+                       f"Baja activa: {baja['id_baja']} del {baja['fecha_inicio']} al {baja['fecha_fin_estimada']}\n"
+                       f"Por favor, contacta con RRHH si necesitas modificar tu baja existente.")
+            else:
+                # La nueva no tiene fin y empieza antes de que termine la activa
+                return (f"❌ Error: Ya tienes una baja médica activa que se solapa con esta fecha.\n"
+                       f"Baja activa: {baja['id_baja']} del {baja['fecha_inicio']} al {baja['fecha_fin_estimada']}\n"
+                       f"Por favor, contacta con RRHH si necesitas modificar tu baja existente.")
         
-        # 4. Crear el reporte de baja
-        # Generar ID único
-        id_baja = f"BM{str(len(bajas) + 1).zfill(3)}"
-        
+        # 4. Crear el reporte de baja (el almacenamiento asigna el ID único)
         nueva_baja = {
-            "id_baja": id_baja,
             "id_empleado": id_empleado,
             "nombre_empleado": empleado["nombre"],
             "fecha_inicio": fecha_inicio,
@@ -236,10 +197,9 @@ def reportar_baja_medica(
         }
         
         # 5. Guardar el reporte
-        bajas.append(nueva_baja)
-        
-        with open(BAJAS_PATH, 'w', encoding='utf-8') as f:
-            json.dump(bajas, f, ensure_ascii=False, indent=2)
+        nueva_baja = get_storage().crear_baja_medica(nueva_baja)
+        id_baja = nueva_baja["id_baja"]
+        invalidate(id_empleado)
         
         # Mensaje personalizado según si tiene fecha fin o no
         periodo_text = f"{fecha_inicio} a {fecha_fin_estimada}" if fecha_fin_estimada else f"desde {fecha_inicio} (Indefinida/Abierta)"
@@ -279,20 +239,11 @@ def actualizar_baja_medica(
     """
     from datetime import datetime
     
-    BAJAS_PATH = os.path.join(BASE_DIR, "src", "data", "bajas_medicas.json")
-    
     try:
-        if not os.path.exists(BAJAS_PATH):
-            return "❌ Error: No hay registro de bajas médicas."
-            
-        with open(BAJAS_PATH, 'r', encoding='utf-8') as f:
-            bajas = json.load(f)
-            
         # Buscar la baja (sin filtrar por estado para permitir editar finalizadas)
         baja_encontrada = None
-        for b in bajas:
-            if (b["id_empleado"] == id_empleado and 
-                b["fecha_inicio"] == fecha_inicio):
+        for b in get_storage().listar_bajas_medicas(id_empleado):
+            if b["fecha_inicio"] == fecha_inicio:
                 baja_encontrada = b
                 break
         
@@ -301,6 +252,7 @@ def actualizar_baja_medica(
                    f"que haya comenzado el {fecha_inicio}.")
         
         cambios = []
+        campos = {}
         
         # Actualizar campos
         if fecha_fin:
@@ -311,26 +263,26 @@ def actualizar_baja_medica(
                 if fin < inicio:
                     return "❌ Error: La fecha de fin no puede ser anterior a la de inicio."
                 
-                baja_encontrada["fecha_fin_estimada"] = fecha_fin
-                baja_encontrada["estado"] = "finalizada" # Asumimos que si pone fecha fin ahora, es que ya terminó
+                campos["fecha_fin_estimada"] = fecha_fin
+                campos["estado"] = "finalizada" # Asumimos que si pone fecha fin ahora, es que ya terminó
                 cambios.append(f"Fecha fin establecida a {fecha_fin} (Baja Finalizada)")
             except ValueError:
                 return "❌ Error: Formato de fecha incorrecto (use YYYY-MM-DD)."
                 
         if motivo:
-            baja_encontrada["motivo"] = motivo
+            campos["motivo"] = motivo
             cambios.append(f"Motivo actualizado a '{motivo}'")
             
         if notas:
-            baja_encontrada["notas"] = notas
+            campos["notas"] = notas
             cambios.append(f"Notas actualizadas")
             
         if not cambios:
             return "⚠️ No se proporcionaron cambios para realizar."
             
         # Guardar
-        with open(BAJAS_PATH, 'w', encoding='utf-8') as f:
-            json.dump(bajas, f, ensure_ascii=False, indent=2)
+        get_storage().actualizar_baja_medica(baja_encontrada["id_baja"], **campos)
+        invalidate(id_empleado)
             
         return (f"✅ Baja médica actualizada exitosamente\n"
                f"📋 ID Baja: {baja_encontrada['id_baja']}\n"
@@ -358,39 +310,28 @@ def consultar_bajas_medicas(
     """
     from datetime import datetime
     
-    BAJAS_PATH = os.path.join(BASE_DIR, "src", "data", "bajas_medicas.json")
-    
     try:
-        if not os.path.exists(BAJAS_PATH):
-            return "ℹ️ No hay registros de bajas médicas en el sistema."
-            
-        with open(BAJAS_PATH, 'r', encoding='utf-8') as f:
-            bajas = json.load(f)
-            
-        # Filtrar por empleado
-        mis_bajas = [b for b in bajas if b["id_empleado"] == id_empleado]
-        
-        if not mis_bajas:
+        # Validar filtros de fecha (las fechas de las bajas ya vienen indexadas)
+        try:
+            filtro_inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d").date() if fecha_inicio else None
+        except ValueError:
+            return "❌ Error: Formato de fecha_inicio incorrecto (use YYYY-MM-DD)."
+        try:
+            filtro_fin = datetime.strptime(fecha_fin, "%Y-%m-%d").date() if fecha_fin else None
+        except ValueError:
+            return "❌ Error: Formato de fecha_fin incorrecto (use YYYY-MM-DD)."
+        
+        # Bajas del empleado con los filtros aplicados por el índice
+        # (fecha_fin: solo bajas con fecha fin definida)
+        mis_bajas = get_storage().listar_bajas_medicas(
+            id_empleado,
+            estado=estado.lower() if estado else None,
+            desde=filtro_inicio,
+            hasta=filtro_fin
+        )
+        
+        if not mis_bajas and not (estado or fecha_inicio or fecha_fin):
             return f"ℹ️ No se encontraron bajas médicas para el empleado {id_empleado}."
-            
-        # Aplicar filtros opcionales
-        if estado:
-            mis_bajas = [b for b in mis_bajas if b["estado"].lower() == estado.lower()]
-            
-        if fecha_inicio:
-            try:
-                filtro_inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d")
-                mis_bajas = [b for b in mis_bajas if datetime.strptime(b["fecha_inicio"], "%Y-%m-%d") >= filtro_inicio]
-            except ValueError:
-                return "❌ Error: Formato de fecha_inicio incorrecto (use YYYY-MM-DD)."
-
-        if fecha_fin:
-            try:
-                filtro_fin = datetime.strptime(fecha_fin, "%Y-%m-%d")
-                # Solo filtramos si la baja tiene fecha fin definida
-                mis_bajas = [b for b in mis_bajas if b.get("fecha_fin_estimada") and datetime.strptime(b["fecha_fin_estimada"], "%Y-%m-%d") <= filtro_fin]
-            except ValueError:
-                return "❌ Error: Formato de fecha_fin incorrecto (use YYYY-MM-DD)."
         
         if not mis_bajas:
             return "ℹ️ No se encontraron bajas médicas con los filtros especificados."
@@ -430,17 +371,9 @@ def consultar_solicitudes_vacaciones(
     """
     from datetime import datetime
     
-    SOLICITUDES_PATH = os.path.join(BASE_DIR, "src", "data", "solicitudes_vacaciones.json")
-    
     try:
-        if not os.path.exists(SOLICITUDES_PATH):
-            return "ℹ️ No hay registros de solicitudes de vacaciones."
-            
-        with open(SOLICITUDES_PATH, 'r', encoding='utf-8') as f:
-            solicitudes = json.load(f)
-            
-        # Filtrar por empleado
-        mis_solicitudes = [s for s in solicitudes if s["id_empleado"] == id_empleado]
+        # Solicitudes del empleado
+        mis_solicitudes = get_storage().listar_solicitudes_vacaciones(id_empleado=id_empleado)
         
         if not mis_solicitudes:
             return f"ℹ️ No se encontraron solicitudes de vacaciones para el empleado {id_empleado}."
@@ -498,32 +431,23 @@ def consultar_nomina(id_empleado: str, mes: str = "") -> str:
     Returns:
         Información detallada de la nómina solicitada
     """
-    NOMINAS_PATH = os.path.join(BASE_DIR, "src", "data", "nominas.json")
-    
     try:
         # 1. Cargar datos del empleado para verificar que existe
-        with open(DATA_PATH, 'r', encoding='utf-8') as f:
-            empleados = json.load(f)
-        
-        empleado = next((e for e in empleados if e["id"] == id_empleado), None)
+        empleado = get_storage().get_empleado(id_empleado)
         
         if not empleado:
             return f"❌ No se encontró ningún empleado con el ID {id_empleado}."
         
-        # 2. Cargar nóminas
-        if not os.path.exists(NOMINAS_PATH):
+        # 2. Cargar nóminas del empleado
+        try:
+            nominas_empleado = get_storage().listar_nominas(id_empleado)
+        except FileNotFoundError:
             return "❌ Error: No se encontró la base de datos de nóminas."
         
-        with open(NOMINAS_PATH, 'r', encoding='utf-8') as f:
-            nominas = json.load(f)
-        
-        # 3. Filtrar nóminas del empleado
-        nominas_empleado = [n for n in nominas if n["id_empleado"] == id_empleado]
-        
         if not nominas_empleado:
             return f"❌ No se encontraron nóminas para el empleado {empleado['nombre']} ({id_empleado})."
         
-        # 4. Seleccionar nómina según criterio
+        # 3. Seleccionar nómina según criterio
         if mes:
             # Buscar nómina del mes específico
             nomina = next((n for n in nominas_empleado if n["mes"] == mes), None)
@@ -537,7 +461,7 @@ def consultar_nomina(id_empleado: str, mes: str = "") -> str:
             nominas_empleado_ordenadas = sorted(nominas_empleado, key=lambda x: x["mes"], reverse=True)
             nomina = nominas_empleado_ordenadas[0]
         
-        # 5. Formatear respuesta con toda la información
+        # 4. Formatear respuesta con toda la información
         conceptos = nomina["conceptos"]
         
         respuesta = f"💰 **Nómina de {nomina['nombre_empleado']}** ({id_empleado})\n\n"
@@ -571,5 +495,27 @@ def consultar_nomina(id_empleado: str, mes: str = "") -> str:
         return f"❌ Error al consultar la nómina: {str(e)}"
 
 
+# ---------- Versiones async ----------
+def _con_version_async(herramienta):
+    """
+    Añade a la herramienta una implementación async que ejecuta la función en el
+    pool de E/S, sin bloquear el bucle de eventos. Con el AgentExecutor async
+    (ainvoke) las herramientas que el LLM pide en un mismo paso se lanzan a la vez.
+    """
+    func = herramienta.func
+
+    async def coroutine(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(_executor, functools.partial(ctx.run, func, *args, **kwargs))
+
+    herramienta.coroutine = coroutine
+    return herramienta
 
 
+TOOLS = [
+    _con_version_async(h) for h in (
+        calcular_vacaciones, solicitar_vacaciones, reportar_baja_medica, actualizar_baja_medica,
+        consultar_bajas_medicas, consultar_solicitudes_vacaciones, consultar_nomina,
+    )
+]
@@ -0,0 +1,66 @@
+import shutil
+
+import pytest
+
+import src.employee_snapshot as employee_snapshot
+import src.storage as storage
+from src.answer_cache import SemanticAnswerCache
+from src.storage.json_store import DATA_DIR, JsonStorage
+
+PREGUNTA = "¿Cuándo se paga la nómina?"
+POLITICA = "La nómina se paga el último día hábil de cada mes."
+
+
+class FakeEmbeddings:
+    def embed_query(self, texto):
+        return [1.0, float(len(texto))]
+
+
+@pytest.fixture
+def usuario(tmp_path, monkeypatch):
+    """E001 (Ana) sobre una copia de los datos de ejemplo, con resúmenes recién construidos"""
+    data_dir = tmp_path / "data"
+    shutil.copytree(DATA_DIR, data_dir)
+    monkeypatch.setattr(storage, "_storage", JsonStorage(data_dir=str(data_dir)))
+    monkeypatch.setattr(employee_snapshot, "_cache", None)
+    storage.get_storage().crear_solicitud_vacaciones({
+        "id_empleado": "E001", "nombre_empleado": "Ana", "fecha_inicio": "2026-12-01",
+        "fecha_fin": "2026-12-02", "dias_solicitados": 2, "comentarios": "", "estado": "pendiente",
+        "fecha_solicitud": "2026-11-01 10:00:00",
+    })
+    empleado = storage.get_storage().get_empleado("E001")
+    return {k: v for k, v in empleado.items() if k != "password"}
+
+
+def cache():
+    return SemanticAnswerCache(embeddings=FakeEmbeddings(), version_fn=lambda: "v1")
+
+
+def test_guarda_respuesta_de_politicas(usuario):
+    assert cache().store(PREGUNTA, POLITICA, ["buscar_politicas_rrhh"], usuario)
+
+
+@pytest.mark.parametrize("respuesta", [
+    # Identificadores de registros, aunque no sean del usuario
+    POLITICA + " Tu última nómina (NOM045) ya está disponible.",
+    POLITICA + " Tienes la solicitud SOL012 pendiente.",
+    # Datos del resumen de la situación del usuario en el prompt
+    POLITICA + " La última se pagó el 2025-12-31.",
+    POLITICA + " La última se pagó el 31/12/2025.",
+    POLITICA + " Tu neto fue de 2050.00 €.",
+    POLITICA + " Tu neto fue de 2.050,00 €.",
+    POLITICA + " Durante tu baja por gripe se mantiene el pago.",
+    POLITICA + " Tus vacaciones empiezan el 1 de diciembre.",
+])
+def test_no_guarda_respuestas_con_datos_del_resumen(usuario, respuesta):
+    cache_respuestas = cache()
+    assert not cache_respuestas.store(PREGUNTA, respuesta, ["buscar_politicas_rrhh"], usuario)
+    assert cache_respuestas.lookup(PREGUNTA) is None
+
+
+def test_no_responde_desde_cache_con_historial(usuario):
+    cache_respuestas = cache()
+    assert cache_respuestas.store(PREGUNTA, POLITICA, ["buscar_politicas_rrhh"], usuario)
+    assert cache_respuestas.lookup(PREGUNTA, usuario) == POLITICA
+    # Con conversación previa la misma frase puede depender del contexto
+    assert cache_respuestas.lookup(PREGUNTA, usuario, historial=True) is None
@@ -0,0 +1,166 @@
+"""
+Indexación incremental de docs/ (FAISS + BM25) en un directorio temporal: tras
+añadir, modificar o borrar ficheros, el resultado debe ser el mismo que el de
+una reconstrucción completa.
+"""
+import hashlib
+import os
+import re
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+import src.indexing as indexing
+from src.bm25_store import load_bm25, tokenize
+from src.chunk_store import BUILD_ID_FILENAME, load_vectorstore, read_build_id
+from src.faiss_index import index_config
+from src.indexing import load_manifest, sync_index
+
+TEMAS = {
+    "vacaciones.md": "vacaciones días solicitud aprobación calendario verano",
+    "nominas.md": "nómina salario pago transferencia retenciones irpf",
+    "bajas.md": "baja médica justificante incapacidad temporal mutua",
+    "teletrabajo.md": "teletrabajo remoto oficina horario flexible equipo",
+}
+
+
+class BagOfWordsEmbeddings(Embeddings):
+    """Embeddings deterministas (bolsa de palabras con hashing); cuenta los textos embebidos"""
+
+    def __init__(self):
+        self.textos = 0
+
+    def embed_query(self, texto):
+        vector = np.zeros(64, dtype=np.float32)
+        for palabra in re.findall(r"\w+", texto.lower()):
+            vector[int(hashlib.md5(palabra.encode()).hexdigest(), 16) % 64] += 1
+        return vector.tolist()
+
+    def embed_documents(self, textos):
+        self.textos += len(textos)
+        return [self.embed_query(t) for t in textos]
+
+
+def escribir(docs_dir, nombre, tema, version=0):
+    # Varios párrafos: cada fichero da más de un chunk
+    parrafos = [f"{tema} sección {i} versión {version}. " + " ".join([tema] * 12) for i in range(6)]
+    (docs_dir / nombre).write_text("\n\n".join(parrafos), encoding="utf-8")
+
+
+@pytest.fixture(autouse=True)
+def cargador_de_texto(monkeypatch):
+    # El parseo de markdown (unstructured) no es lo que se prueba aquí
+    monkeypatch.setattr(indexing, "load_file", lambda path: [
+        Document(page_content=open(path, encoding="utf-8").read(), metadata={"source": path})
+    ])
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    directorio = tmp_path / "docs"
+    directorio.mkdir()
+    for nombre, tema in list(TEMAS.items())[:3]:
+        escribir(directorio, nombre, tema)
+    return directorio
+
+
+def editar(docs_dir):
+    """Un fichero modificado, uno nuevo y uno eliminado"""
+    escribir(docs_dir, "nominas.md", TEMAS["nominas.md"], version=1)
+    escribir(docs_dir, "teletrabajo.md", TEMAS["teletrabajo.md"])
+    os.remove(docs_dir / "bajas.md")
+
+
+def sincronizar(db_path, docs_dir, config=None, full=False, embeddings=None):
+    embeddings = embeddings or BagOfWordsEmbeddings()
+    vectorstore, bm25, doc_ids = sync_index(
+        embeddings, db_path=str(db_path), docs_dir=str(docs_dir), full=full, index=config, workers=2
+    )
+    return vectorstore, bm25, doc_ids
+
+
+def resultados(vectorstore, consulta):
+    """Todos los chunks con su distancia (los empates se ordenan por id)"""
+    encontrados = vectorstore.similarity_search_with_score(consulta, k=vectorstore.index.ntotal)
+    return sorted((round(float(distancia), 4), d.id) for d, distancia in encontrados)
+
+
+def estadisticas_bm25(bm25, doc_ids):
+    return {doc_id: (bm25.doc_freqs[i], bm25.doc_len[i]) for i, doc_id in enumerate(doc_ids)}
+
+
+def puntuaciones_bm25(bm25, doc_ids, consulta):
+    return {doc_id: round(float(p), 6) for doc_id, p in zip(doc_ids, bm25.get_scores(tokenize(consulta)))}
+
+
+@pytest.mark.parametrize("tipo", [None, "hnsw"])
+def test_incremental_igual_que_reconstruccion_completa(tmp_path, docs_dir, tipo):
+    config = index_config(tipo) if tipo else None
+    incremental, completo = tmp_path / "incremental", tmp_path / "completo"
+    sincronizar(incremental, docs_dir, config)
+
+    editar(docs_dir)
+    embeddings = BagOfWordsEmbeddings()
+    vs_inc, bm25_inc, ids_inc = sincronizar(incremental, docs_dir, config, embeddings=embeddings)
+    vs_full, bm25_full, ids_full = sincronizar(completo, docs_dir, config, full=True)
+
+    manifest_inc, manifest_full = load_manifest(str(incremental)), load_manifest(str(completo))
+    assert manifest_inc["files"] == manifest_full["files"]
+    assert set(manifest_inc["files"]) == {"vacaciones.md", "nominas.md", "teletrabajo.md"}
+    chunks = sum(len(f["chunk_ids"]) for f in manifest_full["files"].values())
+    assert vs_inc.index.ntotal == vs_full.index.ntotal == len(vs_inc.index_to_docstore_id) == chunks
+    assert sorted(ids_inc) == sorted(ids_full)
+
+    # Índice plano: se borran las filas y solo se embeben los chunks nuevos.
+    # HNSW no admite borrar: se reconstruye con los vectores que quedan.
+    nuevos = len(manifest_full["files"]["nominas.md"]["chunk_ids"]) + len(manifest_full["files"]["teletrabajo.md"]["chunk_ids"])
+    assert embeddings.textos == (nuevos if tipo is None else chunks)
+
+    for consulta in ["pago de la nómina", "días de vacaciones en verano", "horario de teletrabajo"]:
+        assert resultados(vs_inc, consulta) == resultados(vs_full, consulta)
+        assert puntuaciones_bm25(bm25_inc, ids_inc, consulta) == puntuaciones_bm25(bm25_full, ids_full, consulta)
+    assert estadisticas_bm25(bm25_inc, ids_inc) == estadisticas_bm25(bm25_full, ids_full)
+    assert not any(doc_id.startswith("bajas.md") for doc_id in ids_inc)
+
+
+def test_arranque_en_caliente_restaura_bm25_de_las_estadisticas(tmp_path, docs_dir):
+    db_path = tmp_path / "db"
+    _, bm25, doc_ids = sincronizar(db_path, docs_dir)
+
+    embeddings = BagOfWordsEmbeddings()
+    vectorstore, bm25_disco, ids_disco = sincronizar(db_path, docs_dir, embeddings=embeddings)
+    assert embeddings.textos == 0
+    assert ids_disco == doc_ids
+    assert bm25_disco.idf == pytest.approx(bm25.idf)
+    assert bm25_disco.average_idf == pytest.approx(bm25.average_idf)
+    assert estadisticas_bm25(bm25_disco, ids_disco) == estadisticas_bm25(bm25, doc_ids)
+    consulta = "justificante de la baja médica"
+    assert puntuaciones_bm25(bm25_disco, ids_disco, consulta) == puntuaciones_bm25(bm25, doc_ids, consulta)
+    assert resultados(vectorstore, consulta)[0][1].startswith("bajas.md")
+
+
+def test_bm25_de_otra_construccion_no_se_carga(tmp_path, docs_dir):
+    db_path = tmp_path / "db"
+    sincronizar(db_path, docs_dir)
+    build_id = read_build_id(str(db_path))
+    assert load_bm25(str(db_path), build_id) is not None
+    assert load_bm25(str(db_path), "otro") is None
+
+
+def test_indice_y_chunks_de_construcciones_distintas_se_reconstruyen(tmp_path, docs_dir):
+    db_path = tmp_path / "db"
+    sincronizar(db_path, docs_dir)
+    assert set(os.listdir(db_path)) == {BUILD_ID_FILENAME, "bm25.json.gz", "chunks.sqlite",
+                                        "index.faiss", "manifest.json"}
+
+    # Escritura interrumpida: index.faiss ya es de una construcción nueva y chunks.sqlite no
+    (db_path / BUILD_ID_FILENAME).write_text("interrumpida", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_vectorstore(str(db_path), BagOfWordsEmbeddings(), read_only=True)
+
+    embeddings = BagOfWordsEmbeddings()
+    vectorstore, _, _ = sincronizar(db_path, docs_dir, embeddings=embeddings)
+    assert embeddings.textos == vectorstore.index.ntotal
+    assert read_build_id(str(db_path)) == (db_path / BUILD_ID_FILENAME).read_text(encoding="utf-8")
@@ -0,0 +1,55 @@
+import hashlib
+import re
+
+import numpy as np
+import pytest
+
+from src.intent_router import IntentRouter
+
+
+class BagOfWordsEmbeddings:
+    """Embeddings de juguete: bolsa de palabras con hashing"""
+
+    def embed_query(self, texto):
+        vector = np.zeros(512)
+        for palabra in re.findall(r"\w+", texto.lower()):
+            vector[int(hashlib.md5(palabra.encode()).hexdigest(), 16) % 512] += 1
+        return vector.tolist()
+
+    def embed_documents(self, textos):
+        return [self.embed_query(t) for t in textos]
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(embeddings=BagOfWordsEmbeddings())
+
+
+@pytest.mark.parametrize("pregunta, herramienta", [
+    ("¿cuántos días de vacaciones me quedan?", "calcular_vacaciones"),
+    ("mis vacaciones restantes", "calcular_vacaciones"),
+    ("mi última nómina", "consultar_nomina"),
+    ("mis bajas médicas", "consultar_bajas_medicas"),
+])
+def test_enruta_consultas_simples_en_espanol(router, pregunta, herramienta):
+    assert router.route(pregunta) == herramienta
+
+
+@pytest.mark.parametrize("pregunta", [
+    "my last payslip",
+    "mes congés restants",
+    "meine Urlaubstage",
+    "how many vacation days do I have left?",
+])
+def test_otros_idiomas_van_al_agente(router, pregunta):
+    assert router.route(pregunta) is None
+
+
+@pytest.mark.parametrize("pregunta", [
+    "¿cuándo se paga la nómina?",
+    "mi nómina de marzo",
+    "mi nómina y mis vacaciones restantes",
+    "cancelar mi solicitud de vacaciones",
+])
+def test_preguntas_complejas_van_al_agente(router, pregunta):
+    assert router.route(pregunta) is None
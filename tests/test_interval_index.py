@@ -0,0 +1,106 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from src.storage.interval_index import BajasIndex
+
+
+def baja(id_baja, inicio, fin=None, estado="activa", id_empleado="E001"):
+    return {"id_baja": id_baja, "id_empleado": id_empleado, "fecha_inicio": inicio,
+            "fecha_fin_estimada": fin, "estado": estado}
+
+
+def solapa(bajas, id_empleado, inicio, fin=None):
+    """Comprobación original (recorre todas las bajas activas del empleado)"""
+    for b in bajas:
+        if b["id_empleado"] != id_empleado or b["estado"] != "activa":
+            continue
+        if not b["fecha_fin_estimada"]:
+            return True
+        b_inicio = date.fromisoformat(b["fecha_inicio"])
+        b_fin = date.fromisoformat(b["fecha_fin_estimada"])
+        if fin is None:
+            if inicio <= b_fin:
+                return True
+        elif not (fin < b_inicio or inicio > b_fin):
+            return True
+    return False
+
+
+@pytest.fixture
+def indice():
+    indice = BajasIndex()
+    indice.reset([
+        baja("BM001", "2025-03-01", "2025-03-10"),
+        baja("BM002", "2025-01-01", "2025-12-31", estado="finalizada"),
+        baja("BM003", "2025-05-01", "2025-05-05", id_empleado="E002"),
+    ])
+    return indice
+
+
+@pytest.mark.parametrize("inicio, fin, esperado", [
+    ("2025-03-05", "2025-03-07", "BM001"),   # contenida
+    ("2025-02-20", "2025-03-01", "BM001"),   # termina el día que empieza la activa
+    ("2025-03-10", "2025-03-15", "BM001"),   # empieza el día que termina la activa
+    ("2025-02-01", "2025-02-28", None),      # justo antes
+    ("2025-03-11", "2025-03-20", None),      # justo después
+    ("2025-06-01", "2025-06-02", None),      # solo la finalizada la cubre
+    ("2025-03-10", None, "BM001"),           # abierta que empieza al terminar la activa
+    ("2025-02-01", None, "BM001"),           # abierta que empieza antes
+    ("2025-03-11", None, None),              # abierta que empieza después
+])
+def test_solapamiento(indice, inicio, fin, esperado):
+    fin = date.fromisoformat(fin) if fin else None
+    assert indice.solapamiento("E001", date.fromisoformat(inicio), fin) == esperado
+
+
+def test_baja_abierta_activa_impide_cualquier_otra(indice):
+    indice.upsert(baja("BM004", "2025-08-01"))
+    assert indice.solapamiento("E001", date(2024, 1, 1), date(2024, 1, 2)) == "BM004"
+
+
+def test_finalizar_libera_las_fechas(indice):
+    indice.upsert(baja("BM001", "2025-03-01", "2025-03-10", estado="finalizada"))
+    assert indice.solapamiento("E001", date(2025, 3, 5), date(2025, 3, 6)) is None
+    indice.upsert(baja("BM001", "2025-03-01", "2025-03-10"))
+    assert indice.solapamiento("E001", date(2025, 3, 5), date(2025, 3, 6)) == "BM001"
+
+
+def test_rango(indice):
+    assert indice.rango("E001") == ["BM002", "BM001"]
+    assert indice.rango("E001", desde=date(2025, 2, 1)) == ["BM001"]
+    assert indice.rango("E001", hasta=date(2025, 3, 31)) == ["BM001"]
+    indice.upsert(baja("BM005", "2025-04-01"))
+    # Las abiertas no terminan antes de ninguna fecha
+    assert indice.rango("E001", desde=date(2025, 3, 15)) == ["BM005"]
+    assert indice.rango("E001", desde=date(2025, 3, 15), hasta=date(2026, 1, 1)) == []
+
+
+def test_coincide_con_la_comprobacion_original():
+    aleatorio = random.Random(7)
+    base = date(2025, 1, 1)
+
+    def fecha():
+        return base + timedelta(days=aleatorio.randrange(120))
+
+    bajas = {}
+    indice = BajasIndex()
+    for i in range(300):
+        id_baja = f"BM{aleatorio.randrange(40):03d}"
+        inicio = fecha()
+        fin = None if aleatorio.random() < 0.1 else inicio + timedelta(days=aleatorio.randrange(15))
+        nueva = baja(id_baja, inicio.isoformat(), fin.isoformat() if fin else None,
+                     estado=aleatorio.choice(["activa", "activa", "finalizada"]),
+                     id_empleado=aleatorio.choice(["E001", "E002"]))
+        bajas[id_baja] = nueva
+        indice.upsert(nueva)
+
+        consulta_inicio = fecha()
+        consulta_fin = None if aleatorio.random() < 0.2 else consulta_inicio + timedelta(days=aleatorio.randrange(10))
+        for id_empleado in ("E001", "E002"):
+            encontrada = indice.solapamiento(id_empleado, consulta_inicio, consulta_fin)
+            assert (encontrada is not None) == solapa(bajas.values(), id_empleado, consulta_inicio, consulta_fin)
+            if encontrada:
+                assert bajas[encontrada]["estado"] == "activa"
+                assert bajas[encontrada]["id_empleado"] == id_empleado
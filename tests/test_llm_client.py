@@ -0,0 +1,242 @@
+"""
+Clientes HTTP del LLM contra un servidor local compatible con la API de OpenAI
+(lo mismo que apuntar RRHH_LLM_BASE_URL a un servidor de pruebas).
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, OpenAI
+
+import src.llm_client as llm_client
+from src.llm_client import MAX_RETRIES, HedgingTransport
+
+COMPLETION = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "openai/gpt-3.5-turbo",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Servidor de chat completions. `guion` son las respuestas de las próximas
+    peticiones (status, cabeceras, retraso en s); sin guion responde 200 al momento.
+    Guarda el puerto cliente de cada petición para comprobar la reutilización.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.guion = []
+        self.puertos = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def siguiente(self, puerto):
+        with self.lock:
+            self.puertos.append(puerto)
+            return self.guion.pop(0) if self.guion else (200, {}, 0)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"     # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status, cabeceras, retraso = self.server.siguiente(self.client_address[1])
+        time.sleep(retraso)
+        cuerpo = json.dumps(COMPLETION if status == 200 else {"error": {"message": "stub"}}).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            for nombre, valor in cabeceras.items():
+                self.send_header(nombre, valor)
+            self.end_headers()
+            self.wfile.write(cuerpo)
+        except (BrokenPipeError, ConnectionResetError):
+            pass    # petición duplicada cancelada por el cliente
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    servidor = StubServer()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def clientes(monkeypatch):
+    """Clientes compartidos nuevos para cada test"""
+    monkeypatch.setattr(llm_client, "_client", None)
+    monkeypatch.setattr(llm_client, "_async_client", None)
+    yield
+    if llm_client._client is not None:
+        llm_client._client.close()
+
+
+def openai_client(server):
+    return OpenAI(base_url=server.base_url, api_key="test", max_retries=MAX_RETRIES,
+                  http_client=llm_client.get_http_client())
+
+
+def completar(cliente):
+    return cliente.chat.completions.create(
+        model="openai/gpt-3.5-turbo", messages=[{"role": "user", "content": "hola"}]
+    )
+
+
+def test_reintenta_429_respetando_retry_after(server, clientes):
+    server.guion = [(429, {"Retry-After": "1"}, 0)]
+    inicio = time.perf_counter()
+    respuesta = completar(openai_client(server))
+    # Sin Retry-After el primer reintento esperaría como mucho 0.5 s
+    assert time.perf_counter() - inicio >= 0.95
+    assert respuesta.choices[0].message.content == "ok"
+    assert len(server.puertos) == 2
+
+
+def test_reintenta_5xx_con_backoff_exponencial(server, clientes):
+    server.guion = [(503, {}, 0), (500, {}, 0)]
+    inicio = time.perf_counter()
+    respuesta = completar(openai_client(server))
+    # 0.5 s y 1 s, con un jitter de hasta -25 %
+    assert time.perf_counter() - inicio >= 1.1
+    assert respuesta.choices[0].message.content == "ok"
+    assert len(server.puertos) == 3
+
+
+def test_reutiliza_las_conexiones(server, clientes):
+    cliente = openai_client(server)
+    for _ in range(3):
+        completar(cliente)
+
+    async def tres_llamadas():
+        cliente_async = AsyncOpenAI(base_url=server.base_url, api_key="test",
+                                    http_client=llm_client.get_async_http_client())
+        for _ in range(3):
+            await cliente_async.chat.completions.create(
+                model="openai/gpt-3.5-turbo", messages=[{"role": "user", "content": "hola"}]
+            )
+        await llm_client.get_async_http_client().aclose()
+
+    asyncio.run(tres_llamadas())
+    # Una conexión para las llamadas síncronas y otra para las async
+    assert len(server.puertos) == 6
+    assert len(set(server.puertos[:3])) == 1
+    assert len(set(server.puertos[3:])) == 1
+
+
+def test_hedging_duplica_la_peticion_lenta(server):
+    async def escenario():
+        transporte = HedgingTransport(httpx.AsyncHTTPTransport(), min_samples=3)
+        async with httpx.AsyncClient(transport=transporte, base_url=server.base_url) as cliente:
+            for _ in range(3):
+                await cliente.post("/chat/completions", json={})
+            assert transporte.threshold() is not None
+
+            # La primera petición tarda 2 s; la duplicada responde al momento
+            server.guion = [(200, {}, 2), (200, {}, 0)]
+            inicio = time.perf_counter()
+            respuesta = await cliente.post("/chat/completions", json={})
+            return transporte, respuesta, time.perf_counter() - inicio
+
+    transporte, respuesta, duracion = asyncio.run(escenario())
+    assert respuesta.status_code == 200
+    assert duracion < 1
+    assert transporte.hedged == 1
+    assert transporte.hedge_wins == 1
+    assert len(server.puertos) == 5
+
+
+class RespuestaStream(httpx.AsyncByteStream):
+    def __init__(self):
+        self.cerrada = False
+
+    async def __aiter__(self):
+        yield b"{}"
+
+    async def aclose(self):
+        self.cerrada = True
+
+
+class TransporteGuionado(httpx.AsyncBaseTransport):
+    """Transporte falso: cada petición ejecuta la siguiente corrutina del guion"""
+
+    def __init__(self, guion):
+        self.guion = list(guion)
+        self.streams = []
+
+    async def handle_async_request(self, request):
+        stream = RespuestaStream()
+        self.streams.append(stream)
+        await self.guion.pop(0)()
+        return httpx.Response(200, stream=stream, request=request)
+
+
+def hedging(transporte):
+    hedge = HedgingTransport(transporte, min_samples=1)
+    hedge.latencias.append(0.01)
+    return hedge
+
+
+def test_hedging_cierra_la_respuesta_perdedora():
+    async def escenario():
+        evento = asyncio.Event()
+
+        async def primera():
+            await evento.wait()
+
+        async def segunda():
+            evento.set()    # las dos terminan en la misma vuelta del bucle
+
+        transporte = TransporteGuionado([primera, segunda])
+        respuesta = await hedging(transporte).handle_async_request(
+            httpx.Request("POST", "http://stub/v1/chat/completions", content=b"{}")
+        )
+        await asyncio.sleep(0.05)   # cierre de la perdedora (callback)
+        return transporte, respuesta
+
+    transporte, respuesta = asyncio.run(escenario())
+    ganadora = [s for s in transporte.streams if s is respuesta.stream]
+    perdedora = [s for s in transporte.streams if s is not respuesta.stream]
+    assert len(ganadora) == 1 and len(perdedora) == 1
+    assert perdedora[0].cerrada
+    assert not ganadora[0].cerrada
+
+
+def test_hedging_prefiere_la_respuesta_correcta():
+    async def escenario():
+        async def primera():
+            await asyncio.sleep(0.05)
+            raise httpx.ConnectError("caída")
+
+        async def segunda():
+            await asyncio.sleep(0.2)
+
+        transporte = TransporteGuionado([primera, segunda])
+        hedge = hedging(transporte)
+        respuesta = await hedge.handle_async_request(
+            httpx.Request("POST", "http://stub/v1/chat/completions", content=b"{}")
+        )
+        return hedge, transporte, respuesta
+
+    hedge, transporte, respuesta = asyncio.run(escenario())
+    assert respuesta.stream is transporte.streams[1]
+    assert hedge.hedge_wins == 1
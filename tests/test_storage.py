@@ -0,0 +1,279 @@
+"""
+Backends de almacenamiento (JSON y SQLite) sobre una copia de los datos de
+ejemplo en tmp_path, y las piezas de bajo nivel del backend JSON: log de
+eventos, asignación de IDs y escritura atómica.
+"""
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+import src.storage.json_store as json_store
+from src.storage.event_log import APPROVED, CREATED, UPDATED, EventLog
+from src.storage.file_store import IdAllocator, atomic_write_json, file_lock, read_json
+from src.storage.importer import importar_json
+from src.storage.json_store import DATA_DIR, JsonStorage
+from src.storage.sqlite_store import SqliteStorage
+
+
+def nueva_solicitud(inicio="2026-12-01", fin="2026-12-02", dias=2, id_empleado="E002"):
+    return {
+        "id_empleado": id_empleado, "nombre_empleado": "Carlos", "fecha_inicio": inicio, "fecha_fin": fin,
+        "dias_solicitados": dias, "comentarios": "", "estado": "pendiente",
+        "fecha_solicitud": "2026-11-01 10:00:00",
+    }
+
+
+def nueva_baja(inicio, fin=None, id_empleado="E002"):
+    return {
+        "id_empleado": id_empleado, "nombre_empleado": "Carlos", "fecha_inicio": inicio,
+        "fecha_fin_estimada": fin, "motivo": "Gripe", "tiene_justificante": False, "estado": "activa",
+        "fecha_reporte": "2026-11-01 10:00:00", "notas": "",
+    }
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    destino = tmp_path / "data"
+    shutil.copytree(DATA_DIR, destino, ignore=shutil.ignore_patterns("*.sqlite*", "*.lock"))
+    return str(destino)
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, data_dir, tmp_path):
+    if request.param == "json":
+        return JsonStorage(data_dir=data_dir)
+    db_path = str(tmp_path / "rrhh.sqlite")
+    importar_json(db_path, data_dir)
+    return SqliteStorage(db_path)
+
+
+# ---------- Comportamiento común de los dos backends ----------
+def test_crear_solicitud_continua_la_numeracion(storage):
+    creadas = [storage.crear_solicitud_vacaciones(nueva_solicitud()) for _ in range(2)]
+    assert [s["id_solicitud"] for s in creadas] == ["SOL010", "SOL011"]
+    pendientes = storage.listar_solicitudes_vacaciones(id_empleado="E002", estado="pendiente")
+    assert [s["id_solicitud"] for s in pendientes][-2:] == ["SOL010", "SOL011"]
+
+
+def test_aprobar_descuenta_los_dias_una_sola_vez(storage):
+    solicitud = storage.crear_solicitud_vacaciones(nueva_solicitud(dias=3))
+    usadas = storage.get_empleado("E002")["vacaciones_usadas"]
+
+    aprobada = storage.aprobar_solicitud_vacaciones(solicitud["id_solicitud"])
+    assert aprobada["estado"] == "aprobada"
+    # Ya no está pendiente: ni se vuelve a aprobar ni se puede rechazar
+    assert storage.aprobar_solicitud_vacaciones(solicitud["id_solicitud"]) is None
+    assert storage.rechazar_solicitud_vacaciones(solicitud["id_solicitud"]) is None
+    assert storage.get_empleado("E002")["vacaciones_usadas"] == usadas + 3
+
+
+def test_rechazar_no_toca_el_saldo(storage):
+    solicitud = storage.crear_solicitud_vacaciones(nueva_solicitud())
+    usadas = storage.get_empleado("E002")["vacaciones_usadas"]
+    assert storage.rechazar_solicitud_vacaciones(solicitud["id_solicitud"])["estado"] == "rechazada"
+    assert storage.get_empleado("E002")["vacaciones_usadas"] == usadas
+    assert storage.aprobar_solicitud_vacaciones("SOL999") is None
+
+
+def test_bajas_solapadas_y_finalizadas(storage):
+    baja = storage.crear_baja_medica(nueva_baja("2026-03-01", "2026-03-10"))
+    assert baja["id_baja"] == "BM003"
+    assert storage.buscar_baja_solapada("E002", date(2026, 3, 10), date(2026, 3, 12))["id_baja"] == "BM003"
+    assert storage.buscar_baja_solapada("E002", date(2026, 3, 11), date(2026, 3, 12)) is None
+
+    storage.actualizar_baja_medica("BM003", estado="finalizada")
+    assert storage.buscar_baja_solapada("E002", date(2026, 3, 5)) is None
+    assert storage.listar_bajas_medicas("E002", estado="activa") == []
+    assert [b["estado"] for b in storage.listar_bajas_medicas("E002")] == ["finalizada"]
+
+
+def test_actualizar_empleado(storage):
+    actualizado = storage.actualizar_empleado("E002", foto_perfil="carlos.png")
+    assert actualizado["foto_perfil"] == "carlos.png"
+    assert storage.get_empleado("E002")["foto_perfil"] == "carlos.png"
+    assert storage.actualizar_empleado("E999", foto_perfil="x.png") is None
+
+
+def operaciones(storage):
+    """Misma secuencia de operaciones en cualquier backend; devuelve el estado resultante"""
+    for inicio, fin in [("2026-07-01", "2026-07-05"), ("2026-08-01", "2026-08-02"), ("2026-09-01", "2026-09-01")]:
+        storage.crear_solicitud_vacaciones(nueva_solicitud(inicio, fin))
+    storage.aprobar_solicitud_vacaciones("SOL010")
+    storage.rechazar_solicitud_vacaciones("SOL011")
+    storage.crear_baja_medica(nueva_baja("2026-01-10", "2026-01-20"))
+    storage.crear_baja_medica(nueva_baja("2026-02-01"))
+    storage.actualizar_baja_medica("BM003", estado="finalizada", tiene_justificante=True)
+    return {
+        "empleados": storage.listar_empleados(),
+        "solicitudes": storage.listar_solicitudes_vacaciones(),
+        "pendientes_e002": storage.listar_solicitudes_vacaciones(id_empleado="E002", estado="pendiente"),
+        "bajas_e001": storage.listar_bajas_medicas("E001"),
+        "bajas_e002": storage.listar_bajas_medicas("E002"),
+        "bajas_enero": storage.listar_bajas_medicas("E002", desde=date(2026, 1, 1), hasta=date(2026, 1, 31)),
+        "solapada": storage.buscar_baja_solapada("E002", date(2026, 5, 1), date(2026, 5, 3)),
+        "nominas": storage.listar_nominas("E002"),
+    }
+
+
+def test_json_y_sqlite_dan_el_mismo_resultado(data_dir, tmp_path):
+    db_path = str(tmp_path / "rrhh.sqlite")
+    importar_json(db_path, data_dir)
+    sqlite = operaciones(SqliteStorage(db_path))
+    json_ = operaciones(JsonStorage(data_dir=data_dir))
+    assert sqlite == json_
+    assert json_["solapada"]["id_baja"] == "BM004"
+
+
+# ---------- Backend JSON ----------
+def test_aprobar_bloquea_solicitudes_antes_que_empleados(data_dir, monkeypatch):
+    storage = JsonStorage(data_dir=data_dir)
+    solicitud = storage.crear_solicitud_vacaciones(nueva_solicitud())
+    tomados = []
+    original = json_store.file_lock
+
+    @contextmanager
+    def registrar(path):
+        with original(path):
+            tomados.append(os.path.basename(path))
+            yield
+
+    monkeypatch.setattr(json_store, "file_lock", registrar)
+    storage.aprobar_solicitud_vacaciones(solicitud["id_solicitud"])
+    assert tomados == ["solicitudes_vacaciones.json", "empleados.json"]
+
+
+def test_altas_concurrentes_de_varias_sesiones_no_repiten_id(data_dir):
+    # Una instancia por hilo: solo el bloqueo de fichero las coordina (como entre procesos)
+    ids, errores = [], []
+
+    def crear():
+        try:
+            storage = JsonStorage(data_dir=data_dir)
+            for _ in range(5):
+                ids.append(storage.crear_solicitud_vacaciones(nueva_solicitud())["id_solicitud"])
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=crear) for _ in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert not errores
+    assert len(set(ids)) == 40
+    registros = JsonStorage(data_dir=data_dir).listar_solicitudes_vacaciones()
+    assert len(registros) == 9 + 40
+    assert read_json(os.path.join(data_dir, "contadores.json")) == {"SOL": 49}
+
+
+# ---------- Log de eventos ----------
+def test_event_log_compacta_en_el_snapshot(tmp_path):
+    snapshot = str(tmp_path / "registros.json")
+    atomic_write_json(snapshot, [{"id": "R001", "estado": "pendiente"}])
+    log = EventLog(snapshot, key="id", compact_every=3)
+
+    with file_lock(snapshot):
+        log.append(CREATED, "R002", {"id": "R002", "estado": "pendiente"})
+        log.append(APPROVED, "R001", {"estado": "aprobada"})
+        assert os.path.getsize(log.log_path) > 0
+        log.append(UPDATED, "R002", {"estado": "rechazada"})
+
+    # Tercer evento: el estado pasa al snapshot y los eventos a auditoría
+    assert read_json(snapshot) == [{"id": "R001", "estado": "aprobada"}, {"id": "R002", "estado": "rechazada"}]
+    assert os.path.getsize(log.log_path) == 0
+    with open(log.audit_path, encoding="utf-8") as f:
+        assert [json.loads(linea)["tipo"] for linea in f] == [CREATED, APPROVED, UPDATED]
+    assert EventLog(snapshot, key="id").records() == log.records()
+
+
+def test_event_log_lee_solo_lineas_nuevas_y_completas(tmp_path):
+    snapshot = str(tmp_path / "registros.json")
+    escritor = EventLog(snapshot, key="id")
+    lector = EventLog(snapshot, key="id")
+    assert lector.records() == []
+
+    with file_lock(snapshot):
+        escritor.append(CREATED, "R001", {"id": "R001", "estado": "pendiente"})
+    assert lector.records() == [{"id": "R001", "estado": "pendiente"}]
+
+    # Un escritor a mitad de línea: se ignora hasta que esté completa
+    linea = json.dumps({"ts": "", "tipo": CREATED, "id": "R002", "datos": {"id": "R002", "estado": "pendiente"}})
+    with open(escritor.log_path, "a", encoding="utf-8") as f:
+        f.write(linea[:20])
+    assert [r["id"] for r in lector.records()] == ["R001"]
+    with open(escritor.log_path, "a", encoding="utf-8") as f:
+        f.write(linea[20:] + "\n")
+    assert [r["id"] for r in lector.records()] == ["R001", "R002"]
+
+    # Compactación en otra instancia: el lector recarga el snapshot nuevo
+    with file_lock(snapshot):
+        escritor.compact()
+        escritor.append(APPROVED, "R002", {"estado": "aprobada"})
+    assert lector.records() == [{"id": "R001", "estado": "pendiente"}, {"id": "R002", "estado": "aprobada"}]
+
+
+def test_event_log_reaplicar_eventos_compactados_no_cambia_el_estado(tmp_path):
+    snapshot = str(tmp_path / "registros.json")
+    log = EventLog(snapshot, key="id")
+    with file_lock(snapshot):
+        log.append(CREATED, "R001", {"id": "R001", "estado": "pendiente"})
+        log.append(APPROVED, "R001", {"estado": "aprobada"})
+    with open(log.log_path, "rb") as f:
+        eventos = f.read()
+    with file_lock(snapshot):
+        log.compact()
+
+    # Compactación interrumpida tras escribir el snapshot: el log sigue con los eventos
+    with open(log.log_path, "wb") as f:
+        f.write(eventos)
+    assert EventLog(snapshot, key="id").records() == [{"id": "R001", "estado": "aprobada"}]
+
+
+# ---------- Ficheros ----------
+def test_id_allocator_respeta_el_minimo_solo_al_inicializar(tmp_path):
+    ids = IdAllocator(str(tmp_path / "contadores.json"))
+    assert ids.next("SOL", minimo=lambda: 9) == 10
+    # Con el contador ya creado no se vuelve a calcular el mínimo
+    assert ids.next("SOL", minimo=lambda: pytest.fail("no debe evaluarse")) == 11
+    assert ids.next("BM") == 1
+    assert ids.format("SOL", 11) == "SOL011"
+
+
+def test_id_allocator_concurrente(tmp_path):
+    path = str(tmp_path / "contadores.json")
+    numeros = []
+
+    def asignar():
+        ids = IdAllocator(path)     # instancias separadas: solo las coordina file_lock
+        for _ in range(25):
+            numeros.append(ids.next("SOL"))
+
+    hilos = [threading.Thread(target=asignar) for _ in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert sorted(numeros) == list(range(1, 201))
+
+
+def test_atomic_write_json_no_deja_temporales(tmp_path):
+    path = str(tmp_path / "datos.json")
+    atomic_write_json(path, [{"nombre": "Ana"}])
+    atomic_write_json(path, [{"nombre": "Carlos"}])
+    assert read_json(path) == [{"nombre": "Carlos"}]
+    assert os.listdir(tmp_path) == ["datos.json"]
+
+
+def test_atomic_write_json_conserva_el_fichero_si_falla(tmp_path):
+    path = str(tmp_path / "datos.json")
+    atomic_write_json(path, [{"nombre": "Ana"}])
+    with pytest.raises(TypeError):
+        atomic_write_json(path, [{"nombre": object()}])
+    assert read_json(path) == [{"nombre": "Ana"}]
+    assert os.listdir(tmp_path) == ["datos.json"]